@@ -5,13 +5,99 @@ YOLO 訓練引擎
 """
 
 from ultralytics import YOLO
+import numpy as np
 import os
 import logging
-from typing import Dict, Any, Optional, Callable
+import contextlib
+import functools
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, List, Iterator, Tuple
 from pathlib import Path
 
+from utils.dataset_utils import VALID_IMAGE_EXTS
+
 logger = logging.getLogger(__name__)
 
+# 推論用 TensorRT engine 的檔名後綴（{stem}_serve.engine：FP16、dynamic batch 16、imgsz 640）
+SERVE_ENGINE_SUFFIX = "_serve"
+
+# 可選：TurboJPEG（libjpeg-turbo SIMD 解碼，見 requirements-optional.txt）
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJPF_GRAY
+    _turbo_jpeg = TurboJPEG()
+except Exception:
+    _turbo_jpeg = None
+
+
+def _jpeg_orientation(data: bytes) -> int:
+    """
+    讀取 JPEG 的 EXIF Orientation 標籤（只解析 APP1 區段的 IFD0，不解碼影像）
+
+    Args:
+        data: JPEG 檔案內容
+
+    Returns:
+        int: Orientation 值（1–8），無 EXIF 或無此標籤時為 1
+    """
+    if data[:2] != b'\xff\xd8':
+        return 1
+
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker == 0xFF:  # 填充位元組
+            pos += 1
+            continue
+        if marker in (0xDA, 0xD9):  # SOS / EOI：metadata 區段已結束
+            break
+
+        seg_len = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\x00\x00':
+            tiff = data[pos + 10:pos + 2 + seg_len]
+            order = 'little' if tiff[:2] == b'II' else 'big'
+            ifd = int.from_bytes(tiff[4:8], order)
+            count = int.from_bytes(tiff[ifd:ifd + 2], order)
+            for entry in range(ifd + 2, min(ifd + 2 + count * 12, len(tiff) - 11), 12):
+                if int.from_bytes(tiff[entry:entry + 2], order) == 0x0112:
+                    return int.from_bytes(tiff[entry + 8:entry + 10], order) or 1
+            return 1
+
+        pos += 2 + seg_len
+
+    return 1
+
+
+def decode_image(image_path: str, gray: bool = False) -> Optional[np.ndarray]:
+    """
+    解碼圖片檔案
+
+    JPEG 在安裝 PyTurboJPEG 時使用 TurboJPEG 解碼，其他格式或解碼失敗時退回 OpenCV。
+    TurboJPEG 不處理 EXIF 旋轉，帶有 Orientation 標籤（非 1）的 JPEG 交由 OpenCV 解碼，
+    結果與未安裝 PyTurboJPEG 時一致
+
+    Args:
+        image_path: 圖片路徑
+        gray: 是否解碼為單通道灰階
+
+    Returns:
+        Optional[np.ndarray]: BGR（或灰階）影像，讀取失敗時為 None
+    """
+    if _turbo_jpeg is not None and image_path.lower().endswith(('.jpg', '.jpeg')):
+        try:
+            with open(image_path, 'rb') as f:
+                data = f.read()
+            if _jpeg_orientation(data) == 1:
+                img = _turbo_jpeg.decode(data, pixel_format=TJPF_GRAY if gray else TJPF_BGR)
+                return img[:, :, 0] if gray and img.ndim == 3 else img
+        except Exception as e:
+            logger.debug(f"TurboJPEG 解碼失敗，改用 OpenCV: {image_path}, {e}")
+
+    import cv2
+    return cv2.imread(image_path, cv2.IMREAD_GRAYSCALE if gray else cv2.IMREAD_COLOR)
+
 
 class YOLOTrainer:
     """
@@ -44,13 +130,13 @@ class YOLOTrainer:
         model_name = config.get('model_name', 'training')
         version = config.get('yolo_version', 'v11')
         epochs = config.get('epochs', 100)
-        batch = config.get('batch_size', 8)
+        batch = config.get('batch_size', -1)
         imgsz = config.get('img_size', 640)
         data_yaml = config.get('data_yaml')
 
         # 進階超參數
         device_str = config.get('device', 'auto')
-        workers = config.get('workers', 4)
+        workers = config.get('workers') or min(16, os.cpu_count() or 4)
         optimizer = config.get('optimizer', 'AdamW')
         patience = config.get('patience', 20)
 
@@ -58,7 +144,8 @@ class YOLOTrainer:
         lr0 = config.get('lr0', 0.001)
         cos_lr = config.get('cosine_lr', True)
         rect = config.get('rect', False)
-        cache = config.get('cache', False)
+        cache = config.get('cache')
+        amp = config.get('amp', True)
 
         # 資料增強
         augment = config.get('augment', True)
@@ -68,6 +155,17 @@ class YOLOTrainer:
 
         # 映射裝置字串
         device = self._map_device(device_str)
+        is_ddp = device is not None and ',' in device
+
+        # DDP 多卡訓練：workers 為每張 GPU 的數量，維持 4-8 可避免行程間競爭
+        close_mosaic = config.get('close_mosaic', 20 if is_ddp else 10)
+        deterministic = config.get('deterministic', not is_ddp)
+
+        # 未指定快取模式時，依資料集大小自動選擇 RAM / 磁碟快取
+        if cache is None:
+            cache = self._select_cache_mode(data_yaml)
+            if log_callback:
+                log_callback(f"💾 自動選擇影像快取模式: {cache}")
 
         # 確定基礎模型
         checkpoint = config.get('checkpoint', '')
@@ -86,29 +184,40 @@ class YOLOTrainer:
 
         self.model = YOLO(base_model)
 
+        # 未指定批次大小時，依 GPU 記憶體自動決定
+        if batch is None or batch <= 0:
+            batch = self._auto_batch_size(device, imgsz, amp)
+            if log_callback:
+                log_callback(f"📐 自動批次大小: {batch}")
+
         # 附加進度回調
         if progress_callback:
-            def on_train_epoch_end(trainer):
+            # 使用 on_fit_epoch_end（驗證之後觸發）：此時 GPU 已因驗證而同步，
+            # 讀取 loss 不會額外造成 CUDA 同步，且可取得本 epoch 的 mAP
+            def on_fit_epoch_end(trainer):
                 current_epoch = trainer.epoch + 1
-                total_epochs = trainer.epochs
 
                 # 提取訓練指標
+                loss = getattr(trainer, 'loss', None)
+                val_metrics = getattr(trainer, 'metrics', None) or {}
                 metrics = {
-                    'loss': float(trainer.loss.item()) if hasattr(trainer, 'loss') else 0.0,
-                    'mAP': 0.0,  # TODO: 從 trainer.metrics 提取
+                    'loss': float(loss.detach().item()) if loss is not None else 0.0,
+                    'mAP': float(val_metrics.get('metrics/mAP50-95(B)', 0.0)),
                 }
 
                 progress_callback(current_epoch, metrics)
 
-            self.model.add_callback("on_train_epoch_end", on_train_epoch_end)
+            self.model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
 
         # 記錄訓練配置
         if log_callback:
             log_callback(f"📊 訓練配置:")
             log_callback(f"  - Epochs: {epochs}, Batch: {batch}, Image Size: {imgsz}")
-            log_callback(f"  - Device: {device_str}, Workers: {workers}")
+            log_callback(f"  - Device: {device_str}, Workers: {workers}, Cache: {cache}")
+            if is_ddp:
+                log_callback(f"  - DDP: GPUs {device}, Close Mosaic: {close_mosaic}")
             log_callback(f"  - Optimizer: {optimizer}, Patience: {patience}")
-            log_callback(f"  - LR0: {lr0}, Cosine LR: {cos_lr}")
+            log_callback(f"  - LR0: {lr0}, Cosine LR: {cos_lr}, AMP: {amp}")
             log_callback(f"  - Augmentation: {augment}")
             if augment:
                 log_callback(f"    - Degrees: {degrees}, FlipLR: {fliplr}, Mosaic: {mosaic}")
@@ -118,7 +227,7 @@ class YOLOTrainer:
             log_callback(f"🚀 開始訓練 {epochs} 個 epochs...")
 
         try:
-            results = self.model.train(
+            self.model.train(
                 data=data_yaml,
                 epochs=epochs,
                 batch=batch,
@@ -131,6 +240,9 @@ class YOLOTrainer:
                 cos_lr=cos_lr,
                 rect=rect,
                 cache=cache,
+                amp=amp,
+                close_mosaic=close_mosaic,
+                deterministic=deterministic,
                 degrees=degrees,
                 fliplr=fliplr,
                 mosaic=mosaic,
@@ -140,24 +252,14 @@ class YOLOTrainer:
                 verbose=True
             )
 
-            save_dir = str(results.save_dir)
+            # DDP 多卡訓練時 train() 在父行程回傳 None（指標只存在於子行程），
+            # 儲存目錄改由 trainer 取得
+            save_dir = str(self.model.trainer.save_dir)
 
             if log_callback:
                 log_callback(f"✅ 訓練完成！")
                 log_callback(f"📁 結果儲存在: {save_dir}")
 
-            # 匯出 ONNX（根據會議共識，支援多格式）
-            try:
-                if log_callback:
-                    log_callback(f"📦 匯出 ONNX 格式...")
-                self.model.export(format='onnx')
-                if log_callback:
-                    log_callback(f"✅ ONNX 匯出完成")
-            except Exception as e:
-                logger.error(f"ONNX 匯出失敗: {e}")
-                if log_callback:
-                    log_callback(f"⚠️ ONNX 匯出失敗: {e}")
-
             return save_dir
 
         except Exception as e:
@@ -166,8 +268,168 @@ class YOLOTrainer:
                 log_callback(f"❌ 訓練失敗: {e}")
             raise
 
+    def _export_models(
+        self,
+        config: Dict[str, Any],
+        data_yaml: Optional[str],
+        imgsz: int,
+        log_callback: Optional[Callable[[str], None]] = None
+    ) -> List[str]:
+        """
+        依 export_formats 匯出部署模型
+
+        TensorRT (engine) 與 OpenVINO 以 INT8 匯出，並使用 data.yaml 驗證集做校正；
+        INT8 失敗時退回 FP16。engine 以 dynamic batch（上限 16）匯出，可用於批次推論。
+        ONNX 匯出時會以 onnx-simplifier 簡化計算圖。
+
+        Args:
+            config: 訓練配置字典
+            data_yaml: data.yaml 路徑（INT8 校正用）
+            imgsz: 圖片尺寸
+            log_callback: 日誌回調
+
+        Returns:
+            List[str]: 成功匯出的檔案路徑
+        """
+        export_formats = config.get('export_formats', ['onnx', 'engine', 'openvino'])
+        half = config.get('export_half', True)
+        exported = []
+
+        for fmt in export_formats:
+            if log_callback:
+                log_callback(f"📦 匯出 {fmt.upper()} 格式...")
+
+            if fmt == 'engine':
+                attempts = [
+                    {'int8': True, 'data': data_yaml, 'imgsz': imgsz, 'workspace': 4, 'dynamic': True, 'batch': 16},
+                    {'half': True, 'imgsz': imgsz, 'workspace': 4, 'dynamic': True, 'batch': 16},
+                ]
+            elif fmt == 'openvino':
+                attempts = [
+                    {'int8': True, 'data': data_yaml, 'imgsz': imgsz},
+                    {'half': True, 'imgsz': imgsz},
+                ]
+            elif fmt == 'onnx':
+                attempts = [{'half': half, 'dynamic': True, 'simplify': True}]
+            else:
+                attempts = [{'half': half}]
+
+            for i, kwargs in enumerate(attempts):
+                try:
+                    path = self.model.export(format=fmt, **kwargs)
+                    exported.append(str(path))
+                    if log_callback:
+                        log_callback(f"✅ {fmt.upper()} 匯出完成: {path}")
+                    break
+                except Exception as e:
+                    logger.error(f"{fmt.upper()} 匯出失敗 ({kwargs}): {e}")
+                    if log_callback:
+                        if i + 1 < len(attempts):
+                            log_callback(f"⚠️ {fmt.upper()} INT8 匯出失敗，改用 FP16: {e}")
+                        else:
+                            log_callback(f"⚠️ {fmt.upper()} 匯出失敗: {e}")
+
+        return exported
+
+    def _select_cache_mode(self, data_yaml: Optional[str]) -> str:
+        """
+        依資料集大小選擇影像快取模式
+
+        資料集小於可用記憶體一半時使用 'ram'，否則使用 'disk'
+
+        Args:
+            data_yaml: data.yaml 路徑
+
+        Returns:
+            str: 'ram' 或 'disk'
+        """
+        try:
+            import yaml
+            import psutil
+
+            with open(data_yaml, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f)
+
+            dataset_size = 0
+            for split in ('train', 'val'):
+                split_path = data.get(split)
+                if not split_path or not os.path.isdir(split_path):
+                    continue
+                for root, _, files in os.walk(split_path):
+                    for name in files:
+                        dataset_size += os.path.getsize(os.path.join(root, name))
+
+            available = psutil.virtual_memory().available
+            return 'ram' if dataset_size < available * 0.5 else 'disk'
+
+        except Exception as e:
+            logger.warning(f"無法估算資料集大小，改用磁碟快取: {e}")
+            return 'disk'
+
+    def _auto_batch_size(self, device: Optional[str], imgsz: int, amp: bool) -> int:
+        """
+        使用 Ultralytics autobatch 找出可用 80% GPU 記憶體的最大批次
+
+        autobatch 只在模型所在裝置上量測（模型在 CPU 時直接回傳預設值），
+        因此先將模型副本移到目標的第一張 GPU 再量測；DDP 時 batch 為所有 GPU 的總和，
+        結果乘以 GPU 數。CPU / MPS 或計算失敗時退回 8
+
+        Args:
+            device: YOLO 裝置字串
+            imgsz: 圖片尺寸
+            amp: 是否啟用 AMP
+
+        Returns:
+            int: 批次大小
+        """
+        default_batch = 8
+
+        if device in ('cpu', 'mps'):
+            return default_batch
+
+        try:
+            import copy
+            import torch
+            if not torch.cuda.is_available():
+                return default_batch
+
+            from ultralytics.utils.autobatch import check_train_batch_size
+
+            gpu_ids = device.split(',') if device else ['0']
+            probe = copy.deepcopy(self.model.model).to(f"cuda:{gpu_ids[0]}")
+            try:
+                per_gpu = int(check_train_batch_size(probe, imgsz=imgsz, amp=amp, batch=0.8))
+            finally:
+                del probe
+                torch.cuda.empty_cache()
+
+            return per_gpu * len(gpu_ids)
+
+        except Exception as e:
+            logger.warning(f"自動批次大小計算失敗，使用預設值 {default_batch}: {e}")
+            return default_batch
+
     def _map_device(self, device_str: str) -> Optional[str]:
-        """映射裝置字串到 YOLO 格式"""
+        """
+        映射裝置字串到 YOLO 格式
+
+        支援 GPU 索引清單（如 '0,1,2,3'）啟用 DDP 多卡訓練，
+        'auto-ddp' 則使用所有可用 GPU
+        """
+        device_str = device_str.strip().lower()
+
+        # GPU 索引（單卡 '1' 或多卡 '0,1'）直接交給 YOLO
+        if re.fullmatch(r'\d+(,\d+)*', device_str):
+            return device_str
+
+        if device_str == 'auto-ddp':
+            try:
+                import torch
+                count = torch.cuda.device_count()
+            except ImportError:
+                count = 0
+            return ','.join(str(i) for i in range(count)) if count else None
+
         device_map = {
             'cpu': 'cpu',
             'gpu': '0',
@@ -175,7 +437,7 @@ class YOLOTrainer:
             'mps': 'mps',
             'auto': None
         }
-        return device_map.get(device_str.lower(), None)
+        return device_map.get(device_str, None)
 
     def _get_base_model(self, version: str) -> str:
         """根據版本選擇預訓練模型"""
@@ -187,6 +449,163 @@ class YOLOTrainer:
         return model_map.get(version.lower(), 'yolo11n.pt')
 
 
+def export_models(save_dir: str, config: Dict[str, Any]) -> List[str]:
+    """
+    匯出訓練完成的模型（RQ worker 函數）
+
+    於訓練結束後以獨立任務執行，讓訓練 worker 不必等待匯出完成
+
+    Args:
+        save_dir: 訓練結果儲存目錄
+        config: 訓練配置字典
+
+    Returns:
+        List[str]: 成功匯出的檔案路徑
+    """
+    weights = os.path.join(save_dir, 'weights', 'best.pt')
+    if not os.path.exists(weights):
+        raise FileNotFoundError(f"模型檔案不存在: {weights}")
+
+    def log_callback(message: str):
+        logger.info(f"[export] {message}")
+
+    trainer = YOLOTrainer()
+    trainer.model = YOLO(weights)
+
+    return trainer._export_models(
+        config,
+        config.get('data_yaml'),
+        config.get('img_size', 640),
+        log_callback
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _cuda_available() -> bool:
+    """
+    檢查是否可使用 CUDA（結果快取）
+
+    Returns:
+        bool: 是否有可用的 CUDA GPU
+    """
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+@functools.lru_cache(maxsize=4)
+def _load_model(model_path: str, mtime: float) -> Tuple[YOLO, threading.Lock]:
+    """
+    載入並預熱 YOLO 模型（行程內快取）
+
+    以 (路徑, 修改時間) 為快取鍵，檔案更新後會重新載入。
+    載入後先以空白影像推論一次，初始化 CUDA context 與 cuDNN autotuner。
+    同一模型實例由多個執行緒共用（批次預測 API、串流服務），
+    Ultralytics predictor 保存每次呼叫的狀態，推論時需持有一同快取的鎖
+
+    Args:
+        model_path: 模型檔案路徑
+        mtime: 模型檔案修改時間
+
+    Returns:
+        Tuple[YOLO, threading.Lock]: (已預熱的模型, 推論鎖)
+    """
+    try:
+        import torch
+        torch.backends.cudnn.benchmark = True
+        # Ampere 以上 GPU 允許 TF32 矩陣乘法
+        if torch.cuda.is_available() and torch.cuda.get_device_capability()[0] >= 8:
+            torch.set_float32_matmul_precision('high')
+    except ImportError:
+        pass
+
+    model = YOLO(model_path)
+    try:
+        model.predict(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+    except Exception as e:
+        logger.warning(f"模型預熱失敗: {e}")
+
+    logger.info(f"載入模型: {model_path}")
+    return model, threading.Lock()
+
+
+# 匯出推論後端時持有，同行程的多個推論實例不會同時匯出同一模型
+_backend_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=16)
+def _resolve_backend(model_path: str, mtime: float) -> str:
+    """
+    依硬體選擇 .pt 模型的推論後端（行程內快取）
+
+    有 CUDA 時改用同目錄的 FP16 TensorRT engine（{stem}_serve.engine），
+    不存在時匯出一次並快取於磁碟
+    （未安裝 TensorRT 時使用 PyTorch）；
+    無 CUDA 時優先改用同目錄的 OpenVINO 模型（匯出任務產生的 INT8 模型優先），
+    其次為 ONNX；皆不存在時匯出一次 OpenVINO 模型並快取於磁碟。
+    以 (路徑, 修改時間) 為快取鍵，匯出失敗的結果（退回 .pt）同樣快取，不會每次載入都重試
+
+    Args:
+        model_path: .pt 模型檔案路徑
+        mtime: 模型檔案修改時間
+
+    Returns:
+        str: 實際載入的模型路徑
+    """
+    stem = os.path.splitext(model_path)[0]
+
+    if _cuda_available():
+        # 只使用本函式自己匯出的 engine：匯出任務的 {stem}.engine 可能是 INT8 或以訓練 imgsz 建立
+        engine_path = f"{stem}{SERVE_ENGINE_SUFFIX}.engine"
+
+        if os.path.exists(engine_path):
+            logger.info(f"推論後端: TensorRT ({engine_path})")
+            return engine_path
+
+        # Ultralytics 以 .pt 檔名決定匯出路徑，自暫存副本匯出，不覆寫匯出任務的 {stem}.engine / .onnx；
+        # 暫存檔名帶 PID，其他行程同時匯出時不會刪到彼此的檔案，完成後再原子地改名為 engine_path
+        tmp_stem = f"{stem}{SERVE_ENGINE_SUFFIX}_{os.getpid()}"
+        serve_pt = f"{tmp_stem}.pt"
+        try:
+            shutil.copy2(model_path, serve_pt)
+            # dynamic batch（上限 16）以支援 predict_batch 與串流的批次推論
+            exported = YOLO(serve_pt).export(
+                format='engine', half=True, dynamic=True, batch=16, workspace=4, imgsz=640
+            )
+            os.replace(exported, engine_path)
+            logger.info(f"推論後端: TensorRT FP16（首次載入已匯出: {engine_path}）")
+            return engine_path
+        except Exception as e:
+            logger.warning(f"TensorRT 匯出失敗，使用 PyTorch (CUDA FP16): {e}")
+            return model_path
+        finally:
+            for leftover in (serve_pt, f"{tmp_stem}.onnx", f"{tmp_stem}.engine"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(leftover)
+
+    onnx_path = f"{stem}.onnx"
+
+    # INT8 匯出的目錄為 {stem}_int8_openvino_model，FP32 / FP16 為 {stem}_openvino_model
+    for openvino_dir in (f"{stem}_int8_openvino_model", f"{stem}_openvino_model"):
+        if os.path.isdir(openvino_dir):
+            logger.info(f"推論後端: OpenVINO ({openvino_dir})")
+            return openvino_dir
+
+    if os.path.exists(onnx_path):
+        logger.info(f"推論後端: ONNX Runtime ({onnx_path})")
+        return onnx_path
+
+    try:
+        exported = YOLO(model_path).export(format='openvino')
+        logger.info(f"推論後端: OpenVINO（首次載入已匯出: {exported}）")
+        return str(exported)
+    except Exception as e:
+        logger.warning(f"OpenVINO 匯出失敗，使用 PyTorch (CPU): {e}")
+        return model_path
+
+
 class YOLOInference:
     """
     YOLO 推論引擎
@@ -197,13 +616,33 @@ class YOLOInference:
         初始化推論引擎
 
         Args:
-            model_path: 模型檔案路徑 (.pt 或 .onnx)
+            model_path: 模型檔案路徑 (.pt、.onnx 或 OpenVINO 模型目錄)
         """
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"模型檔案不存在: {model_path}")
 
-        self.model = YOLO(model_path)
-        logger.info(f"載入模型: {model_path}")
+        model_path = self._select_backend(model_path)
+        self.model, self._predict_lock = _load_model(model_path, os.path.getmtime(model_path))
+
+        # 以 PyTorch 在 CUDA 上推論時使用 FP16（TensorRT engine 已於匯出時決定精度）
+        self.half = model_path.endswith('.pt') and _cuda_available()
+
+    @staticmethod
+    def _select_backend(model_path: str) -> str:
+        """
+        依硬體選擇推論後端（.pt 以外的模型直接使用）
+
+        Args:
+            model_path: 模型檔案路徑
+
+        Returns:
+            str: 實際載入的模型路徑
+        """
+        if not model_path.endswith('.pt'):
+            return model_path
+
+        with _backend_lock:
+            return _resolve_backend(model_path, os.path.getmtime(model_path))
 
     def predict(
         self,
@@ -224,87 +663,132 @@ class YOLOInference:
         Returns:
             list: 偵測結果列表
         """
-        # 處理灰階模式
-        if use_gray and isinstance(source, str):
-            import cv2
-            img = cv2.imread(source, cv2.IMREAD_GRAYSCALE)
+        # 單張圖片路徑：自行解碼（JPEG 使用 TurboJPEG），灰階模式一併處理
+        if isinstance(source, str) and os.path.isfile(source):
+            img = self._load_image(source, use_gray)
             if img is not None:
-                source = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+                source = img
 
         # 執行推論
-        results = self.model.predict(
-            source,
-            conf=conf_threshold,
-            iou=iou_threshold,
-            verbose=False
-        )
-
-        # 格式化結果
-        formatted_results = []
-        for result in results:
-            boxes = result.boxes
-            detections = []
-
-            for box in boxes:
-                coords = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-                conf = float(box.conf[0])
-                cls_id = int(box.cls[0])
-
-                # 取得類別名稱
-                if hasattr(self.model, 'names') and self.model.names:
-                    cls_name = self.model.names[cls_id]
-                else:
-                    cls_name = str(cls_id)
-
-                detections.append({
-                    'class_id': cls_id,
-                    'class_name': cls_name,
-                    'confidence': conf,
-                    'bbox': {
-                        'x1': coords[0],
-                        'y1': coords[1],
-                        'x2': coords[2],
-                        'y2': coords[3]
-                    }
-                })
-
-            formatted_results.append({
-                'detections': detections,
-                'detection_count': len(detections)
-            })
+        with self._predict_lock:
+            results = self.model.predict(
+                source,
+                conf=conf_threshold,
+                iou=iou_threshold,
+                half=self.half,
+                verbose=False
+            )
 
-        return formatted_results
+            return [self._format_result(result) for result in results]
 
     def predict_batch(
         self,
         image_folder: str,
         conf_threshold: float = 0.25,
-        use_gray: bool = False
-    ) -> list:
+        use_gray: bool = False,
+        batch_size: int = 16
+    ) -> Iterator[Dict[str, Any]]:
         """
         批次推論資料夾中的圖片
 
+        以 batch 為單位送入模型，並以 generator 逐張產出結果，
+        記憶體用量與資料夾大小無關。每批圖片以多執行緒平行解碼
+
         Args:
             image_folder: 圖片資料夾路徑
             conf_threshold: 信心度閾值
             use_gray: 是否使用灰階模式
+            batch_size: 每批推論的圖片數
+
+        Yields:
+            Dict[str, Any]: 單張圖片的偵測結果
+        """
+        with os.scandir(image_folder) as it:
+            image_paths = [
+                entry.path
+                for entry in it
+                if entry.is_file(follow_symlinks=False)
+                and entry.name.lower().endswith(VALID_IMAGE_EXTS)
+            ]
+
+        # 解碼在 C 擴充中釋放 GIL，可用執行緒平行化
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for i in range(0, len(image_paths), batch_size):
+                chunk = image_paths[i:i + batch_size]
+                images = executor.map(lambda p: self._load_image(p, use_gray), chunk)
+
+                loaded = [(p, img) for p, img in zip(chunk, images) if img is not None]
+                if not loaded:
+                    continue
+
+                # 每批結果在持有鎖時格式化完畢，yield 期間不佔用模型
+                with self._predict_lock:
+                    predictions = self.model.predict(
+                        [img for _, img in loaded],
+                        conf=conf_threshold,
+                        batch=batch_size,
+                        half=self.half,
+                        stream=True,
+                        verbose=False
+                    )
+                    formatted = [self._format_result(result) for result in predictions]
+
+                for (img_path, _), result in zip(loaded, formatted):
+                    yield {
+                        'image_path': img_path,
+                        'result': result
+                    }
+
+    @staticmethod
+    def _load_image(image_path: str, use_gray: bool = False) -> Optional[np.ndarray]:
+        """
+        讀取圖片為 BGR 陣列
+
+        灰階模式以 broadcast 複製通道取代 cvtColor；前處理的 cv2.resize
+        需要連續記憶體，因此仍會實體化一次 H×W×3 緩衝區
+
+        Args:
+            image_path: 圖片路徑
+            use_gray: 是否使用灰階模式
 
         Returns:
-            list: 每張圖片的偵測結果
+            Optional[np.ndarray]: BGR 影像，讀取失敗時為 None
         """
-        valid_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
-        image_paths = [
-            os.path.join(image_folder, f)
-            for f in os.listdir(image_folder)
-            if os.path.splitext(f)[1].lower() in valid_exts
-        ]
+        img = decode_image(image_path, gray=use_gray)
+        if img is None or not use_gray:
+            return img
+        return np.ascontiguousarray(np.broadcast_to(img[:, :, None], (*img.shape, 3)))
 
-        results = []
-        for img_path in image_paths:
-            result = self.predict(img_path, conf_threshold, use_gray=use_gray)
-            results.append({
-                'image_path': img_path,
-                'result': result[0] if result else {'detections': [], 'detection_count': 0}
-            })
+    def _format_result(self, result) -> Dict[str, Any]:
+        """
+        格式化單張圖片的推論結果
 
-        return results
+        Args:
+            result: Ultralytics Results 物件
+
+        Returns:
+            Dict[str, Any]: 偵測結果
+        """
+        boxes = result.boxes
+
+        # 一次將整批 box 搬到 CPU，避免逐個 box 觸發 GPU 同步；
+        # 以 (N, 4) 連續陣列整批 tolist() 轉為 Python 數值，不逐元素呼叫 float()/int()
+        xyxy = boxes.xyxy.cpu().numpy().tolist()
+        confs = boxes.conf.cpu().numpy().tolist()
+        clss = boxes.cls.cpu().numpy().astype(np.int32).tolist()
+        names = getattr(self.model, 'names', None) or {}
+
+        detections = [
+            {
+                'class_id': cls_id,
+                'class_name': names.get(cls_id, str(cls_id)),
+                'confidence': conf,
+                'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
+            }
+            for (x1, y1, x2, y2), conf, cls_id in zip(xyxy, confs, clss)
+        ]
+
+        return {
+            'detections': detections,
+            'detection_count': len(detections)
+        }
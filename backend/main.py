@@ -7,12 +7,14 @@ YOLO 全端影像辨識系統 - FastAPI 主程式
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+from prometheus_client import make_asgi_app
 import logging
 import os
-from redis import Redis
 
-from models.database import init_database
+from models.database import init_database, async_engine
+from services.redis_pool import get_redis, close_pool as close_redis_pool, close_async_pool
 from routers import training, websocket, datasets, models, streaming
 
 # 配置日誌
@@ -42,11 +44,8 @@ async def lifespan(app: FastAPI):
 
     # 檢查 Redis 連線
     try:
-        redis_host = os.getenv('REDIS_HOST', 'localhost')
-        redis_port = int(os.getenv('REDIS_PORT', 6379))
-        redis_conn = Redis(host=redis_host, port=redis_port)
-        redis_conn.ping()
-        logger.info(f"✅ Redis 連線成功: {redis_host}:{redis_port}")
+        get_redis().ping()
+        logger.info("✅ Redis 連線成功")
     except Exception as e:
         logger.warning(f"⚠️  Redis 連線失敗: {e}")
         logger.warning("⚠️  訓練功能將無法使用，請確認 Redis 服務運行中")
@@ -60,9 +59,11 @@ async def lifespan(app: FastAPI):
     logger.info("🛑 關閉應用程式...")
     # 清理資源
     try:
-        if 'redis_conn' in locals():
-            redis_conn.close()
-            logger.info("✅ Redis 連線已關閉")
+        close_redis_pool()
+        await close_async_pool()
+        logger.info("✅ Redis 連線池已關閉")
+        await async_engine.dispose()
+        logger.info("✅ 資料庫連線池已關閉")
     except Exception as e:
         logger.error(f"清理資源時出錯: {e}")
 
@@ -74,7 +75,8 @@ app = FastAPI(
     title="YOLO 全端影像辨識系統",
     description="整合訓練、推論與即時串流的完整物件偵測系統",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS 設定
@@ -87,6 +89,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
@@ -121,14 +124,34 @@ app.include_router(datasets.router, prefix="/api/v1/datasets", tags=["Datasets"]
 app.include_router(models.router, prefix="/api/v1/models", tags=["Models"])
 app.include_router(streaming.router, prefix="/api/v1/streaming", tags=["Streaming"])
 
+# Prometheus 指標（資料庫連線池等）
+app.mount("/metrics", make_asgi_app())
+
 
 if __name__ == "__main__":
     import uvicorn
+
+    # DEBUG=1 時啟用熱重載（開發用，僅單一 worker）
+    debug = os.getenv('DEBUG', '0') == '1'
+
+    # 訓練在 RQ worker 執行，API 行程可水平擴充；
+    # 但串流服務狀態（攝影機、模型）保存在行程內，
+    # 多 worker 時串流的 start/ws 請求可能落在不同行程，故預設為 1
+    workers = 1 if debug else int(os.getenv('WEB_CONCURRENCY', 1))
+
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
+        host=os.getenv('API_HOST', '0.0.0.0'),
+        port=int(os.getenv('API_PORT', 8000)),
+        loop='uvloop',
+        http='httptools',
+        # 明確使用 websockets 實作並協商 permessage-deflate：
+        # 進度 JSON 鍵名重複、壓縮率高；串流 JPEG 幾乎無法壓縮，
+        # 以串流為主的部署可設 WS_PER_MESSAGE_DEFLATE=0 省下 CPU
+        ws='websockets',
+        ws_per_message_deflate=os.getenv('WS_PER_MESSAGE_DEFLATE', '1') == '1',
+        workers=workers,
+        reload=debug,
         reload_excludes=[
             "venv/*",
             "*.pyc",
@@ -138,6 +161,6 @@ if __name__ == "__main__":
             "logs/*",
             "models/*",
             "datasets/*"
-        ],
+        ] if debug else None,
         log_level="info"
     )
@@ -2,37 +2,155 @@
 資料庫配置與連線
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from prometheus_client import Counter, Gauge
+from typing import AsyncGenerator
 import os
 
 # 從環境變數讀取資料庫 URL，預設使用 SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./yolo.db")
 
-# 建立引擎
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+
+def _to_async_url(url: str) -> str:
+    """
+    將同步資料庫 URL 轉換為 async 驅動 URL
+
+    Args:
+        url: 同步 URL（sqlite:/// 或 postgresql://）
+
+    Returns:
+        str: 使用 aiosqlite / asyncpg 驅動的 URL
+    """
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _to_async_url(DATABASE_URL))
+
+# 連線池設定
+# 容量估算：pool_size ≥ workers × 每個請求平均並行查詢數，
+# 突發流量由 max_overflow 吸收；pool_timeout 內取不到連線即報錯，避免請求無限等待
+# pool_pre_ping 避免使用被 Postgres idle timeout 關閉的連線，pool_recycle 定期更換連線
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+POOL_OPTIONS = {
+    "pool_size": POOL_SIZE,
+    "max_overflow": MAX_OVERFLOW,
+    "pool_timeout": POOL_TIMEOUT,
+    "pool_pre_ping": True,
+    "pool_recycle": POOL_RECYCLE,
+}
+
+# 同步引擎（RQ worker 與建表使用；連線池：訓練進度寫入與 API 讀取可並行）
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    poolclass=QueuePool,
+    **POOL_OPTIONS
+)
+
+# Async 引擎（FastAPI 路由使用，查詢不阻塞事件迴圈）
+# aiosqlite 檔案資料庫預設為 NullPool（不接受 pool_size 等參數），明確指定佇列連線池
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    **POOL_OPTIONS
 )
 
-# 建立 SessionLocal 類別
+
+# 連線池監控指標
+POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total", "連線池取出連線次數", ["engine"]
+)
+POOL_CHECKINS = Counter(
+    "db_pool_checkins_total", "連線池歸還連線次數", ["engine"]
+)
+POOL_CONNECTIONS = Counter(
+    "db_pool_connections_total", "連線池建立新連線次數", ["engine"]
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "目前被取出使用中的連線數", ["engine"]
+)
+
+
+def setup_pool_event_handlers(target_engine, name: str):
+    """
+    註冊連線池事件，將 checkout/checkin 次數輸出為 Prometheus 指標
+
+    Args:
+        target_engine: 同步 Engine（async 引擎請傳入 async_engine.sync_engine）
+        name: 指標的 engine 標籤
+    """
+    @event.listens_for(target_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        POOL_CONNECTIONS.labels(engine=name).inc()
+
+    @event.listens_for(target_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.labels(engine=name).inc()
+        POOL_CHECKED_OUT.labels(engine=name).inc()
+
+    @event.listens_for(target_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        POOL_CHECKINS.labels(engine=name).inc()
+        POOL_CHECKED_OUT.labels(engine=name).dec()
+
+
+setup_pool_event_handlers(engine, "sync")
+setup_pool_event_handlers(async_engine.sync_engine, "async")
+
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        每個新連線套用 SQLite PRAGMA
+        WAL 模式讓讀取不會被訓練進度的寫入阻塞
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.execute("PRAGMA cache_size=-65536")    # 64 MB
+        cursor.close()
+
+
+# 建立 SessionLocal 類別（同步，供 RQ worker 使用）
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 建立 AsyncSessionLocal 類別（commit 後不過期，回應序列化時不會觸發額外查詢）
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # 建立 Base 類別
 Base = declarative_base()
 
 
-def get_db():
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     資料庫依賴注入
-    使用方式: db: Session = Depends(get_db)
+    使用方式: db: AsyncSession = Depends(get_db)
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 def init_database():
@@ -2,11 +2,14 @@
 訓練任務資料庫模型
 """
 
-from sqlalchemy import Column, String, Integer, Float, DateTime, JSON, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, Float, Numeric, Boolean, DateTime, JSON, Enum as SQLEnum, Index, case, cast, true
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import column_property
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
 from .database import Base
+from .types import JSONColumn
 
 
 class TrainingStatus(str, enum.Enum):
@@ -35,7 +38,7 @@ class TrainingTask(Base):
     job_id = Column(String, nullable=True)  # RQ Job ID
 
     # 訓練配置（JSON 格式儲存）
-    config = Column(JSON, nullable=False)
+    config = Column(JSONColumn, nullable=False)
 
     # 訓練進度
     current_epoch = Column(Integer, default=0)
@@ -54,38 +57,74 @@ class TrainingTask(Base):
     completed_at = Column(DateTime(timezone=True), nullable=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # Keyset 分頁索引（created_at DESC, id DESC）
+        Index('ix_training_tasks_created_id', created_at.desc(), id.desc()),
+        # 依狀態過濾的列表與統計（status = ? ORDER BY created_at DESC, id DESC，免排序；
+        # GROUP BY status 可只掃描索引）
+        Index('ix_training_tasks_status_created', status, created_at.desc(), id.desc()),
+    )
+
+    @hybrid_property
+    def progress(self) -> int:
+        """進度百分比（整數）"""
+        if self.total_epochs and self.total_epochs > 0:
+            return int(((self.current_epoch or 0) / self.total_epochs) * 100)
+        return 0
+
+    @progress.expression
+    def progress(cls):
+        """進度百分比的 SQL 表達式（供 ORDER BY / 過濾使用）"""
+        # `/` 的結果型別為 Numeric（SQLite 上回傳 Decimal，orjson 無法序列化），轉回整數
+        return cast(
+            case(
+                (cls.total_epochs > 0, func.coalesce(cls.current_epoch, 0) * 100 / cls.total_epochs),
+                else_=0
+            ),
+            Integer
+        )
+
     def to_dict(self):
         """轉換為字典"""
-        # 從 config 中提取 dataset_id（如果存在）
-        dataset_id = self.config.get('dataset_id', '') if self.config else ''
+        return self.serialize(self)
 
-        # 計算進度百分比
-        progress_percent = 0
-        if self.total_epochs and self.total_epochs > 0:
-            progress_percent = int((self.current_epoch / self.total_epochs) * 100)
+    @staticmethod
+    def serialize(row) -> dict:
+        """
+        將 ORM 物件或同名欄位的 Core 查詢列轉換為字典
+        （列表 API 直接序列化查詢列，省去 ORM 物件建立）
+
+        Args:
+            row: TrainingTask 實例，或包含 progress 欄位的查詢列
+
+        Returns:
+            dict: API 回應格式
+        """
+        # 從 config 中提取 dataset_id（如果存在）
+        dataset_id = row.config.get('dataset_id', '') if row.config else ''
 
         return {
-            "id": self.id,
-            "task_name": self.project_name,  # 映射到 task_name
-            "model_type": self.yolo_version,  # 映射到 model_type
+            "id": row.id,
+            "task_name": row.project_name,  # 映射到 task_name
+            "model_type": row.yolo_version,  # 映射到 model_type
             "model_size": "n",  # 預設使用 n (nano) 模型
             "dataset_id": dataset_id,  # 從 config 提取
-            "yolo_version": self.yolo_version,
-            "status": self.status.value if isinstance(self.status, TrainingStatus) else self.status,
-            "job_id": self.job_id,
-            "config": self.config,
-            "progress": progress_percent,  # 轉為百分比整數
-            "current_epoch": self.current_epoch,
-            "total_epochs": self.total_epochs,
-            "current_loss": self.current_loss,  # 當前 Loss 值
-            "current_map": self.current_map,  # 當前 mAP 值
-            "best_map": self.current_map,  # 映射到 best_map (向後相容)
-            "model_path": self.model_path,
-            "save_dir": self.save_dir,
-            "error_message": self.error_message,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "yolo_version": row.yolo_version,
+            "status": row.status.value if isinstance(row.status, TrainingStatus) else row.status,
+            "job_id": row.job_id,
+            "config": row.config,
+            "progress": row.progress,  # 轉為百分比整數
+            "current_epoch": row.current_epoch,
+            "total_epochs": row.total_epochs,
+            "current_loss": row.current_loss,  # 當前 Loss 值
+            "current_map": row.current_map,  # 當前 mAP 值
+            "best_map": row.current_map,  # 映射到 best_map (向後相容)
+            "model_path": row.model_path,
+            "save_dir": row.save_dir,
+            "error_message": row.error_message,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "started_at": row.started_at.isoformat() if row.started_at else None,
+            "completed_at": row.completed_at.isoformat() if row.completed_at else None,
         }
 
 
@@ -145,6 +184,11 @@ class Model(Base):
     yolo_version = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer, nullable=True)  # bytes
+    # 檔案大小（MB，兩位小數）由資料庫於查詢時計算；
+    # PostgreSQL 只有 round(numeric, int)，先轉 Numeric，再轉回 Float 以免回傳 Decimal
+    file_size_mb = column_property(
+        cast(func.round(cast(file_size / 1048576.0, Numeric), 2), Float)
+    )
 
     # 訓練來源
     training_task_id = Column(String, nullable=True)  # 關聯的訓練任務
@@ -156,27 +200,74 @@ class Model(Base):
     recall = Column(Float, nullable=True)
 
     # 狀態
-    is_active = Column(Integer, default=0)  # 是否為當前啟用模型
+    is_active = Column(Boolean, nullable=False, default=False)  # 是否為當前啟用模型
 
     # 時間戳
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Keyset 分頁索引（created_at DESC, id DESC）
+        Index('ix_models_created_id', created_at.desc(), id.desc()),
+        # 依版本過濾的列表與統計（yolo_version = ? ORDER BY created_at DESC, id DESC，免排序）
+        Index('ix_models_version_created', yolo_version, created_at.desc(), id.desc()),
+        # 啟用模型部分唯一索引：只收錄啟用中的列，資料庫層保證至多一個啟用模型
+        Index(
+            'ux_models_active',
+            is_active,
+            unique=True,
+            sqlite_where=is_active == true(),
+            postgresql_where=is_active == true()
+        ),
+    )
+
     def to_dict(self):
         """轉換為字典"""
+        return self.serialize(self)
+
+    @staticmethod
+    def serialize(row) -> dict:
+        """
+        將 ORM 物件或同名欄位的 Core 查詢列轉換為字典
+
+        Args:
+            row: Model 實例或查詢列
+
+        Returns:
+            dict: API 回應格式
+        """
         return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "yolo_version": self.yolo_version,
-            "file_path": self.file_path,
-            "file_size": self.file_size,
-            "training_task_id": self.training_task_id,
+            "id": row.id,
+            "name": row.name,
+            "description": row.description,
+            "yolo_version": row.yolo_version,
+            "file_path": row.file_path,
+            "file_size": row.file_size,
+            "training_task_id": row.training_task_id,
             "metrics": {
-                "map50": self.map50,
-                "map50_95": self.map50_95,
-                "precision": self.precision,
-                "recall": self.recall,
+                "map50": row.map50,
+                "map50_95": row.map50_95,
+                "precision": row.precision,
+                "recall": row.recall,
             },
-            "is_active": bool(self.is_active),
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "is_active": row.is_active,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+
+    @staticmethod
+    def serialize_summary(row) -> dict:
+        """
+        將摘要查詢列（SUMMARY_COLUMNS）轉換為字典
+
+        Args:
+            row: Model 實例或摘要查詢列
+
+        Returns:
+            dict: ModelSummary 格式
+        """
+        return {
+            "id": row.id,
+            "name": row.name,
+            "yolo_version": row.yolo_version,
+            "is_active": row.is_active,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
         }
@@ -0,0 +1,36 @@
+"""
+自訂資料庫欄位型別
+"""
+
+from sqlalchemy import Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
+import orjson
+
+
+class CompactJSON(TypeDecorator):
+    """
+    以 orjson 序列化的 JSON 欄位
+
+    SQLite 以 TEXT 儲存，使用 orjson 編解碼（比標準 json 快且支援 numpy / datetime）；
+    PostgreSQL 改用原生 JSONB（見 JSONColumn）
+    """
+
+    impl = Text
+    cache_ok = True
+
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return orjson.dumps(value, option=self._OPTIONS).decode('utf-8')
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return orjson.loads(value)
+
+
+# PostgreSQL 使用 JSONB，其他資料庫使用 CompactJSON
+JSONColumn = CompactJSON().with_variant(JSONB(), 'postgresql')
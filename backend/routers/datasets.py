@@ -3,8 +3,9 @@
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 import logging
 
 from models.database import get_db
@@ -30,7 +31,7 @@ def get_dataset_service() -> DatasetService:
 @router.post("/", response_model=DatasetResponse, status_code=201)
 async def create_dataset(
     request: DatasetCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: DatasetService = Depends(get_dataset_service)
 ):
     """
@@ -45,7 +46,7 @@ async def create_dataset(
         DatasetResponse: 創建的資料集
     """
     try:
-        dataset = service.create_dataset(
+        dataset = await service.create_dataset(
             db=db,
             name=request.name,
             description=request.description,
@@ -66,16 +67,18 @@ async def create_dataset(
         raise HTTPException(status_code=500, detail=f"創建資料集失敗: {str(e)}")
 
 
-@router.get("/", response_model=List[DatasetResponse])
+@router.get("/", response_model=None, responses={200: {"model": List[DatasetResponse]}})
 async def list_datasets(
     limit: int = Query(50, ge=1, le=100, description="最大返回數量"),
     offset: int = Query(0, ge=0, description="偏移量"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: DatasetService = Depends(get_dataset_service)
 ):
     """
     列出所有資料集
 
+    to_dict() 即為 API 格式，直接序列化，不經 Pydantic 重新驗證
+
     Args:
         limit: 最大返回數量
         offset: 偏移量
@@ -85,14 +88,14 @@ async def list_datasets(
     Returns:
         List[DatasetResponse]: 資料集列表
     """
-    datasets = service.list_datasets(db, limit, offset)
-    return [dataset.to_dict() for dataset in datasets]
+    datasets = await service.list_datasets(db, limit, offset)
+    return ORJSONResponse([dataset.to_dict() for dataset in datasets])
 
 
 @router.get("/{dataset_id}", response_model=DatasetResponse)
 async def get_dataset(
     dataset_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: DatasetService = Depends(get_dataset_service)
 ):
     """
@@ -106,7 +109,7 @@ async def get_dataset(
     Returns:
         DatasetResponse: 資料集資訊
     """
-    dataset = service.get_dataset(db, dataset_id)
+    dataset = await service.get_dataset(db, dataset_id)
 
     if not dataset:
         raise HTTPException(status_code=404, detail=f"資料集不存在: {dataset_id}")
@@ -117,7 +120,7 @@ async def get_dataset(
 @router.get("/{dataset_id}/details", response_model=DatasetDetails)
 async def get_dataset_details(
     dataset_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: DatasetService = Depends(get_dataset_service)
 ):
     """
@@ -131,7 +134,7 @@ async def get_dataset_details(
     Returns:
         DatasetDetails: 資料集詳細資訊
     """
-    details = service.get_dataset_details(db, dataset_id)
+    details = await service.get_dataset_details(db, dataset_id)
 
     if not details:
         raise HTTPException(status_code=404, detail=f"資料集不存在: {dataset_id}")
@@ -143,7 +146,7 @@ async def get_dataset_details(
 async def update_dataset(
     dataset_id: str,
     request: DatasetUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: DatasetService = Depends(get_dataset_service)
 ):
     """
@@ -158,7 +161,7 @@ async def update_dataset(
     Returns:
         DatasetResponse: 更新後的資料集
     """
-    dataset = service.update_dataset(
+    dataset = await service.update_dataset(
         db=db,
         dataset_id=dataset_id,
         name=request.name,
@@ -175,7 +178,7 @@ async def update_dataset(
 async def delete_dataset(
     dataset_id: str,
     delete_files: bool = Query(False, description="是否同時刪除檔案"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: DatasetService = Depends(get_dataset_service)
 ):
     """
@@ -190,7 +193,7 @@ async def delete_dataset(
     Returns:
         dict: 操作結果
     """
-    success = service.delete_dataset(db, dataset_id, delete_files)
+    success = await service.delete_dataset(db, dataset_id, delete_files)
 
     if not success:
         raise HTTPException(status_code=404, detail=f"資料集不存在: {dataset_id}")
@@ -206,7 +209,7 @@ async def delete_dataset(
 async def generate_data_yaml(
     dataset_id: str,
     request: GenerateYamlRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: DatasetService = Depends(get_dataset_service)
 ):
     """
@@ -222,7 +225,7 @@ async def generate_data_yaml(
         GenerateYamlResponse: YAML 檔案路徑
     """
     try:
-        yaml_path = service.generate_data_yaml(
+        yaml_path = await service.generate_data_yaml(
             db=db,
             dataset_id=dataset_id,
             output_path=request.output_path
@@ -244,9 +247,9 @@ async def generate_data_yaml(
 @router.get("/{dataset_id}/samples")
 async def get_sample_images(
     dataset_id: str,
-    split: str = Query('train', regex='^(train|val)$', description="資料集分割"),
+    split: Literal['train', 'val'] = Query('train', description="資料集分割"),
     limit: int = Query(10, ge=1, le=100, description="最大返回數量"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: DatasetService = Depends(get_dataset_service)
 ):
     """
@@ -262,9 +265,9 @@ async def get_sample_images(
     Returns:
         dict: 樣本圖片路徑列表
     """
-    images = service.get_sample_images(db, dataset_id, split, limit)
+    images = await service.get_sample_images(db, dataset_id, split, limit)
 
-    if not images and not service.get_dataset(db, dataset_id):
+    if not images and not await service.get_dataset(db, dataset_id):
         raise HTTPException(status_code=404, detail=f"資料集不存在: {dataset_id}")
 
     return {
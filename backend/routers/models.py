@@ -2,26 +2,60 @@
 模型管理 API Router
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional
+import asyncio
+import hashlib
 import logging
+import os
+import orjson
 
 from models.database import get_db
+from models.training import Model
 from services.model_service import ModelService
+from services.dataset_service import DATASETS_BASE_PATH
+from services.pagination import encode_cursor, NEXT_CURSOR_HEADER
 from schemas.model import (
     ModelCreate,
     ModelUpdate,
     ModelResponse,
     ModelComparisonRequest,
     ModelComparisonResponse,
-    ModelStatistics
+    ModelStatistics,
+    ModelSummary,
+    BatchPredictRequest,
+    YoloVersion
 )
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def etag_response(request: Request, content: Any) -> Response:
+    """
+    以內容雜湊產生弱 ETag 的 JSON 回應
+
+    If-None-Match 相符時回傳 304，省去回應內容的傳輸
+
+    Args:
+        request: 請求物件
+        content: 回應內容（可被 orjson 序列化）
+
+    Returns:
+        Response: 200 JSON 回應或 304
+    """
+    body = orjson.dumps(content)
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=5"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 def get_model_service() -> ModelService:
     """取得模型服務實例"""
     return ModelService()
@@ -30,7 +64,7 @@ def get_model_service() -> ModelService:
 @router.post("/", response_model=ModelResponse, status_code=201)
 async def create_model(
     request: ModelCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: ModelService = Depends(get_model_service)
 ):
     """
@@ -45,7 +79,7 @@ async def create_model(
         ModelResponse: 創建的模型
     """
     try:
-        model = service.create_model(
+        model = await service.create_model(
             db=db,
             name=request.name,
             yolo_version=request.yolo_version,
@@ -67,105 +101,163 @@ async def create_model(
         raise HTTPException(status_code=500, detail=f"創建模型失敗: {str(e)}")
 
 
-@router.get("/", response_model=List[ModelResponse])
+@router.get("/", response_model=None, responses={200: {"model": List[ModelResponse]}})
 async def list_models(
-    yolo_version: Optional[str] = Query(None, regex="^(v5|v8|v11)$", description="過濾 YOLO 版本"),
+    yolo_version: Optional[YoloVersion] = Query(None, description="過濾 YOLO 版本"),
     is_active: Optional[bool] = Query(None, description="過濾啟用狀態"),
     limit: int = Query(50, ge=1, le=100, description="最大返回數量"),
-    offset: int = Query(0, ge=0, description="偏移量"),
-    db: Session = Depends(get_db),
+    offset: int = Query(0, ge=0, description="偏移量（相容舊版，建議改用 cursor）"),
+    cursor: Optional[str] = Query(None, description="分頁游標（上一頁回應的 X-Next-Cursor header）"),
+    db: AsyncSession = Depends(get_db),
     service: ModelService = Depends(get_model_service)
 ):
     """
     列出所有模型
 
+    還有下一頁時，回應 header X-Next-Cursor 帶有下一頁的游標；
+    資料列直接序列化為 JSON，不經 ORM 物件與 Pydantic 重新驗證
+
     Args:
         yolo_version: 過濾 YOLO 版本
         is_active: 過濾啟用狀態
         limit: 最大返回數量
         offset: 偏移量
+        cursor: 分頁游標
         db: 資料庫 session
         service: 模型服務
 
     Returns:
         List[ModelResponse]: 模型列表
     """
-    models = service.list_models(db, yolo_version, is_active, limit, offset)
-    return [model.to_dict() for model in models]
+    try:
+        models = await service.list_models(db, yolo_version, is_active, limit, offset, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {}
+    if len(models) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(models[-1].created_at, models[-1].id)
+
+    return ORJSONResponse([Model.serialize(row) for row in models], headers=headers)
+
+
+@router.get("/summary", response_model=None, responses={200: {"model": List[ModelSummary]}})
+async def list_models_summary(
+    yolo_version: Optional[YoloVersion] = Query(None, description="過濾 YOLO 版本"),
+    is_active: Optional[bool] = Query(None, description="過濾啟用狀態"),
+    limit: int = Query(50, ge=1, le=100, description="最大返回數量"),
+    offset: int = Query(0, ge=0, description="偏移量（相容舊版，建議改用 cursor）"),
+    cursor: Optional[str] = Query(None, description="分頁游標（上一頁回應的 X-Next-Cursor header）"),
+    db: AsyncSession = Depends(get_db),
+    service: ModelService = Depends(get_model_service)
+):
+    """
+    列出模型摘要（id、名稱、版本、啟用狀態、創建時間）
+
+    供下拉選單等只需基本欄位的畫面使用，分頁方式與列出模型相同
+
+    Args:
+        yolo_version: 過濾 YOLO 版本
+        is_active: 過濾啟用狀態
+        limit: 最大返回數量
+        offset: 偏移量
+        cursor: 分頁游標
+        db: 資料庫 session
+        service: 模型服務
+
+    Returns:
+        List[ModelSummary]: 模型摘要列表
+    """
+    try:
+        models = await service.list_models_summary(db, yolo_version, is_active, limit, offset, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {}
+    if len(models) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(models[-1].created_at, models[-1].id)
+
+    return ORJSONResponse([Model.serialize_summary(row) for row in models], headers=headers)
 
 
 @router.get("/active", response_model=ModelResponse)
 async def get_active_model(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     service: ModelService = Depends(get_model_service)
 ):
     """
-    取得當前啟用的模型
+    取得當前啟用的模型（支援 ETag / If-None-Match）
 
     Args:
+        request: 請求物件
         db: 資料庫 session
         service: 模型服務
 
     Returns:
         ModelResponse: 啟用的模型
     """
-    model = service.get_active_model(db)
+    model = await service.get_active_model_info(db)
 
     if not model:
         raise HTTPException(status_code=404, detail="尚未設定啟用模型")
 
-    return model.to_dict()
+    return etag_response(request, model)
 
 
 @router.get("/statistics", response_model=ModelStatistics)
 async def get_model_statistics(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     service: ModelService = Depends(get_model_service)
 ):
     """
-    取得模型統計資訊
+    取得模型統計資訊（支援 ETag / If-None-Match）
 
     Args:
+        request: 請求物件
         db: 資料庫 session
         service: 模型服務
 
     Returns:
         ModelStatistics: 統計資訊
     """
-    stats = service.get_model_statistics(db)
-    return stats
+    stats = await service.get_model_statistics(db)
+    return etag_response(request, stats)
 
 
 @router.get("/{model_id}", response_model=ModelResponse)
 async def get_model(
     model_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     service: ModelService = Depends(get_model_service)
 ):
     """
-    取得模型資訊
+    取得模型資訊（支援 ETag / If-None-Match）
 
     Args:
         model_id: 模型 ID
+        request: 請求物件
         db: 資料庫 session
         service: 模型服務
 
     Returns:
         ModelResponse: 模型資訊
     """
-    model = service.get_model(db, model_id)
+    model = await service.get_model(db, model_id)
 
     if not model:
         raise HTTPException(status_code=404, detail=f"模型不存在: {model_id}")
 
-    return model.to_dict()
+    return etag_response(request, model.to_dict())
 
 
 @router.patch("/{model_id}", response_model=ModelResponse)
 async def update_model(
     model_id: str,
     request: ModelUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: ModelService = Depends(get_model_service)
 ):
     """
@@ -180,7 +272,7 @@ async def update_model(
     Returns:
         ModelResponse: 更新後的模型
     """
-    model = service.update_model(
+    model = await service.update_model(
         db=db,
         model_id=model_id,
         name=request.name,
@@ -201,7 +293,7 @@ async def update_model(
 async def delete_model(
     model_id: str,
     delete_file: bool = Query(False, description="是否同時刪除檔案"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: ModelService = Depends(get_model_service)
 ):
     """
@@ -216,7 +308,7 @@ async def delete_model(
     Returns:
         dict: 操作結果
     """
-    success = service.delete_model(db, model_id, delete_file)
+    success = await service.delete_model(db, model_id, delete_file)
 
     if not success:
         raise HTTPException(status_code=404, detail=f"模型不存在: {model_id}")
@@ -231,7 +323,7 @@ async def delete_model(
 @router.post("/{model_id}/activate", response_model=ModelResponse)
 async def activate_model(
     model_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: ModelService = Depends(get_model_service)
 ):
     """
@@ -245,7 +337,7 @@ async def activate_model(
     Returns:
         ModelResponse: 啟用的模型
     """
-    model = service.set_active_model(db, model_id)
+    model = await service.set_active_model(db, model_id)
 
     if not model:
         raise HTTPException(status_code=404, detail=f"模型不存在: {model_id}")
@@ -253,15 +345,73 @@ async def activate_model(
     return model.to_dict()
 
 
-@router.post("/compare", response_model=ModelComparisonResponse)
+@router.post("/{model_id}/predict-batch")
+async def predict_batch(
+    model_id: str,
+    request: BatchPredictRequest,
+    db: AsyncSession = Depends(get_db),
+    service: ModelService = Depends(get_model_service)
+):
+    """
+    以指定模型推論資料夾中的所有圖片
+
+    以 NDJSON 串流回傳，每行為一張圖片的偵測結果。
+    圖片資料夾需位於資料集目錄內；模型載入（首次可能需匯出 TensorRT / OpenVINO）在執行緒中進行
+
+    Args:
+        model_id: 模型 ID
+        request: 批次推論請求
+        db: 資料庫 session
+        service: 模型服務
+
+    Returns:
+        StreamingResponse: application/x-ndjson 串流
+    """
+    model = await service.get_model(db, model_id)
+
+    if not model:
+        raise HTTPException(status_code=404, detail=f"模型不存在: {model_id}")
+
+    datasets_root = os.path.realpath(DATASETS_BASE_PATH)
+    image_folder = os.path.realpath(request.image_folder)
+    if os.path.commonpath([datasets_root, image_folder]) != datasets_root:
+        raise HTTPException(status_code=403, detail=f"圖片資料夾必須位於資料集目錄內: {request.image_folder}")
+
+    if not os.path.isdir(image_folder):
+        raise HTTPException(status_code=400, detail=f"圖片資料夾不存在: {request.image_folder}")
+
+    try:
+        from engines.yolo_trainer import YOLOInference
+        inference = await asyncio.to_thread(YOLOInference, model.file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"模型檔案不存在: {model.file_path}")
+    except Exception as e:
+        logger.error(f"載入模型失敗: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"載入模型失敗: {str(e)}")
+
+    def ndjson():
+        for item in inference.predict_batch(
+            image_folder,
+            conf_threshold=request.conf_threshold,
+            use_gray=request.use_gray,
+            batch_size=request.batch_size
+        ):
+            yield orjson.dumps(item) + b'\n'
+
+    return StreamingResponse(ndjson(), media_type='application/x-ndjson')
+
+
+@router.post("/compare", response_model=None, responses={200: {"model": ModelComparisonResponse}})
 async def compare_models(
     request: ModelComparisonRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: ModelService = Depends(get_model_service)
 ):
     """
     比較多個模型的效能
 
+    比較結果已由服務層以 model_construct 建立，直接序列化，不再經 response_model 重新驗證
+
     Args:
         request: 模型比較請求
         db: 資料庫 session
@@ -270,15 +420,13 @@ async def compare_models(
     Returns:
         ModelComparisonResponse: 模型比較結果
     """
-    comparison = service.compare_models(db, request.model_ids)
+    comparison = await service.compare_models(db, request.model_ids)
 
     if not comparison:
         raise HTTPException(status_code=404, detail="找不到指定的模型")
 
-    return {
-        "models": comparison,
-        "count": len(comparison)
-    }
+    response = ModelComparisonResponse.model_construct(models=comparison, count=len(comparison))
+    return ORJSONResponse(response.model_dump())
 
 
 @router.get("/scan-files")
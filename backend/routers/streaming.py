@@ -3,11 +3,12 @@
 """
 
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
 import logging
 import asyncio
 
 from services.streaming_service import get_streaming_service
+from routers.websocket import dumps_message
 from schemas.streaming import (
     StreamingConfig,
     StreamingUpdateConfig,
@@ -17,6 +18,9 @@ from schemas.streaming import (
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# MJPEG multipart 邊界
+MJPEG_BOUNDARY = "frame"
+
 
 @router.post("/start", response_model=StreamingStatus)
 async def start_streaming(config: StreamingConfig):
@@ -133,12 +137,51 @@ async def update_streaming_config(config: StreamingUpdateConfig):
         raise HTTPException(status_code=500, detail=f"更新配置失敗: {str(e)}")
 
 
+@router.get("/mjpeg")
+async def mjpeg_streaming():
+    """
+    MJPEG 串流端點
+
+    以 multipart/x-mixed-replace 連續送出已繪製偵測框的 JPEG 畫面，
+    可直接作為 <img> 的 src 顯示；偵測結果請使用 WebSocket 端點
+
+    Returns:
+        StreamingResponse: MJPEG 串流
+
+    Raises:
+        HTTPException: 串流未啟動
+    """
+    service = get_streaming_service()
+
+    if not service.is_streaming:
+        raise HTTPException(status_code=400, detail="串流未啟動，請先啟動串流")
+
+    async def frames():
+        async for frame_jpeg, _ in service.stream_generator():
+            if not frame_jpeg:
+                continue
+            yield (
+                b"--" + MJPEG_BOUNDARY.encode() + b"\r\n"
+                b"Content-Type: image/jpeg\r\n"
+                b"Content-Length: " + str(len(frame_jpeg)).encode() + b"\r\n\r\n"
+                + frame_jpeg + b"\r\n"
+            )
+
+    return StreamingResponse(
+        frames(),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
 @router.websocket("/ws")
 async def websocket_streaming(websocket: WebSocket):
     """
     串流 WebSocket 端點
 
-    即時推送偵測結果與畫面
+    即時推送偵測結果與畫面：
+    - 文字訊框 {"type": "frame", "data": {...}}：偵測結果
+    - 緊接的二進位訊框：該幀的 JPEG 畫面
 
     Args:
         websocket: WebSocket 連線
@@ -149,35 +192,37 @@ async def websocket_streaming(websocket: WebSocket):
 
     try:
         # 發送連線成功訊息
-        await websocket.send_json({
+        await websocket.send_text(dumps_message({
             "type": "connected",
             "message": "已連線到串流"
-        })
+        }))
 
         # 檢查是否正在串流
         if not service.is_streaming:
-            await websocket.send_json({
+            await websocket.send_text(dumps_message({
                 "type": "error",
                 "message": "串流未啟動，請先啟動串流"
-            })
+            }))
             await websocket.close()
             return
 
         # 串流循環
-        async for frame_data in service.stream_generator():
+        async for frame_jpeg, frame_data in service.stream_generator():
             try:
-                # 推送畫面與偵測結果
-                await websocket.send_json({
+                # 偵測結果以文字訊框送出，畫面以二進位 JPEG 訊框送出（不經 Base64）
+                await websocket.send_text(dumps_message({
                     "type": "frame",
                     "data": frame_data
-                })
+                }))
+                if frame_jpeg:
+                    await websocket.send_bytes(frame_jpeg)
 
                 # 檢查是否還在串流
                 if not service.is_streaming:
-                    await websocket.send_json({
+                    await websocket.send_text(dumps_message({
                         "type": "stopped",
                         "message": "串流已停止"
-                    })
+                    }))
                     break
 
             except WebSocketDisconnect:
@@ -186,10 +231,10 @@ async def websocket_streaming(websocket: WebSocket):
 
             except Exception as e:
                 logger.error(f"推送畫面失敗: {e}")
-                await websocket.send_json({
+                await websocket.send_text(dumps_message({
                     "type": "error",
                     "message": f"推送畫面失敗: {str(e)}"
-                })
+                }))
                 break
 
     except WebSocketDisconnect:
@@ -198,10 +243,10 @@ async def websocket_streaming(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket 錯誤: {e}", exc_info=True)
         try:
-            await websocket.send_json({
+            await websocket.send_text(dumps_message({
                 "type": "error",
                 "message": f"串流錯誤: {str(e)}"
-            })
+            }))
         except:
             pass
 
@@ -2,34 +2,26 @@
 訓練任務管理 API Router
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Body, HTTPException, Depends, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 import logging
 from redis import Redis
 
 from models.database import get_db
 from models.training import TrainingTask, TrainingStatus
 from services.training_service import TrainingService
+from services.pagination import encode_cursor, NEXT_CURSOR_HEADER
+from services.redis_pool import get_redis, get_async_redis
+from services.training_events import read_live_progress
 from schemas.training import TrainingConfig, TrainingTaskResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-
-def get_redis() -> Redis:
-    """取得 Redis 連線"""
-    from redis import Redis
-    import os
-
-    redis_host = os.getenv('REDIS_HOST', 'localhost')
-    redis_port = int(os.getenv('REDIS_PORT', 6379))
-
-    return Redis(
-        host=redis_host,
-        port=redis_port,
-        decode_responses=False
-    )
+# 單次批次建立的任務數上限
+MAX_BATCH_TASKS = 50
 
 
 def get_training_service(redis: Redis = Depends(get_redis)) -> TrainingService:
@@ -37,22 +29,24 @@ def get_training_service(redis: Redis = Depends(get_redis)) -> TrainingService:
     return TrainingService(redis)
 
 
-@router.post("/start", response_model=TrainingTaskResponse)
+@router.post("/start", response_model=TrainingTaskResponse, status_code=202)
 async def start_training(
     config: TrainingConfig,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
     service: TrainingService = Depends(get_training_service)
 ):
     """
     啟動訓練任務
 
     根據會議共識：
-    1. 驗證資料集與模型路徑
-    2. 建立任務記錄 (DB)
-    3. 推送到 RQ 隊列（不阻塞）
+    1. 驗證資料集
+    2. 建立任務記錄 (DB)，立即回應 202 與 pending 狀態的任務
+    3. 回應後於背景檢查 data.yaml 並推送到 RQ 隊列（失敗時任務轉為 failed）
 
     Args:
         config: 訓練配置
+        background_tasks: FastAPI 背景任務
         db: 資料庫 session
         service: 訓練服務
 
@@ -61,29 +55,69 @@ async def start_training(
     """
     try:
         # 將 Pydantic 模型轉為字典
-        config_dict = config.dict()
+        config_dict = config.model_dump()
 
         # 創建訓練任務
-        task = service.create_training_task(db, config_dict)
-
-        logger.info(f"✅ 訓練任務已創建: {task.id}")
-
-        return task.to_dict()
+        task = await service.create_training_task(db, config_dict)
 
     except Exception as e:
         logger.error(f"創建訓練任務失敗: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"創建訓練任務失敗: {str(e)}")
 
+    background_tasks.add_task(service.enqueue_training_task, task.id, task.config)
+
+    return task.to_dict()
+
+
+@router.post("/start/batch", response_model=List[TrainingTaskResponse], status_code=202)
+async def start_training_batch(
+    background_tasks: BackgroundTasks,
+    configs: List[TrainingConfig] = Body(..., min_length=1, max_length=MAX_BATCH_TASKS),
+    db: AsyncSession = Depends(get_db),
+    service: TrainingService = Depends(get_training_service)
+):
+    """
+    批次啟動訓練任務（如超參數掃描）
+
+    所有任務於同一交易中建立，回應後以單一 Redis pipeline 推送到 RQ 隊列
+
+    Args:
+        background_tasks: FastAPI 背景任務
+        configs: 訓練配置列表
+        db: 資料庫 session
+        service: 訓練服務
+
+    Returns:
+        List[TrainingTaskResponse]: 創建的訓練任務
+    """
+    try:
+        tasks = await service.create_training_tasks(db, [c.model_dump() for c in configs])
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"批次創建訓練任務失敗: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"批次創建訓練任務失敗: {str(e)}")
+
+    background_tasks.add_task(
+        service.enqueue_training_tasks,
+        [{'id': task.id, 'config': task.config} for task in tasks]
+    )
+
+    return [task.to_dict() for task in tasks]
+
 
 @router.get("/{task_id}", response_model=TrainingTaskResponse)
 async def get_training_status(
     task_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: TrainingService = Depends(get_training_service)
 ):
     """
     查詢訓練任務狀態
 
+    執行中的任務以 Redis 快照中的即時進度為準（worker 只定期將進度寫入資料庫）
+
     Args:
         task_id: 任務 ID
         db: 資料庫 session
@@ -92,18 +126,25 @@ async def get_training_status(
     Returns:
         TrainingTaskResponse: 訓練任務詳情
     """
-    task = service.get_training_task(db, task_id)
+    task = await service.get_training_task(db, task_id)
 
     if not task:
         raise HTTPException(status_code=404, detail=f"任務不存在: {task_id}")
 
-    return task.to_dict()
+    result = task.to_dict()
+
+    if task.status == TrainingStatus.RUNNING:
+        live = await read_live_progress(get_async_redis(), task_id)
+        if live:
+            result.update(live)
+
+    return result
 
 
 @router.delete("/{task_id}")
 async def stop_training(
     task_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: TrainingService = Depends(get_training_service)
 ):
     """
@@ -117,7 +158,7 @@ async def stop_training(
     Returns:
         dict: 操作結果
     """
-    success = service.stop_training_task(db, task_id)
+    success = await service.stop_training_task(db, task_id)
 
     if not success:
         raise HTTPException(status_code=400, detail=f"無法停止任務: {task_id}")
@@ -125,46 +166,49 @@ async def stop_training(
     return {"message": f"任務 {task_id} 已停止", "success": True}
 
 
-@router.get("/", response_model=List[TrainingTaskResponse])
+@router.get("/", response_model=None, responses={200: {"model": List[TrainingTaskResponse]}})
 async def list_training_tasks(
-    status: Optional[str] = Query(None, description="過濾狀態 (pending/running/completed/failed/stopped)"),
+    status: Optional[TrainingStatus] = Query(None, description="過濾狀態"),
     limit: int = Query(50, ge=1, le=100, description="最大返回數量"),
-    offset: int = Query(0, ge=0, description="偏移量"),
-    db: Session = Depends(get_db),
+    offset: int = Query(0, ge=0, description="偏移量（相容舊版，建議改用 cursor）"),
+    sort_by: Literal['created_at', 'progress'] = Query('created_at', description="排序欄位"),
+    cursor: Optional[str] = Query(None, description="分頁游標（上一頁回應的 X-Next-Cursor header，僅 created_at 排序）"),
+    db: AsyncSession = Depends(get_db),
     service: TrainingService = Depends(get_training_service)
 ):
     """
     列出所有訓練任務
 
+    以 created_at 排序且還有下一頁時，回應 header X-Next-Cursor 帶有下一頁的游標；
+    資料列直接序列化為 JSON，不經 ORM 物件與 Pydantic 重新驗證
+
     Args:
-        status: 過濾狀態（可選）
+        status: 過濾狀態（可選，無效值由 FastAPI 回應 422）
         limit: 最大返回數量
         offset: 偏移量
+        sort_by: 排序欄位 (created_at/progress)
+        cursor: 分頁游標
         db: 資料庫 session
         service: 訓練服務
 
     Returns:
         List[TrainingTaskResponse]: 訓練任務列表
     """
-    # 解析狀態
-    status_enum = None
-    if status:
-        try:
-            status_enum = TrainingStatus(status)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"無效的狀態值: {status}. 有效值: pending, running, completed, failed, stopped"
-            )
-
-    tasks = service.list_training_tasks(db, status_enum, limit, offset)
+    try:
+        tasks = await service.list_training_tasks(db, status, limit, offset, sort_by, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return [task.to_dict() for task in tasks]
+    headers = {}
+    if sort_by == 'created_at' and len(tasks) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(tasks[-1].created_at, tasks[-1].id)
+
+    return ORJSONResponse([TrainingTask.serialize(row) for row in tasks], headers=headers)
 
 
 @router.get("/stats/summary")
 async def get_training_statistics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     service: TrainingService = Depends(get_training_service)
 ):
     """
@@ -177,5 +221,5 @@ async def get_training_statistics(
     Returns:
         dict: 統計資訊
     """
-    stats = service.get_task_statistics(db)
+    stats = await service.get_task_statistics(db)
     return stats
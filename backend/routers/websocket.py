@@ -3,199 +3,384 @@ WebSocket Router for Real-time Training Progress
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
-from typing import Dict, Set
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
 import logging
 import asyncio
-import json
-from redis import Redis
+import weakref
+import orjson
+import redis.asyncio as aioredis
 
 from models.database import get_db
 from models.training import TrainingTask
+from services.redis_pool import get_async_redis
+from services.training_events import (
+    FINISHED_STATUSES,
+    progress_channel,
+    snapshot_key,
+    build_progress_message,
+    build_finished_message
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# 進度事件合併：flush 間隔（秒）與每批最大訊息數
+FLUSH_INTERVAL = 0.03
+MAX_BATCH_SIZE = 50
+
+
+def dumps_message(message: dict) -> str:
+    """以 orjson 序列化 WebSocket 訊息（維持文字訊框，前端可直接 JSON.parse）"""
+    return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+
+def batch_payload(items: List[str]) -> str:
+    """
+    合併多則已序列化的訊息
+
+    只有一則時原樣回傳，多則時組成 {"type": "batch", "items": [...]}
+
+    Args:
+        items: JSON 字串列表
+
+    Returns:
+        str: 單一訊框的 JSON 字串
+    """
+    if len(items) == 1:
+        return items[0]
+    # 訊息已是 JSON 字串，直接拼接避免重新序列化
+    return '{"type":"batch","items":[' + ','.join(items) + ']}'
+
 
 class ConnectionManager:
-    """WebSocket 連線管理器"""
+    """
+    WebSocket 連線管理器
+
+    每個有連線的任務只有一個背景轉送任務訂閱 Redis 頻道，
+    將短時間內的事件合併後廣播給所有連線，Redis 訂閱數與連線數無關。
+
+    所有操作都在同一個事件迴圈中執行，且修改連線集合時不會 await，
+    因此不需要鎖。連線以 WeakSet 保存，未正常斷線的 WebSocket 被回收時會自動移除
+    """
 
     def __init__(self):
-        # task_id -> Set[WebSocket]
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
-        self._lock = asyncio.Lock()
+        # task_id -> WeakSet[WebSocket]（已送出快照、接收廣播中的連線）
+        self.active_connections: Dict[str, weakref.WeakSet] = {}
+        # task_id -> {WebSocket: 待送訊息}（尚在送出快照，廣播先暫存以維持順序）
+        self._pending: Dict[str, Dict[WebSocket, List[str]]] = {}
+        # task_id -> 轉送任務 / 已訂閱事件 / 任務結束事件
+        self._relays: Dict[str, asyncio.Task] = {}
+        self._subscribed: Dict[str, asyncio.Event] = {}
+        self._finished: Dict[str, asyncio.Event] = {}
 
     async def connect(self, websocket: WebSocket, task_id: str):
-        """接受 WebSocket 連線"""
+        """
+        接受 WebSocket 連線並確保該任務的轉送任務已訂閱
+
+        連線先處於暫存狀態，送出快照後呼叫 activate 才開始接收廣播
+
+        Args:
+            websocket: WebSocket 連線
+            task_id: 任務 ID
+        """
         await websocket.accept()
 
-        async with self._lock:
-            if task_id not in self.active_connections:
-                self.active_connections[task_id] = set()
-            self.active_connections[task_id].add(websocket)
+        self._pending.setdefault(task_id, {})[websocket] = []
+        self._finished.setdefault(task_id, asyncio.Event())
+
+        if task_id not in self._relays:
+            self._subscribed[task_id] = asyncio.Event()
+            self._relays[task_id] = asyncio.create_task(self._relay(task_id))
+
+        # 先完成訂閱再讀取快照，避免兩者之間的更新遺失
+        await self._subscribed[task_id].wait()
+
+        logger.info(f"📡 WebSocket 連線: task_id={task_id}, 總連線數={self.get_connection_count(task_id)}")
+
+    async def activate(self, websocket: WebSocket, task_id: str):
+        """
+        快照已送出：依序補送暫存的廣播，之後直接接收廣播
+
+        Args:
+            websocket: WebSocket 連線
+            task_id: 任務 ID
+        """
+        backlog = self._pending.get(task_id, {}).get(websocket)
+        if backlog is None:
+            return
+
+        while backlog:
+            await websocket.send_text(backlog.pop(0))
+
+        # 以下不再 await，暫存清空與加入廣播之間不會有新訊息插入
+        self._discard_pending(task_id, websocket)
+        self.active_connections.setdefault(task_id, weakref.WeakSet()).add(websocket)
+
+    async def wait_finished(self, websocket: WebSocket, task_id: str):
+        """
+        等待任務結束或客戶端斷線
+
+        Args:
+            websocket: WebSocket 連線
+            task_id: 任務 ID
+        """
+        async def receive_until_disconnect():
+            while True:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.disconnect':
+                    raise WebSocketDisconnect(message.get('code', 1000))
 
-        logger.info(f"📡 WebSocket 連線: task_id={task_id}, 總連線數={len(self.active_connections[task_id])}")
+        receiver = asyncio.create_task(receive_until_disconnect())
+        finished = asyncio.create_task(self._finished[task_id].wait())
+
+        done, pending = await asyncio.wait(
+            {receiver, finished},
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in pending:
+            task.cancel()
+
+        if receiver in done:
+            receiver.result()
+
+        logger.info(f"✅ 任務 {task_id} 已完成，結束 WebSocket 推送")
 
     async def disconnect(self, websocket: WebSocket, task_id: str):
-        """移除 WebSocket 連線"""
-        async with self._lock:
-            if task_id in self.active_connections:
-                self.active_connections[task_id].discard(websocket)
-                if not self.active_connections[task_id]:
-                    del self.active_connections[task_id]
+        """移除 WebSocket 連線，最後一個連線離開時停止轉送任務"""
+        self._discard_pending(task_id, websocket)
+        self._discard(task_id, [websocket])
+
+        if not self.get_connection_count(task_id):
+            relay = self._relays.pop(task_id, None)
+            if relay:
+                relay.cancel()
+            self._subscribed.pop(task_id, None)
+            self._finished.pop(task_id, None)
 
         logger.info(f"📡 WebSocket 斷線: task_id={task_id}")
 
     async def broadcast(self, task_id: str, message: dict):
         """廣播訊息給所有訂閱該任務的客戶端"""
-        async with self._lock:
-            if task_id not in self.active_connections:
-                return
+        await self.broadcast_text(task_id, dumps_message(message))
+
+    async def broadcast_text(self, task_id: str, payload: str):
+        """
+        廣播已序列化的訊息（只序列化一次，並行送出給所有連線）
+
+        Args:
+            task_id: 任務 ID
+            payload: JSON 字串
+        """
+        for backlog in self._pending.get(task_id, {}).values():
+            backlog.append(payload)
+
+        # 取快照後再 await，迭代期間集合變動不影響
+        connections = list(self.active_connections.get(task_id, ()))
+        if not connections:
+            return
 
-            connections = list(self.active_connections[task_id])
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True
+        )
 
-        # 廣播給所有連線
         disconnected = []
-        for connection in connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"廣播失敗: {e}")
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"廣播失敗: {result}")
                 disconnected.append(connection)
 
         # 清理斷線的連線
         if disconnected:
-            async with self._lock:
-                if task_id in self.active_connections:
-                    for conn in disconnected:
-                        self.active_connections[task_id].discard(conn)
+            self._discard(task_id, disconnected)
+
+    async def _relay(self, task_id: str):
+        """
+        訂閱任務的 Redis 頻道並廣播（每個任務只有一個）
+
+        worker 發布的事件已是 JSON 字串，FLUSH_INTERVAL 內的多則事件合併為單一訊框
+
+        Args:
+            task_id: 任務 ID
+        """
+        pubsub = get_async_redis().pubsub()
+
+        try:
+            await pubsub.subscribe(progress_channel(task_id))
+            self._subscribed[task_id].set()
+
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+                if message is None:
+                    continue
+
+                await asyncio.sleep(FLUSH_INTERVAL)
+                items = [message['data']]
+                while len(items) < MAX_BATCH_SIZE:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+                    if message is None:
+                        break
+                    items.append(message['data'])
+
+                await self.broadcast_text(task_id, batch_payload(items))
+
+                if any(orjson.loads(item).get('type') == 'finished' for item in items):
+                    self._finished[task_id].set()
+                    break
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"訂閱錯誤: {e}", exc_info=True)
+            await self.broadcast(task_id, {
+                "type": "error",
+                "message": f"伺服器錯誤: {str(e)}"
+            })
+            finished = self._finished.get(task_id)
+            if finished:
+                finished.set()
+        finally:
+            # 連線仍在等待訂閱時一併放行
+            subscribed = self._subscribed.get(task_id)
+            if subscribed:
+                subscribed.set()
+            if self._relays.get(task_id) is asyncio.current_task():
+                del self._relays[task_id]
+            await pubsub.reset()
+
+    def _discard_pending(self, task_id: str, websocket: WebSocket):
+        """移除暫存狀態的連線"""
+        pending = self._pending.get(task_id)
+        if pending is None:
+            return
+
+        pending.pop(websocket, None)
+        if not pending:
+            del self._pending[task_id]
+
+    def _discard(self, task_id: str, websockets: List[WebSocket]):
+        """從任務的連線集合移除，集合為空時一併刪除"""
+        connections = self.active_connections.get(task_id)
+        if connections is None:
+            return
+
+        for websocket in websockets:
+            connections.discard(websocket)
+        if not connections:
+            del self.active_connections[task_id]
 
     def get_connection_count(self, task_id: str) -> int:
         """取得指定任務的連線數"""
-        return len(self.active_connections.get(task_id, set()))
+        return len(self.active_connections.get(task_id, ())) + len(self._pending.get(task_id, {}))
 
 
 # 全域連線管理器
 manager = ConnectionManager()
 
 
-def get_redis() -> Redis:
-    """取得 Redis 連線"""
-    import os
-    redis_host = os.getenv('REDIS_HOST', 'localhost')
-    redis_port = int(os.getenv('REDIS_PORT', 6379))
-    return Redis(host=redis_host, port=redis_port, decode_responses=True)
+async def send_initial_snapshot(
+    websocket: WebSocket,
+    task_id: str,
+    redis: aioredis.Redis,
+    db: AsyncSession
+) -> bool:
+    """
+    送出任務目前狀態的快照
+
+    優先使用 worker 寫入 Redis 的已序列化訊息，原樣轉送；
+    尚無快照（任務未開始或已過期）時才查詢資料庫。
+    取得後即釋放資料庫連線，長連線期間不佔用連線池
+
+    Args:
+        websocket: WebSocket 連線
+        task_id: 任務 ID
+        redis: 非同步 Redis 客戶端
+        db: 資料庫 session
+
+    Returns:
+        bool: 是否需要繼續推送進度（任務已結束或不存在時為 False）
+    """
+    snapshot = await redis.hgetall(snapshot_key(task_id))
+
+    if 'progress' in snapshot:
+        await db.close()
+        await websocket.send_text(snapshot['progress'])
+        if 'finished' in snapshot:
+            await websocket.send_text(snapshot['finished'])
+            logger.info(f"✅ 任務 {task_id} 已完成，結束 WebSocket 推送")
+            return False
+        return True
+
+    task = await db.get(TrainingTask, task_id)
+    await db.close()
+
+    if not task:
+        await websocket.send_text(dumps_message({
+            "type": "error",
+            "message": f"任務不存在: {task_id}"
+        }))
+        return False
 
+    await websocket.send_text(dumps_message(build_progress_message(task)))
 
-async def poll_training_progress(
+    if task.status in FINISHED_STATUSES:
+        await websocket.send_text(dumps_message(build_finished_message(task)))
+        logger.info(f"✅ 任務 {task_id} 已完成，結束 WebSocket 推送")
+        return False
+
+    return True
+
+
+async def stream_training_progress(
     websocket: WebSocket,
     task_id: str,
-    db: Session,
-    poll_interval: float = 0.5
+    db: AsyncSession
 ):
     """
-    輪詢訓練進度並推送到 WebSocket
+    推送訓練進度到 WebSocket
 
-    根據會議共識：0.5 秒節流避免過度推送
+    連線時該任務的轉送任務已完成訂閱，接著送出快照，
+    快照之後補送期間暫存的廣播，再由轉送任務持續廣播 RQ worker 發布的事件，
+    不再輪詢資料庫
 
     Args:
         websocket: WebSocket 連線
         task_id: 任務 ID
         db: 資料庫 session
-        poll_interval: 輪詢間隔（秒）
     """
-    last_epoch = None
-    last_loss = None
-    last_map = None
-    last_status = None
-
     try:
-        while True:
-            # 查詢任務狀態
-            task = db.query(TrainingTask).filter(TrainingTask.id == task_id).first()
-
-            if not task:
-                await websocket.send_json({
-                    "type": "error",
-                    "message": f"任務不存在: {task_id}"
-                })
-                break
-
-            # 檢查是否有變更（避免無意義推送）
-            has_change = (
-                last_epoch != task.current_epoch or
-                last_loss != task.current_loss or
-                last_map != task.current_map or
-                last_status != task.status.value
-            )
-
-            if has_change:
-                # 計算進度百分比
-                progress = 0
-                if task.total_epochs > 0:
-                    progress = (task.current_epoch / task.total_epochs) * 100
-
-                # 推送進度更新
-                await websocket.send_json({
-                    "type": "progress",
-                    "data": {
-                        "task_id": task.id,
-                        "status": task.status.value,
-                        "current_epoch": task.current_epoch,
-                        "total_epochs": task.total_epochs,
-                        "progress": round(progress, 2),
-                        "current_loss": task.current_loss,
-                        "current_map": task.current_map,
-                        "error_message": task.error_message
-                    }
-                })
-
-                # 更新快取
-                last_epoch = task.current_epoch
-                last_loss = task.current_loss
-                last_map = task.current_map
-                last_status = task.status.value
-
-            # 如果任務已完成或失敗，發送最終訊息並結束
-            if task.status.value in ['completed', 'failed', 'stopped']:
-                await websocket.send_json({
-                    "type": "finished",
-                    "data": {
-                        "task_id": task.id,
-                        "status": task.status.value,
-                        "model_path": task.model_path,
-                        "save_dir": task.save_dir,
-                        "error_message": task.error_message
-                    }
-                })
-                logger.info(f"✅ 任務 {task_id} 已完成，結束 WebSocket 推送")
-                break
-
-            # 等待下一次輪詢
-            await asyncio.sleep(poll_interval)
+        # 初始快照（任務已結束或不存在時直接結束）
+        if not await send_initial_snapshot(websocket, task_id, get_async_redis(), db):
+            return
+
+        await manager.activate(websocket, task_id)
+        await manager.wait_finished(websocket, task_id)
 
     except asyncio.CancelledError:
-        logger.info(f"WebSocket 輪詢被取消: {task_id}")
+        logger.info(f"WebSocket 訂閱被取消: {task_id}")
+    except WebSocketDisconnect:
+        raise
     except Exception as e:
-        logger.error(f"輪詢錯誤: {e}", exc_info=True)
-        await websocket.send_json({
+        logger.error(f"推送錯誤: {e}", exc_info=True)
+        await websocket.send_text(dumps_message({
             "type": "error",
             "message": f"伺服器錯誤: {str(e)}"
-        })
+        }))
 
 
 @router.websocket("/training/{task_id}")
 async def websocket_training_progress(
     websocket: WebSocket,
     task_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     訓練進度 WebSocket 端點
 
     根據會議共識：
     - 連線到 /ws/training/{task_id}
-    - 0.5 秒節流推送進度
+    - 由 Redis Pub/Sub 事件驅動推送進度
     - 即時推送 epoch、loss、mAP 等指標
 
     Args:
@@ -207,13 +392,13 @@ async def websocket_training_progress(
 
     try:
         # 發送連線成功訊息
-        await websocket.send_json({
+        await websocket.send_text(dumps_message({
             "type": "connected",
             "message": f"已連線到任務: {task_id}"
-        })
+        }))
 
-        # 開始輪詢進度
-        await poll_training_progress(websocket, task_id, db)
+        # 開始推送進度
+        await stream_training_progress(websocket, task_id, db)
 
     except WebSocketDisconnect:
         logger.info(f"客戶端主動斷線: {task_id}")
@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
 """
 RQ Worker 啟動腳本
-用於處理訓練任務隊列
+用於處理訓練與模型匯出隊列
 """
 
 import os
 import sys
+import signal
 import logging
-from redis import Redis
 from rq import Worker, Queue
 
+from services.redis_pool import get_redis, pool
+
 # 配置日誌
 logging.basicConfig(
     level=logging.INFO,
@@ -18,42 +20,86 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def start_worker(index: int = 0):
+    """
+    啟動單一 RQ Worker（阻塞）
+
+    Args:
+        index: Worker 編號
+    """
+    # 使用共用連線池（fork 後 redis-py 會為子行程重建連線）
+    redis_conn = get_redis()
+
+    # 建立隊列（依序處理）：第一個 Worker 優先處理模型匯出，其餘 Worker 訓練任務優先，
+    # 排隊中的訓練任務再多也不會讓匯出任務一直等待
+    names = ['export', 'training'] if index == 0 else ['training', 'export']
+    queues = [Queue(name, connection=redis_conn) for name in names]
+
+    # 建立 Worker
+    worker = Worker(
+        queues,
+        connection=redis_conn,
+        name=f"training-worker-{os.getpid()}-{index}"
+    )
+    worker.log_job_description = False
+
+    logger.info(f"🚀 Worker 啟動: {worker.name}")
+
+    # 啟動 Worker（阻塞）
+    worker.work(with_scheduler=True)
+
+
 def main():
-    """啟動 RQ Worker"""
-    # 從環境變數讀取 Redis 配置
-    redis_host = os.getenv('REDIS_HOST', 'localhost')
-    redis_port = int(os.getenv('REDIS_PORT', 6379))
+    """
+    啟動 RQ Worker
+
+    RQ_WORKERS > 1 時預先 fork 多個 Worker 並行接收任務；
+    訓練與模型匯出以 Redis 鎖序列化 GPU 使用（見 services.gpu_lock），
+    等待逾時的任務會延後重新排入隊列，不會佔住 Worker
+    """
+    redis_host = pool.connection_kwargs.get('host')
+    redis_port = pool.connection_kwargs.get('port')
+    num_workers = max(1, int(os.getenv('RQ_WORKERS', 2)))
 
     logger.info(f"🔌 連線到 Redis: {redis_host}:{redis_port}")
 
     try:
-        # 建立 Redis 連線
-        redis_conn = Redis(
-            host=redis_host,
-            port=redis_port,
-            decode_responses=False
-        )
-
         # 測試連線
-        redis_conn.ping()
+        get_redis().ping()
         logger.info("✅ Redis 連線成功")
+        logger.info(f"📋 監聽隊列: training, export（{num_workers} 個 Worker）")
+        logger.info("⏳ 等待任務...")
 
-        # 建立隊列
-        queue = Queue('training', connection=redis_conn)
-        logger.info(f"📋 監聽隊列: training")
+        if num_workers == 1:
+            start_worker()
+            return
 
-        # 建立 Worker
-        worker = Worker(
-            [queue],
-            connection=redis_conn,
-            name=f"training-worker-{os.getpid()}"
-        )
+        children = []
+        for index in range(num_workers):
+            pid = os.fork()
+            if pid == 0:
+                exit_code = 0
+                try:
+                    start_worker(index)
+                except Exception as e:
+                    logger.error(f"❌ Worker {index} 異常結束: {e}", exc_info=True)
+                    exit_code = 1
+                finally:
+                    os._exit(exit_code)
+            children.append(pid)
 
-        logger.info(f"🚀 Worker 啟動: {worker.name}")
-        logger.info("⏳ 等待任務...")
+        # 將終止訊號轉送給子行程，讓 RQ 進行 warm shutdown
+        def forward_signal(signum, frame):
+            for child in children:
+                try:
+                    os.kill(child, signum)
+                except ProcessLookupError:
+                    pass
+
+        signal.signal(signal.SIGTERM, forward_signal)
 
-        # 啟動 Worker（阻塞）
-        worker.work(with_scheduler=True)
+        for child in children:
+            os.waitpid(child, 0)
 
     except KeyboardInterrupt:
         logger.info("\n⚠️  收到中斷訊號，正在關閉 Worker...")
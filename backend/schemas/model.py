@@ -3,14 +3,17 @@
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
+# 支援的 YOLO 版本（以 Literal 驗證，不需每次執行 regex）
+YoloVersion = Literal["v5", "v8", "v11"]
+
 
 class ModelCreate(BaseModel):
     """創建模型請求"""
     name: str = Field(..., min_length=1, max_length=255, description="模型名稱")
-    yolo_version: str = Field(..., pattern="^(v5|v8|v11)$", description="YOLO 版本")
+    yolo_version: YoloVersion = Field(..., description="YOLO 版本")
     file_path: str = Field(..., description="模型檔案路徑")
     description: Optional[str] = Field(None, max_length=1000, description="模型描述")
     training_task_id: Optional[str] = Field(None, description="訓練任務 ID")
@@ -55,6 +58,15 @@ class ModelResponse(BaseModel):
         from_attributes = True
 
 
+class ModelSummary(BaseModel):
+    """模型摘要（下拉選單等只需基本欄位的列表）"""
+    id: str = Field(..., description="模型 ID")
+    name: str = Field(..., description="模型名稱")
+    yolo_version: str = Field(..., description="YOLO 版本")
+    is_active: bool = Field(..., description="是否為啟用模型")
+    created_at: Optional[str] = Field(None, description="創建時間")
+
+
 class ModelComparisonItem(BaseModel):
     """模型比較項目"""
     id: str = Field(..., description="模型 ID")
@@ -86,3 +98,11 @@ class ModelStatistics(BaseModel):
     total: int = Field(..., description="總模型數")
     by_version: Dict[str, int] = Field(..., description="各版本模型數")
     active_model_id: Optional[str] = Field(None, description="當前啟用模型 ID")
+
+
+class BatchPredictRequest(BaseModel):
+    """資料夾批次推論請求"""
+    image_folder: str = Field(..., description="圖片資料夾路徑（需位於資料集目錄內）")
+    conf_threshold: float = Field(0.25, ge=0.0, le=1.0, description="信心度閾值")
+    use_gray: bool = Field(False, description="是否使用灰階")
+    batch_size: int = Field(16, ge=1, le=256, description="每批推論的圖片數")
@@ -38,6 +38,9 @@ class StreamingStatus(BaseModel):
 
 class DetectionBBox(BaseModel):
     """偵測邊界框"""
+    # 僅作文件用途（偵測結果以 dict 產生並由 orjson 序列化），延後至首次使用才建立驗證器
+    model_config = {"defer_build": True}
+
     x1: float = Field(..., description="左上角 X")
     y1: float = Field(..., description="左上角 Y")
     x2: float = Field(..., description="右下角 X")
@@ -46,6 +49,8 @@ class DetectionBBox(BaseModel):
 
 class Detection(BaseModel):
     """偵測結果"""
+    model_config = {"defer_build": True}
+
     class_id: int = Field(..., description="類別 ID")
     class_name: str = Field(..., description="類別名稱")
     confidence: float = Field(..., description="信心度")
@@ -3,8 +3,9 @@
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from enum import Enum
+import os
 
 
 class YOLOVersion(str, Enum):
@@ -31,12 +32,16 @@ class TrainingConfig(BaseModel):
     dataset_id: str = Field(..., description="資料集 ID")
     yolo_version: YOLOVersion = Field(YOLOVersion.V11, description="YOLO 版本")
     epochs: int = Field(100, ge=10, le=300, description="訓練輪數")
-    batch_size: int = Field(8, ge=1, le=64, description="批次大小")
+    batch_size: int = Field(-1, ge=-1, le=64, description="批次大小（-1 為依 GPU 記憶體自動決定）")
     img_size: int = Field(640, ge=320, le=1280, description="圖片尺寸")
 
     # 進階設定
-    device: str = Field("auto", description="訓練裝置 (auto/cpu/gpu)")
-    workers: int = Field(4, ge=1, le=16, description="資料載入執行緒數")
+    device: str = Field("auto", description="訓練裝置 (auto/cpu/gpu/mps/auto-ddp 或 GPU 索引如 0,1)")
+    workers: int = Field(
+        default_factory=lambda: min(16, os.cpu_count() or 4),
+        ge=1, le=16,
+        description="資料載入執行緒數（預設為 CPU 核心數，上限 16）"
+    )
     optimizer: str = Field("AdamW", description="優化器")
     patience: int = Field(20, ge=5, le=100, description="Early Stopping 耐心值")
 
@@ -44,6 +49,14 @@ class TrainingConfig(BaseModel):
     lr0: float = Field(0.001, gt=0, le=1, description="初始學習率")
     cosine_lr: bool = Field(True, description="使用餘弦退火")
 
+    # 精度設定
+    amp: bool = Field(True, description="啟用 AMP 混合精度訓練")
+    export_half: bool = Field(True, description="匯出 FP16 ONNX 模型")
+    export_formats: List[str] = Field(
+        default_factory=lambda: ['onnx', 'engine', 'openvino'],
+        description="訓練後匯出格式（engine / openvino 為 INT8）"
+    )
+
     # 資料增強
     augment: bool = Field(True, description="啟用資料增強")
     degrees: float = Field(10.0, ge=0, le=360, description="旋轉角度範圍")
@@ -56,6 +69,9 @@ class TrainingConfig(BaseModel):
 
 class TrainingProgress(BaseModel):
     """訓練進度"""
+    # 執行期未使用（進度訊息由 services.training_events 產生），延後至首次使用才建立驗證器
+    model_config = {"defer_build": True}
+
     task_id: str
     status: TrainingStatus
     current_epoch: int
@@ -67,7 +83,8 @@ class TrainingProgress(BaseModel):
 
 class TrainingTask(BaseModel):
     """訓練任務完整資訊"""
-    model_config = {"protected_namespaces": ()}
+    # API 回應使用 TrainingTaskResponse
+    model_config = {"protected_namespaces": (), "defer_build": True}
 
     id: str
     config: TrainingConfig
@@ -4,5 +4,6 @@ from .training_service import TrainingService
 from .dataset_service import DatasetService
 from .model_service import ModelService
 from .streaming_service import StreamingService, get_streaming_service
+from .redis_pool import get_redis
 
-__all__ = ['TrainingService', 'DatasetService', 'ModelService', 'StreamingService', 'get_streaming_service']
+__all__ = ['TrainingService', 'DatasetService', 'ModelService', 'StreamingService', 'get_streaming_service', 'get_redis']
@@ -0,0 +1,66 @@
+"""
+Redis 查詢結果快取
+讀多寫少的查詢（啟用模型、模型統計）以 orjson 存入 Redis，寫入時主動失效
+"""
+
+import functools
+import logging
+from typing import Any, Awaitable, Callable
+
+import orjson
+
+from services.redis_pool import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# 快取鍵
+MODEL_ACTIVE_KEY = "model:active"
+MODEL_STATS_KEY = "model:stats"
+
+
+def redis_cached(key: str, ttl: int = 60):
+    """
+    非同步方法的 Redis 快取裝飾器
+
+    回傳值需可被 orjson 序列化（None 也會被快取）；
+    Redis 無法使用時直接執行原方法，不影響 API
+
+    Args:
+        key: 快取鍵
+        ttl: 存活秒數
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            redis = get_async_redis()
+
+            try:
+                cached = await redis.get(key)
+                if cached is not None:
+                    return orjson.loads(cached)
+            except Exception as e:
+                logger.warning(f"讀取快取失敗 {key}: {e}")
+
+            result = await func(*args, **kwargs)
+
+            try:
+                await redis.setex(key, ttl, orjson.dumps(result))
+            except Exception as e:
+                logger.warning(f"寫入快取失敗 {key}: {e}")
+
+            return result
+        return wrapper
+    return decorator
+
+
+async def invalidate_cache(*keys: str):
+    """
+    刪除快取鍵
+
+    Args:
+        keys: 要刪除的快取鍵
+    """
+    try:
+        await get_async_redis().delete(*keys)
+    except Exception as e:
+        logger.warning(f"清除快取失敗 {keys}: {e}")
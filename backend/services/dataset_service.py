@@ -3,29 +3,63 @@
 負責資料集的 CRUD 操作與處理
 """
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List, Dict, Any
 import uuid
 import logging
 import os
 import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 from models.training import Dataset
 from utils.dataset_utils import (
+    VALID_IMAGE_EXTS,
     split_dataset,
-    validate_dataset,
-    get_dataset_statistics,
+    collect_dataset_info,
     create_data_yaml
 )
 
 logger = logging.getLogger(__name__)
 
+# 資料集儲存根目錄（預設值；批次推論等 API 只允許存取此目錄內的檔案）
+DATASETS_BASE_PATH = "./datasets"
+
+# 資料集檔案在背景刪除：單一執行緒依序處理刪除任務，每個任務內再平行 unlink
+_delete_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dataset-delete')
+UNLINK_WORKERS = 8
+
+
+def _remove_tree(path: str):
+    """
+    刪除目錄樹：平行 unlink 所有檔案，再移除剩餘的空目錄
+
+    Args:
+        path: 目錄路徑
+    """
+    with ThreadPoolExecutor(max_workers=UNLINK_WORKERS) as pool:
+        for root, _, files in os.walk(path):
+            for name in files:
+                pool.submit(os.unlink, os.path.join(root, name))
+
+    # 離開 with 時所有 unlink 已完成；失敗的檔案交由 rmtree 重試並回報
+    shutil.rmtree(path)
+
+
+def _log_delete_result(path: str, future: Future):
+    """記錄背景刪除結果"""
+    error = future.exception()
+    if error:
+        logger.error(f"刪除資料集檔案失敗 {path}: {error}")
+    else:
+        logger.info(f"已刪除資料集檔案: {path}")
+
 
 class DatasetService:
     """資料集服務類別"""
 
-    def __init__(self, base_path: str = "./datasets", config_path: str = "./config"):
+    def __init__(self, base_path: str = DATASETS_BASE_PATH, config_path: str = "./config"):
         """
         初始化資料集服務
 
@@ -38,9 +72,9 @@ class DatasetService:
         self.config_path = Path(config_path)
         self.config_path.mkdir(parents=True, exist_ok=True)
 
-    def create_dataset(
+    async def create_dataset(
         self,
-        db: Session,
+        db: AsyncSession,
         name: str,
         description: Optional[str] = None,
         source_folder: Optional[str] = None,
@@ -73,8 +107,7 @@ class DatasetService:
                 train_count, val_count = split_dataset(
                     source_folder=source_folder,
                     output_folder=str(dataset_path),
-                    split_ratio=split_ratio,
-                    use_multiprocessing=True
+                    split_ratio=split_ratio
                 )
 
                 logger.info(f"資料集分割完成: 訓練集={train_count}, 驗證集={val_count}")
@@ -85,22 +118,28 @@ class DatasetService:
                 shutil.rmtree(dataset_path, ignore_errors=True)
                 raise
 
-        # 驗證資料集結構
-        validation_result = validate_dataset(str(dataset_path))
+        # 驗證資料集結構並取得統計資訊（單次走訪）
+        validation_result, stats = collect_dataset_info(str(dataset_path))
 
         if not validation_result['valid']:
             logger.error(f"資料集驗證失敗: {validation_result['errors']}")
             raise ValueError(f"資料集驗證失敗: {', '.join(validation_result['errors'])}")
 
-        # 獲取統計資訊
-        stats = get_dataset_statistics(str(dataset_path))
-
         # 讀取類別名稱
         classes_file = dataset_path / 'classes.txt'
         class_names = []
         if classes_file.exists():
-            with open(classes_file, 'r', encoding='utf-8') as f:
-                class_names = [line.strip() for line in f if line.strip()]
+            # 一次讀入並解碼，每行只 strip 一次
+            class_names = [
+                cls
+                for line in classes_file.read_bytes().decode('utf-8').splitlines()
+                if (cls := line.strip())
+            ]
+
+        # 資料集路徑（絕對路徑，只計算一次）
+        dataset_path_abs = os.path.abspath(dataset_path)
+        train_path_abs = os.path.join(dataset_path_abs, 'images', 'train')
+        val_path_abs = os.path.join(dataset_path_abs, 'images', 'val')
 
         # 自動生成 data.yaml 到 config 資料夾
         yaml_path_abs = None
@@ -110,10 +149,6 @@ class DatasetService:
 
             class_names_str = ','.join(class_names) if class_names else ''
 
-            # 使用絕對路徑
-            train_path_abs = os.path.abspath(str(dataset_path / 'images' / 'train'))
-            val_path_abs = os.path.abspath(str(dataset_path / 'images' / 'val'))
-
             yaml_path_abs = create_data_yaml(
                 train_path=train_path_abs,
                 val_path=val_path_abs,
@@ -130,9 +165,9 @@ class DatasetService:
             id=dataset_id,
             name=name,
             description=description,
-            path=os.path.abspath(str(dataset_path)),
-            train_path=os.path.abspath(str(dataset_path / 'images' / 'train')),
-            val_path=os.path.abspath(str(dataset_path / 'images' / 'val')),
+            path=dataset_path_abs,
+            train_path=train_path_abs,
+            val_path=val_path_abs,
             yaml_path=yaml_path_abs,
             total_images=stats['total_images'],
             total_labels=stats['total_labels'],
@@ -141,16 +176,16 @@ class DatasetService:
         )
 
         db.add(dataset)
-        db.commit()
-        db.refresh(dataset)
+        await db.commit()
+        await db.refresh(dataset)
 
         logger.info(f"✅ 資料集已創建: {dataset_id}")
 
         return dataset
 
-    def get_dataset(
+    async def get_dataset(
         self,
-        db: Session,
+        db: AsyncSession,
         dataset_id: str
     ) -> Optional[Dataset]:
         """
@@ -163,11 +198,11 @@ class DatasetService:
         Returns:
             Optional[Dataset]: 資料集或 None
         """
-        return db.query(Dataset).filter(Dataset.id == dataset_id).first()
+        return await db.get(Dataset, dataset_id)
 
-    def list_datasets(
+    async def list_datasets(
         self,
-        db: Session,
+        db: AsyncSession,
         limit: int = 50,
         offset: int = 0
     ) -> List[Dataset]:
@@ -182,15 +217,16 @@ class DatasetService:
         Returns:
             List[Dataset]: 資料集列表
         """
-        query = db.query(Dataset)
-        query = query.order_by(Dataset.created_at.desc())
-        query = query.limit(limit).offset(offset)
+        stmt = select(Dataset)
+        stmt = stmt.order_by(Dataset.created_at.desc())
+        stmt = stmt.limit(limit).offset(offset)
 
-        return query.all()
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
 
-    def update_dataset(
+    async def update_dataset(
         self,
-        db: Session,
+        db: AsyncSession,
         dataset_id: str,
         name: Optional[str] = None,
         description: Optional[str] = None
@@ -207,7 +243,7 @@ class DatasetService:
         Returns:
             Optional[Dataset]: 更新後的資料集
         """
-        dataset = self.get_dataset(db, dataset_id)
+        dataset = await self.get_dataset(db, dataset_id)
 
         if not dataset:
             logger.warning(f"資料集不存在: {dataset_id}")
@@ -218,16 +254,16 @@ class DatasetService:
         if description is not None:
             dataset.description = description
 
-        db.commit()
-        db.refresh(dataset)
+        await db.commit()
+        await db.refresh(dataset)
 
         logger.info(f"資料集已更新: {dataset_id}")
 
         return dataset
 
-    def delete_dataset(
+    async def delete_dataset(
         self,
-        db: Session,
+        db: AsyncSession,
         dataset_id: str,
         delete_files: bool = False
     ) -> bool:
@@ -242,31 +278,33 @@ class DatasetService:
         Returns:
             bool: 是否成功刪除
         """
-        dataset = self.get_dataset(db, dataset_id)
+        dataset = await self.get_dataset(db, dataset_id)
 
         if not dataset:
             logger.warning(f"資料集不存在: {dataset_id}")
             return False
 
-        # 刪除檔案
+        # 刪除檔案：先改名讓原路徑立即可重用，實際刪除在背景執行，不阻塞請求
         if delete_files and os.path.exists(dataset.path):
             try:
-                shutil.rmtree(dataset.path)
-                logger.info(f"已刪除資料集檔案: {dataset.path}")
+                trash_path = f"{dataset.path.rstrip(os.sep)}.deleting-{uuid.uuid4().hex[:8]}"
+                os.rename(dataset.path, trash_path)
+                future = _delete_executor.submit(_remove_tree, trash_path)
+                future.add_done_callback(lambda f: _log_delete_result(trash_path, f))
             except Exception as e:
                 logger.error(f"刪除資料集檔案失敗: {e}")
 
         # 刪除資料庫記錄
-        db.delete(dataset)
-        db.commit()
+        await db.delete(dataset)
+        await db.commit()
 
         logger.info(f"資料集已刪除: {dataset_id}")
 
         return True
 
-    def get_dataset_details(
+    async def get_dataset_details(
         self,
-        db: Session,
+        db: AsyncSession,
         dataset_id: str
     ) -> Optional[Dict[str, Any]]:
         """
@@ -279,16 +317,13 @@ class DatasetService:
         Returns:
             Optional[Dict[str, Any]]: 資料集詳情
         """
-        dataset = self.get_dataset(db, dataset_id)
+        dataset = await self.get_dataset(db, dataset_id)
 
         if not dataset:
             return None
 
-        # 獲取統計資訊
-        stats = get_dataset_statistics(dataset.path)
-
-        # 驗證資料集
-        validation = validate_dataset(dataset.path)
+        # 驗證資料集並取得統計資訊（單次走訪）
+        validation, stats = collect_dataset_info(dataset.path)
 
         return {
             **dataset.to_dict(),
@@ -296,9 +331,9 @@ class DatasetService:
             'validation': validation
         }
 
-    def generate_data_yaml(
+    async def generate_data_yaml(
         self,
-        db: Session,
+        db: AsyncSession,
         dataset_id: str,
         output_path: Optional[str] = None
     ) -> str:
@@ -313,7 +348,7 @@ class DatasetService:
         Returns:
             str: data.yaml 檔案路徑
         """
-        dataset = self.get_dataset(db, dataset_id)
+        dataset = await self.get_dataset(db, dataset_id)
 
         if not dataset:
             raise ValueError(f"資料集不存在: {dataset_id}")
@@ -335,9 +370,9 @@ class DatasetService:
 
         return yaml_path
 
-    def get_sample_images(
+    async def get_sample_images(
         self,
-        db: Session,
+        db: AsyncSession,
         dataset_id: str,
         split: str = 'train',
         limit: int = 10
@@ -354,21 +389,24 @@ class DatasetService:
         Returns:
             List[str]: 圖片路徑列表
         """
-        dataset = self.get_dataset(db, dataset_id)
+        dataset = await self.get_dataset(db, dataset_id)
 
         if not dataset:
             return []
 
-        image_dir = Path(dataset.path) / 'images' / split
+        # 直接使用資料表中預先存好的路徑
+        image_dir = dataset.train_path if split == 'train' else dataset.val_path
 
-        if not image_dir.exists():
+        # scandir 逐項讀取，收集到 limit 張即停止，不走訪整個資料夾
+        images = []
+        try:
+            with os.scandir(image_dir) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(VALID_IMAGE_EXTS) and entry.is_file():
+                        images.append(entry.path)
+                        if len(images) >= limit:
+                            break
+        except (FileNotFoundError, NotADirectoryError):
             return []
 
-        valid_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
-        images = [
-            str(img)
-            for img in image_dir.iterdir()
-            if img.suffix.lower() in valid_exts
-        ]
-
-        return images[:limit]
+        return images
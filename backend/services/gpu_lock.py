@@ -0,0 +1,143 @@
+"""
+訓練用 GPU 鎖
+多個 worker 並行時以 Redis 鎖序列化 GPU 使用；鎖的值為持有任務的 ID，
+任務被停止時由 worker 的 on_stopped 回調釋放，worker 異常結束時由鎖的存活時間兜底
+"""
+
+import contextlib
+import logging
+import threading
+from datetime import timedelta
+from typing import Iterator, Optional
+
+from redis import Redis
+from rq import Callback, Queue, get_current_job
+from rq.job import Job
+
+logger = logging.getLogger(__name__)
+
+# 鎖的 Redis 鍵
+GPU_LOCK_KEY = "training:gpu_lock"
+# 鎖的存活時間；持有期間由心跳執行緒續期，worker 異常結束時鎖會在此時間內過期
+GPU_LOCK_TIMEOUT = 120
+# 等待鎖的最長時間（秒）；逾時後任務延後重新排入隊列，worker 可先處理其他任務
+GPU_LOCK_WAIT = 30
+# 重新排入隊列的延遲（秒，由 RQ scheduler 排程）
+GPU_RETRY_DELAY = 30
+
+# 僅在鎖仍由指定任務持有時刪除（比對與刪除須為原子操作）
+_RELEASE_IF_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def create_gpu_lock(redis_conn: Redis):
+    """
+    建立 GPU 鎖
+
+    心跳執行緒需使用同一 token 續期，因此 token 不存於 thread-local
+
+    Args:
+        redis_conn: Redis 連線
+
+    Returns:
+        redis.lock.Lock: GPU 鎖
+    """
+    return redis_conn.lock(GPU_LOCK_KEY, timeout=GPU_LOCK_TIMEOUT, thread_local=False)
+
+
+def _renew_lock(lock, stop: threading.Event):
+    """
+    定期續期 GPU 鎖直到 stop 被設定
+
+    DDP 多卡訓練在子行程中執行，進度回調不會在 worker 中觸發，
+    因此鎖的續期不依賴訓練回調
+
+    Args:
+        lock: GPU 鎖
+        stop: 停止事件
+    """
+    while not stop.wait(GPU_LOCK_TIMEOUT / 3):
+        try:
+            lock.reacquire()
+        except Exception as e:
+            logger.warning(f"續期 GPU 鎖失敗: {e}")
+
+
+@contextlib.contextmanager
+def hold_gpu_lock(redis_conn: Redis, token: Optional[str] = None) -> Iterator[bool]:
+    """
+    在 GPU_LOCK_WAIT 秒內取得 GPU 鎖，持有期間以心跳執行緒續期，離開時釋放
+
+    Args:
+        redis_conn: Redis 連線
+        token: 鎖的值（如任務 ID，便於查看持有者）
+
+    Yields:
+        bool: 是否取得鎖（逾時為 False，此時不持有鎖）
+    """
+    lock = create_gpu_lock(redis_conn)
+    if not lock.acquire(token=token, blocking_timeout=GPU_LOCK_WAIT):
+        yield False
+        return
+
+    stop = threading.Event()
+    threading.Thread(target=_renew_lock, args=(lock, stop), daemon=True).start()
+    try:
+        yield True
+    finally:
+        stop.set()
+        try:
+            if lock.owned():
+                lock.release()
+        except Exception as e:
+            logger.warning(f"釋放 GPU 鎖失敗: {e}")
+
+
+def requeue_current_job(delay: int = GPU_RETRY_DELAY) -> Optional[Job]:
+    """
+    將目前執行中的 RQ 任務以相同參數延後重新排入原隊列（新的 Job ID）
+
+    Args:
+        delay: 延遲秒數
+
+    Returns:
+        Optional[Job]: 新排入的任務，不在 RQ worker 中執行時為 None
+    """
+    job = get_current_job()
+    if job is None:
+        return None
+
+    queue = Queue(job.origin, connection=job.connection)
+    retry = queue.enqueue_in(
+        timedelta(seconds=delay),
+        job.func_name,
+        args=job.args,
+        kwargs=job.kwargs,
+        job_timeout=job.timeout,
+        result_ttl=job.result_ttl,
+        failure_ttl=job.failure_ttl,
+        on_stopped=Callback(job.stopped_callback) if job.stopped_callback else None
+    )
+    logger.info(f"🔁 GPU 忙碌，任務 {job.id} 於 {delay} 秒後重新排入隊列: {retry.id}")
+    return retry
+
+
+def release_gpu_lock_on_stop(job: Job, connection: Redis):
+    """
+    RQ on_stopped 回調：釋放被停止的訓練任務持有的 GPU 鎖
+
+    停止指令會以 SIGKILL 結束 work horse，hold_gpu_lock 的 finally 不會執行；
+    此回調由 worker 主行程在 work horse 結束後呼叫，隊列中的訓練不必等到鎖過期。
+    僅在鎖仍由該任務持有時刪除（任務可能仍在等待鎖）
+
+    Args:
+        job: 被停止的 RQ 任務
+        connection: Redis 連線
+    """
+    task_id = job.kwargs.get('task_id', job.id)
+    if connection.eval(_RELEASE_IF_OWNER, 1, GPU_LOCK_KEY, task_id):
+        logger.info(f"🔓 已釋放任務 {task_id} 持有的 GPU 鎖")
@@ -3,17 +3,163 @@
 負責模型的 CRUD 操作與管理
 """
 
-from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Any
+from sqlalchemy import Row, case, select, true, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List, Dict, Any, Sequence, Tuple
+from operator import attrgetter, itemgetter
+import csv
+import functools
 import uuid
 import logging
 import os
 from pathlib import Path
 
 from models.training import Model
+from services.pagination import keyset_before
+from services.cache import redis_cached, invalidate_cache, MODEL_ACTIVE_KEY, MODEL_STATS_KEY
+from schemas.model import ModelComparisonItem, ModelMetrics
+from utils.checkpoint_utils import read_checkpoint_metadata
 
 logger = logging.getLogger(__name__)
 
+# 模型比較的效能指標欄位
+_METRIC_ATTRS = ('map50', 'map50_95', 'precision', 'recall')
+_get_metrics = attrgetter(*_METRIC_ATTRS)
+
+# 模型摘要列表只查詢的欄位
+SUMMARY_COLUMNS = (Model.id, Model.name, Model.yolo_version, Model.is_active, Model.created_at)
+
+# results.csv 欄位 → 指標名稱
+_RESULTS_CSV_METRICS = {
+    'metrics/mAP50(B)': 'map50',
+    'metrics/mAP50-95(B)': 'map50_95',
+    'metrics/precision(B)': 'precision',
+    'metrics/recall(B)': 'recall',
+}
+# 讀取 results.csv 結尾的位元組數（足以涵蓋最後一列）
+RESULTS_CSV_TAIL_BYTES = 4096
+
+# 模型檔案掃描目錄：(根目錄, 是否只收錄 weights/ 底下的檔案)
+MODEL_SCAN_ROOTS = (
+    ('./models', False),
+    ('./trained_models', False),
+    ('./yolo_project', True),
+    ('./runs', True),
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _inspect_checkpoint(file_path: str, mtime_ns: int, size: int) -> Tuple[Dict[str, float], str]:
+    """
+    解析模型檢查點中的訓練指標與 YOLO 版本
+
+    以 (路徑, mtime_ns, 大小) 為快取鍵：檔案未變更時不重新反序列化，
+    檔案被覆寫（如訓練中更新 best.pt）時鍵值改變而自動失效
+
+    Args:
+        file_path: 模型檔案絕對路徑
+        mtime_ns: 檔案修改時間（奈秒）
+        size: 檔案大小
+
+    Returns:
+        Tuple[Dict[str, float], str]: (指標, YOLO 版本)；呼叫端不可修改回傳的 dict
+
+    Raises:
+        ValueError: 檢查點格式無法辨識
+    """
+    try:
+        # 只解壓 data.pkl，不載入權重也不執行檢查點中的類別
+        checkpoint = read_checkpoint_metadata(file_path)
+    except Exception as e:
+        logger.warning(f"輕量解析檢查點失敗，改用 torch.load: {file_path}, 錯誤: {e}")
+        import torch
+
+        # mmap 讓張量儲存區延遲映射，只讀取 metadata 時不必將權重整個載入記憶體；
+        # Ultralytics 檢查點包含 nn.Module 物件，無法使用 weights_only
+        checkpoint = torch.load(file_path, map_location='cpu', mmap=True, weights_only=False)
+
+    if not isinstance(checkpoint, dict):
+        raise ValueError(f"無法辨識的檢查點格式: {type(checkpoint).__name__}")
+
+    metrics = {}
+
+    # 不同版本的 YOLO 儲存格式可能不同
+    # YOLOv8/v11 通常在 checkpoint 的 'metrics' 或直接在頂層
+    if 'metrics' in checkpoint and isinstance(checkpoint['metrics'], dict):
+        metrics_data = checkpoint['metrics']
+
+        # 提取各種指標
+        # mAP@0.5
+        if 'metrics/mAP50(B)' in metrics_data:
+            metrics['map50'] = float(metrics_data['metrics/mAP50(B)'])
+        elif 'metrics/mAP_0.5' in metrics_data:
+            metrics['map50'] = float(metrics_data['metrics/mAP_0.5'])
+
+        # mAP@0.5:0.95
+        if 'metrics/mAP50-95(B)' in metrics_data:
+            metrics['map50_95'] = float(metrics_data['metrics/mAP50-95(B)'])
+        elif 'metrics/mAP_0.5:0.95' in metrics_data:
+            metrics['map50_95'] = float(metrics_data['metrics/mAP_0.5:0.95'])
+
+        # Precision
+        if 'metrics/precision(B)' in metrics_data:
+            metrics['precision'] = float(metrics_data['metrics/precision(B)'])
+        elif 'precision' in metrics_data:
+            metrics['precision'] = float(metrics_data['precision'])
+
+        # Recall
+        if 'metrics/recall(B)' in metrics_data:
+            metrics['recall'] = float(metrics_data['metrics/recall(B)'])
+        elif 'recall' in metrics_data:
+            metrics['recall'] = float(metrics_data['recall'])
+
+    # 提取 YOLO 版本資訊
+    yolo_version = 'v11'  # 預設
+    if 'model' in checkpoint:
+        model_yaml = checkpoint.get('model', {})
+        if hasattr(model_yaml, 'yaml') and model_yaml.yaml:
+            yaml_content = str(model_yaml.yaml)
+            if 'yolov5' in yaml_content.lower():
+                yolo_version = 'v5'
+            elif 'yolov8' in yaml_content.lower():
+                yolo_version = 'v8'
+
+    return metrics, yolo_version
+
+
+def _read_results_csv_metrics(results_csv: str) -> Dict[str, float]:
+    """
+    讀取 Ultralytics results.csv 最後一列的指標
+
+    只讀取標題列與檔案結尾，成本與訓練 epoch 數無關
+
+    Args:
+        results_csv: results.csv 路徑
+
+    Returns:
+        Dict[str, float]: 指標（檔案沒有資料列時為空 dict）
+    """
+    with open(results_csv, 'rb') as f:
+        header_line = f.readline()
+        data_start = f.tell()
+
+        f.seek(0, os.SEEK_END)
+        f.seek(max(data_start, f.tell() - RESULTS_CSV_TAIL_BYTES))
+        rows = [line for line in f.read().decode('utf-8').splitlines() if line.strip()]
+
+    if not rows:
+        return {}
+
+    # 舊版 Ultralytics 的欄位名稱前有空白對齊
+    header = [name.strip() for name in next(csv.reader([header_line.decode('utf-8')]))]
+    last_row = dict(zip(header, next(csv.reader([rows[-1]]))))
+
+    return {
+        metric: float(last_row[column])
+        for column, metric in _RESULTS_CSV_METRICS.items()
+        if column in last_row
+    }
+
 
 class ModelService:
     """模型服務類別"""
@@ -28,9 +174,9 @@ class ModelService:
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
 
-    def create_model(
+    async def create_model(
         self,
-        db: Session,
+        db: AsyncSession,
         name: str,
         yolo_version: str,
         file_path: str,
@@ -61,10 +207,11 @@ class ModelService:
         """
         model_id = str(uuid.uuid4())
 
-        # 獲取檔案大小
-        file_size = None
-        if os.path.exists(file_path):
-            file_size = os.path.getsize(file_path)
+        # 獲取檔案大小（單次 stat，檔案不存在時為 None）
+        try:
+            file_size = os.stat(file_path).st_size
+        except OSError:
+            file_size = None
 
         # 創建資料庫記錄
         model = Model(
@@ -79,20 +226,21 @@ class ModelService:
             map50_95=map50_95,
             precision=precision,
             recall=recall,
-            is_active=0
+            is_active=False
         )
 
         db.add(model)
-        db.commit()
-        db.refresh(model)
+        await db.commit()
+        await db.refresh(model)
+        await invalidate_cache(MODEL_STATS_KEY)
 
         logger.info(f"✅ 模型已創建: {model_id}")
 
         return model
 
-    def get_model(
+    async def get_model(
         self,
-        db: Session,
+        db: AsyncSession,
         model_id: str
     ) -> Optional[Model]:
         """
@@ -105,45 +253,90 @@ class ModelService:
         Returns:
             Optional[Model]: 模型或 None
         """
-        return db.query(Model).filter(Model.id == model_id).first()
+        return await db.get(Model, model_id)
 
-    def list_models(
+    async def list_models(
         self,
-        db: Session,
+        db: AsyncSession,
         yolo_version: Optional[str] = None,
         is_active: Optional[bool] = None,
         limit: int = 50,
-        offset: int = 0
-    ) -> List[Model]:
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        columns: Optional[Sequence] = None
+    ) -> List[Row]:
         """
-        列出模型
+        列出模型（created_at、id 遞減）
+
+        以 Core 查詢取得欄位資料列，不建立 ORM 物件；
+        資料列欄位與 Model 同名，可直接交給 Model.serialize
 
         Args:
             db: 資料庫 session
             yolo_version: 過濾 YOLO 版本
             is_active: 過濾啟用狀態
             limit: 最大返回數量
-            offset: 偏移量
+            offset: 偏移量（相容舊版；提供 cursor 時忽略）
+            cursor: 上一頁回傳的分頁游標
+            columns: 只查詢的欄位（預設為全部欄位）
 
         Returns:
-            List[Model]: 模型列表
+            List[Row]: 模型資料列
+
+        Raises:
+            ValueError: 游標格式錯誤
         """
-        query = db.query(Model)
+        stmt = select(*(columns or Model.__table__.columns))
 
         if yolo_version:
-            query = query.filter(Model.yolo_version == yolo_version)
+            stmt = stmt.where(Model.yolo_version == yolo_version)
 
         if is_active is not None:
-            query = query.filter(Model.is_active == (1 if is_active else 0))
+            stmt = stmt.where(Model.is_active == is_active)
+
+        if cursor:
+            stmt = stmt.where(keyset_before(Model.created_at, Model.id, cursor))
+        elif offset:
+            stmt = stmt.offset(offset)
+
+        stmt = stmt.order_by(Model.created_at.desc(), Model.id.desc()).limit(limit)
+
+        result = await db.execute(stmt)
+        return list(result.all())
+
+    async def list_models_summary(
+        self,
+        db: AsyncSession,
+        yolo_version: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> List[Row]:
+        """
+        列出模型摘要（只查詢 SUMMARY_COLUMNS，可直接交給 Model.serialize_summary）
 
-        query = query.order_by(Model.created_at.desc())
-        query = query.limit(limit).offset(offset)
+        Args:
+            db: 資料庫 session
+            yolo_version: 過濾 YOLO 版本
+            is_active: 過濾啟用狀態
+            limit: 最大返回數量
+            offset: 偏移量（相容舊版；提供 cursor 時忽略）
+            cursor: 上一頁回傳的分頁游標
+
+        Returns:
+            List[Row]: 摘要資料列
 
-        return query.all()
+        Raises:
+            ValueError: 游標格式錯誤
+        """
+        return await self.list_models(
+            db, yolo_version, is_active, limit, offset, cursor, columns=SUMMARY_COLUMNS
+        )
 
-    def update_model(
+    async def update_model(
         self,
-        db: Session,
+        db: AsyncSession,
         model_id: str,
         name: Optional[str] = None,
         description: Optional[str] = None,
@@ -168,7 +361,7 @@ class ModelService:
         Returns:
             Optional[Model]: 更新後的模型
         """
-        model = self.get_model(db, model_id)
+        model = await self.get_model(db, model_id)
 
         if not model:
             logger.warning(f"模型不存在: {model_id}")
@@ -187,16 +380,17 @@ class ModelService:
         if recall is not None:
             model.recall = recall
 
-        db.commit()
-        db.refresh(model)
+        # expire_on_commit=False 且無伺服器端更新欄位，commit 後不需 refresh
+        await db.commit()
+        await invalidate_cache(MODEL_ACTIVE_KEY)
 
         logger.info(f"模型已更新: {model_id}")
 
         return model
 
-    def delete_model(
+    async def delete_model(
         self,
-        db: Session,
+        db: AsyncSession,
         model_id: str,
         delete_file: bool = False
     ) -> bool:
@@ -211,31 +405,34 @@ class ModelService:
         Returns:
             bool: 是否成功刪除
         """
-        model = self.get_model(db, model_id)
+        model = await self.get_model(db, model_id)
 
         if not model:
             logger.warning(f"模型不存在: {model_id}")
             return False
 
-        # 刪除檔案
-        if delete_file and os.path.exists(model.file_path):
+        # 刪除檔案（檔案不存在時略過）
+        if delete_file:
             try:
                 os.remove(model.file_path)
                 logger.info(f"已刪除模型檔案: {model.file_path}")
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 logger.error(f"刪除模型檔案失敗: {e}")
 
         # 刪除資料庫記錄
-        db.delete(model)
-        db.commit()
+        await db.delete(model)
+        await db.commit()
+        await invalidate_cache(MODEL_ACTIVE_KEY, MODEL_STATS_KEY)
 
         logger.info(f"模型已刪除: {model_id}")
 
         return True
 
-    def set_active_model(
+    async def set_active_model(
         self,
-        db: Session,
+        db: AsyncSession,
         model_id: str
     ) -> Optional[Model]:
         """
@@ -248,25 +445,31 @@ class ModelService:
         Returns:
             Optional[Model]: 啟用的模型
         """
-        model = self.get_model(db, model_id)
+        model = await self.get_model(db, model_id)
 
         if not model:
             logger.warning(f"模型不存在: {model_id}")
             return None
 
-        # 停用所有模型
-        db.query(Model).update({Model.is_active: 0})
+        # 只停用目前啟用的模型（經 ux_models_active 部分索引，至多更新一列），與啟用同一交易提交；
+        # 須先於啟用前執行，否則違反唯一索引
+        await db.execute(
+            update(Model)
+            .where(Model.is_active == true(), Model.id != model_id)
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
 
         # 啟用指定模型
-        model.is_active = 1
-        db.commit()
-        db.refresh(model)
+        model.is_active = True
+        await db.commit()
+        await invalidate_cache(MODEL_ACTIVE_KEY, MODEL_STATS_KEY)
 
         logger.info(f"✅ 模型已啟用: {model_id}")
 
         return model
 
-    def get_active_model(self, db: Session) -> Optional[Model]:
+    async def get_active_model(self, db: AsyncSession) -> Optional[Model]:
         """
         取得當前啟用的模型
 
@@ -276,51 +479,62 @@ class ModelService:
         Returns:
             Optional[Model]: 啟用的模型或 None
         """
-        return db.query(Model).filter(Model.is_active == 1).first()
+        result = await db.execute(select(Model).where(Model.is_active == true()).limit(1))
+        return result.scalar_one_or_none()
+
+    @redis_cached(MODEL_ACTIVE_KEY, ttl=60)
+    async def get_active_model_info(self, db: AsyncSession) -> Optional[Dict[str, Any]]:
+        """
+        取得當前啟用模型的回應資料（Redis 快取，模型異動時失效）
+
+        Args:
+            db: 資料庫 session
+
+        Returns:
+            Optional[Dict[str, Any]]: 啟用模型字典或 None
+        """
+        model = await self.get_active_model(db)
+        return model.to_dict() if model else None
 
-    def compare_models(
+    async def compare_models(
         self,
-        db: Session,
+        db: AsyncSession,
         model_ids: List[str]
-    ) -> List[Dict[str, Any]]:
+    ) -> List[ModelComparisonItem]:
         """
         比較多個模型的效能
 
+        資料來自資料庫且欄位型別已由 ORM 保證，以 model_construct 建立回應物件，
+        略過 Pydantic 驗證；非資料庫來源的資料不可比照使用
+
         Args:
             db: 資料庫 session
             model_ids: 模型 ID 列表
 
         Returns:
-            List[Dict[str, Any]]: 模型比較結果
+            List[ModelComparisonItem]: 模型比較結果（依請求順序）
         """
-        models = [self.get_model(db, mid) for mid in model_ids]
-        models = [m for m in models if m is not None]
-
-        if not models:
-            return []
-
-        comparison = []
-        for model in models:
-            comparison.append({
-                'id': model.id,
-                'name': model.name,
-                'yolo_version': model.yolo_version,
-                'file_size_mb': round(model.file_size / 1024 / 1024, 2) if model.file_size else None,
-                'metrics': {
-                    'map50': model.map50,
-                    'map50_95': model.map50_95,
-                    'precision': model.precision,
-                    'recall': model.recall
-                },
-                'is_active': bool(model.is_active),
-                'created_at': model.created_at.isoformat() if model.created_at else None
-            })
-
-        return comparison
+        result = await db.execute(select(Model).where(Model.id.in_(model_ids)))
+        models_by_id = {m.id: m for m in result.scalars()}
+        models = [models_by_id[mid] for mid in model_ids if mid in models_by_id]
+
+        return [
+            ModelComparisonItem.model_construct(
+                id=model.id,
+                name=model.name,
+                yolo_version=model.yolo_version,
+                file_size_mb=model.file_size_mb,
+                metrics=ModelMetrics.model_construct(**dict(zip(_METRIC_ATTRS, _get_metrics(model)))),
+                is_active=model.is_active,
+                created_at=model.created_at.isoformat() if model.created_at else None
+            )
+            for model in models
+        ]
 
-    def get_model_statistics(self, db: Session) -> Dict[str, Any]:
+    @redis_cached(MODEL_STATS_KEY, ttl=60)
+    async def get_model_statistics(self, db: AsyncSession) -> Dict[str, Any]:
         """
-        取得模型統計資訊
+        取得模型統計資訊（Redis 快取，模型異動時失效）
 
         Args:
             db: 資料庫 session
@@ -328,22 +542,29 @@ class ModelService:
         Returns:
             Dict[str, Any]: 統計資訊
         """
-        total = db.query(Model).count()
-
-        v5_count = db.query(Model).filter(Model.yolo_version == 'v5').count()
-        v8_count = db.query(Model).filter(Model.yolo_version == 'v8').count()
-        v11_count = db.query(Model).filter(Model.yolo_version == 'v11').count()
+        # 單一查詢同時取得各版本數量與啟用模型 ID（每個版本至多一個非 NULL）
+        result = await db.execute(
+            select(
+                Model.yolo_version,
+                func.count(),
+                func.max(case((Model.is_active == true(), Model.id), else_=None))
+            ).group_by(Model.yolo_version)
+        )
 
-        active_model = self.get_active_model(db)
+        counts = {}
+        active_model_id = None
+        for version, count, active_id in result.all():
+            counts[version] = count
+            active_model_id = active_model_id or active_id
 
         return {
-            'total': total,
+            'total': sum(counts.values()),
             'by_version': {
-                'v5': v5_count,
-                'v8': v8_count,
-                'v11': v11_count
+                'v5': counts.get('v5', 0),
+                'v8': counts.get('v8', 0),
+                'v11': counts.get('v11', 0)
             },
-            'active_model_id': active_model.id if active_model else None
+            'active_model_id': active_model_id
         }
 
     def scan_model_files(self) -> List[Dict[str, Any]]:
@@ -351,60 +572,71 @@ class ModelService:
         掃描可用的模型檔案（.pt 檔案）
 
         掃描以下目錄：
-        - ./models (trained_models)
+        - ./models、./trained_models（任意深度）
         - ./yolo_project/**/weights
         - ./runs/**/weights
 
+        以 os.scandir 逐層走訪，每個檔案只 stat 一次（大小與修改時間同時取得），
+        並以 (st_dev, st_ino) 去除重複（含符號連結指向同一檔案）
+
         Returns:
             List[Dict[str, Any]]: 可用的模型檔案列表
         """
-        import glob
-
-        model_files = []
-        search_paths = [
-            './models/**/*.pt',
-            './trained_models/**/*.pt',
-            './yolo_project/**/weights/*.pt',
-            './runs/**/weights/*.pt',
-        ]
-
-        seen_paths = set()
+        found = []
+        seen = set()
 
-        for pattern in search_paths:
-            for file_path in glob.glob(pattern, recursive=True):
-                abs_path = os.path.abspath(file_path)
+        for root, weights_only in MODEL_SCAN_ROOTS:
+            stack = [os.path.abspath(root)]
 
-                # 避免重複
-                if abs_path in seen_paths:
-                    continue
-                seen_paths.add(abs_path)
+            while stack:
+                directory = stack.pop()
+                collect = not weights_only or os.path.basename(directory) == 'weights'
 
-                # 獲取檔案資訊
                 try:
-                    file_size = os.path.getsize(abs_path)
-                    file_size_mb = round(file_size / 1024 / 1024, 2)
-                    file_name = os.path.basename(abs_path)
-
-                    # 判斷模型類型
-                    model_type = 'unknown'
-                    if 'best.pt' in file_name:
-                        model_type = 'best'
-                    elif 'last.pt' in file_name:
-                        model_type = 'last'
-
-                    model_files.append({
-                        'file_path': abs_path,
-                        'file_name': file_name,
-                        'file_size_mb': file_size_mb,
-                        'model_type': model_type,
-                        'directory': os.path.dirname(abs_path)
-                    })
-                except Exception as e:
-                    logger.warning(f"無法讀取檔案資訊: {abs_path}, 錯誤: {e}")
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            # 與 glob 相同，略過隱藏檔案與目錄
+                            if entry.name.startswith('.'):
+                                continue
+
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif collect and entry.name.endswith('.pt'):
+                                try:
+                                    st = entry.stat()
+                                except OSError as e:
+                                    logger.warning(f"無法讀取檔案資訊: {entry.path}, 錯誤: {e}")
+                                    continue
+
+                                # 避免重複
+                                key = (st.st_dev, st.st_ino)
+                                if key in seen:
+                                    continue
+                                seen.add(key)
+
+                                found.append((entry.path, entry.name, directory, st.st_size, st.st_mtime))
+                except OSError:
                     continue
 
-        # 按修改時間排序（最新的在前面）
-        model_files.sort(key=lambda x: os.path.getmtime(x['file_path']), reverse=True)
+        # 按修改時間排序（最新的在前面），使用掃描時取得的 mtime
+        found.sort(key=itemgetter(4), reverse=True)
+
+        model_files = []
+        for file_path, file_name, directory, file_size, _ in found:
+            # 判斷模型類型
+            model_type = 'unknown'
+            if 'best.pt' in file_name:
+                model_type = 'best'
+            elif 'last.pt' in file_name:
+                model_type = 'last'
+
+            model_files.append({
+                'file_path': file_path,
+                'file_name': file_name,
+                'file_size_mb': round(file_size / 1024 / 1024, 2),
+                'model_type': model_type,
+                'directory': directory
+            })
 
         logger.info(f"掃描到 {len(model_files)} 個模型檔案")
         return model_files
@@ -423,84 +655,29 @@ class ModelService:
             FileNotFoundError: 檔案不存在
             Exception: 讀取失敗
         """
-        if not os.path.exists(file_path):
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
             raise FileNotFoundError(f"模型檔案不存在: {file_path}")
 
+        file_size = st.st_size
+        file_size_mb = round(file_size / 1024 / 1024, 2)
+
         try:
-            import torch
-
-            # 載入模型檢查點
-            checkpoint = torch.load(file_path, map_location='cpu')
-
-            # 提取基本資訊
-            file_size = os.path.getsize(file_path)
-            file_size_mb = round(file_size / 1024 / 1024, 2)
-
-            # 嘗試提取訓練指標
-            metrics = {}
-
-            # 不同版本的 YOLO 儲存格式可能不同
-            # YOLOv8/v11 通常在 checkpoint 的 'metrics' 或直接在頂層
-            if isinstance(checkpoint, dict):
-                # 嘗試從不同位置提取指標
-                if 'metrics' in checkpoint and isinstance(checkpoint['metrics'], dict):
-                    metrics_data = checkpoint['metrics']
-
-                    # 提取各種指標
-                    # mAP@0.5
-                    if 'metrics/mAP50(B)' in metrics_data:
-                        metrics['map50'] = float(metrics_data['metrics/mAP50(B)'])
-                    elif 'metrics/mAP_0.5' in metrics_data:
-                        metrics['map50'] = float(metrics_data['metrics/mAP_0.5'])
-
-                    # mAP@0.5:0.95
-                    if 'metrics/mAP50-95(B)' in metrics_data:
-                        metrics['map50_95'] = float(metrics_data['metrics/mAP50-95(B)'])
-                    elif 'metrics/mAP_0.5:0.95' in metrics_data:
-                        metrics['map50_95'] = float(metrics_data['metrics/mAP_0.5:0.95'])
-
-                    # Precision
-                    if 'metrics/precision(B)' in metrics_data:
-                        metrics['precision'] = float(metrics_data['metrics/precision(B)'])
-                    elif 'precision' in metrics_data:
-                        metrics['precision'] = float(metrics_data['precision'])
-
-                    # Recall
-                    if 'metrics/recall(B)' in metrics_data:
-                        metrics['recall'] = float(metrics_data['metrics/recall(B)'])
-                    elif 'recall' in metrics_data:
-                        metrics['recall'] = float(metrics_data['recall'])
-
-                # 檢查是否有 results.csv 檔案（在同一目錄）
-                results_csv = os.path.join(os.path.dirname(file_path), '..', 'results.csv')
-                if os.path.exists(results_csv):
-                    try:
-                        import pandas as pd
-                        df = pd.read_csv(results_csv)
-                        if len(df) > 0:
-                            last_row = df.iloc[-1]
-                            # 從 CSV 提取指標（通常是最後一行）
-                            if 'metrics/mAP50(B)' in df.columns:
-                                metrics['map50'] = float(last_row['metrics/mAP50(B)'])
-                            if 'metrics/mAP50-95(B)' in df.columns:
-                                metrics['map50_95'] = float(last_row['metrics/mAP50-95(B)'])
-                            if 'metrics/precision(B)' in df.columns:
-                                metrics['precision'] = float(last_row['metrics/precision(B)'])
-                            if 'metrics/recall(B)' in df.columns:
-                                metrics['recall'] = float(last_row['metrics/recall(B)'])
-                    except Exception as e:
-                        logger.warning(f"無法讀取 results.csv: {e}")
-
-                # 提取 YOLO 版本資訊
-                yolo_version = 'v11'  # 預設
-                if 'model' in checkpoint:
-                    model_yaml = checkpoint.get('model', {})
-                    if hasattr(model_yaml, 'yaml') and model_yaml.yaml:
-                        yaml_content = str(model_yaml.yaml)
-                        if 'yolov5' in yaml_content.lower():
-                            yolo_version = 'v5'
-                        elif 'yolov8' in yaml_content.lower():
-                            yolo_version = 'v8'
+            # 檢查點解析結果依檔案 mtime/大小快取
+            cached_metrics, yolo_version = _inspect_checkpoint(
+                os.path.abspath(file_path), st.st_mtime_ns, file_size
+            )
+            metrics = dict(cached_metrics)
+
+            # 檢查是否有 results.csv 檔案（在同一目錄），每次重新讀取
+            results_csv = os.path.join(os.path.dirname(file_path), '..', 'results.csv')
+            if os.path.exists(results_csv):
+                try:
+                    # 從 CSV 提取指標（最後一行）
+                    metrics.update(_read_results_csv_metrics(results_csv))
+                except Exception as e:
+                    logger.warning(f"無法讀取 results.csv: {e}")
 
             return {
                 'file_path': file_path,
@@ -518,8 +695,8 @@ class ModelService:
             return {
                 'file_path': file_path,
                 'file_name': os.path.basename(file_path),
-                'file_size': os.path.getsize(file_path),
-                'file_size_mb': round(os.path.getsize(file_path) / 1024 / 1024, 2),
+                'file_size': file_size,
+                'file_size_mb': file_size_mb,
                 'yolo_version': 'v11',
                 'metrics': {},
                 'has_metrics': False,
@@ -0,0 +1,77 @@
+"""
+Keyset（游標）分頁工具
+
+以 (created_at, id) 作為游標，查詢改為
+WHERE (created_at, id) < (:ts, :id) ORDER BY created_at DESC, id DESC LIMIT :limit，
+翻頁成本只與 limit 相關，不會像 OFFSET 一樣掃描並丟棄前面的資料
+"""
+
+from sqlalchemy import String, literal, tuple_
+from datetime import datetime
+from typing import Tuple
+import base64
+import binascii
+import orjson
+
+from models.database import IS_SQLITE
+
+# 回應中提供下一頁游標的 header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    """
+    將 (created_at, id) 編碼為 URL 安全的游標字串
+
+    Args:
+        created_at: 該頁最後一筆的建立時間
+        item_id: 該頁最後一筆的 ID
+
+    Returns:
+        str: base64 游標
+    """
+    raw = orjson.dumps([created_at.isoformat(), item_id])
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    解碼游標字串
+
+    Args:
+        cursor: base64 游標
+
+    Returns:
+        Tuple[datetime, str]: (created_at, id)
+
+    Raises:
+        ValueError: 游標格式錯誤
+    """
+    try:
+        ts, item_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(ts), str(item_id)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError, UnicodeEncodeError):
+        raise ValueError(f"無效的分頁游標: {cursor}")
+
+
+def keyset_before(created_at_column, id_column, cursor: str):
+    """
+    建立「排在游標之後」的 WHERE 條件（created_at DESC, id DESC 排序）
+
+    Args:
+        created_at_column: 建立時間欄位
+        id_column: ID 欄位
+        cursor: base64 游標
+
+    Returns:
+        SQL 條件式
+    """
+    ts, item_id = decode_cursor(cursor)
+
+    if IS_SQLITE:
+        # SQLite 的 CURRENT_TIMESTAMP 以 'YYYY-MM-DD HH:MM:SS' 文字儲存，需以相同格式比較
+        ts_value = literal(ts.strftime('%Y-%m-%d %H:%M:%S'), String)
+    else:
+        ts_value = literal(ts, created_at_column.type)
+
+    return tuple_(created_at_column, id_column) < tuple_(ts_value, literal(item_id, String))
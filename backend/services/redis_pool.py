@@ -0,0 +1,66 @@
+"""
+Redis 連線池
+所有 Redis / RQ 操作共用同一個行程內連線池，避免每次請求重新建立 TCP 連線
+"""
+
+import os
+from redis import Redis, BlockingConnectionPool
+import redis.asyncio as aioredis
+
+
+def _build_redis_url() -> str:
+    """優先使用 REDIS_URL，否則由 REDIS_HOST / REDIS_PORT 組合"""
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        return redis_url
+
+    redis_host = os.getenv('REDIS_HOST', 'localhost')
+    redis_port = int(os.getenv('REDIS_PORT', 6379))
+    return f"redis://{redis_host}:{redis_port}/0"
+
+
+REDIS_URL = _build_redis_url()
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 64))
+# 連線池用盡時等待可用連線的秒數（逾時才拋出 ConnectionError）
+REDIS_POOL_TIMEOUT = int(os.getenv('REDIS_POOL_TIMEOUT', 5))
+
+
+# 全域連線池（RQ 需要 bytes，故不啟用 decode_responses）
+# 使用 BlockingConnectionPool：並行請求超過上限時排隊等待，而非立即失敗
+pool = BlockingConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+    socket_keepalive=True,
+    health_check_interval=30
+)
+
+
+# 非同步連線池（WebSocket Pub/Sub 使用，訊息為文字故啟用 decode_responses）
+async_pool = aioredis.ConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    socket_keepalive=True,
+    health_check_interval=30,
+    decode_responses=True
+)
+
+
+def get_redis() -> Redis:
+    """取得使用共用連線池的 Redis 客戶端"""
+    return Redis(connection_pool=pool)
+
+
+def get_async_redis() -> aioredis.Redis:
+    """取得使用共用非同步連線池的 Redis 客戶端"""
+    return aioredis.Redis(connection_pool=async_pool)
+
+
+def close_pool():
+    """關閉同步連線池中的所有連線"""
+    pool.disconnect()
+
+
+async def close_async_pool():
+    """關閉非同步連線池中的所有連線"""
+    await async_pool.disconnect()
@@ -6,15 +6,154 @@
 import cv2
 import logging
 import asyncio
-from typing import Optional, Dict, Any
-import base64
+import functools
+import queue
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
 import numpy as np
-from datetime import datetime
+from operator import itemgetter
 
 from engines.yolo_trainer import YOLOInference
 
 logger = logging.getLogger(__name__)
 
+# 串流畫面的 JPEG 品質
+JPEG_QUALITY = 75
+
+# 各階段之間的佇列長度（過小會使階段互相等待，過大會增加延遲）
+PIPELINE_QUEUE_SIZE = 2
+
+# 攝影機擷取參數
+CAMERA_FPS = 30
+
+# 依平台選擇攝影機後端（V4L2 / Media Foundation 支援 MJPG 與 BUFFERSIZE 設定）
+if sys.platform.startswith('linux'):
+    CAMERA_BACKEND = cv2.CAP_V4L2
+elif sys.platform == 'win32':
+    CAMERA_BACKEND = cv2.CAP_MSMF
+else:
+    CAMERA_BACKEND = cv2.CAP_ANY
+
+# 標籤字型
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+_bbox_xyxy = itemgetter('x1', 'y1', 'x2', 'y2')
+
+# 畫面變化門檻：縮小灰階圖的平均差異低於此值時沿用上一次偵測結果
+MOTION_THRESHOLD = 2.0
+MOTION_PROBE_SIZE = (80, 45)
+# 連續略過推論的上限，避免靜止畫面中新出現的物件一直未被偵測
+MAX_SKIPPED_FRAMES = 15
+
+# 多個串流客戶端同時推論時，合併為單次 predict 的最大畫面數
+MAX_INFERENCE_BATCH = 4
+
+# 可選：TurboJPEG（libjpeg-turbo SIMD 編碼，見 requirements-optional.txt）
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo_jpeg = TurboJPEG()
+except Exception:
+    _turbo_jpeg = None
+
+
+@functools.lru_cache(maxsize=512)
+def _label_patch(label: str) -> np.ndarray:
+    """
+    繪製標籤圖塊（綠底黑字）並快取
+
+    同一標籤文字只以 cv2.putText 繪製一次，之後直接複製圖塊到畫面上
+
+    Args:
+        label: 標籤文字（類別 信心度）
+
+    Returns:
+        np.ndarray: BGR 圖塊；底邊對齊邊界框上緣
+    """
+    (width, height), _ = cv2.getTextSize(label, LABEL_FONT, 0.5, 1)
+
+    patch = np.full((height + 11, width + 1, 3), (0, 255, 0), dtype=np.uint8)
+    cv2.putText(patch, label, (0, height + 5), LABEL_FONT, 0.5, (0, 0, 0), 1)
+    patch.flags.writeable = False
+    return patch
+
+
+def _blit(frame: np.ndarray, patch: np.ndarray, top: int, left: int):
+    """
+    將圖塊複製到畫面指定位置（超出畫面的部分裁切）
+
+    Args:
+        frame: 畫面
+        patch: 圖塊
+        top: 圖塊上緣座標
+        left: 圖塊左緣座標
+    """
+    frame_h, frame_w = frame.shape[:2]
+    patch_h, patch_w = patch.shape[:2]
+
+    y0, x0 = max(top, 0), max(left, 0)
+    y1, x1 = min(top + patch_h, frame_h), min(left + patch_w, frame_w)
+
+    if y0 < y1 and x0 < x1:
+        frame[y0:y1, x0:x1] = patch[y0 - top:y1 - top, x0 - left:x1 - left]
+
+
+class _MotionGate:
+    """
+    單一串流的畫面變化偵測狀態
+
+    每次 stream_generator 各自建立，多個客戶端同時串流時不會互相覆寫參考畫面與沿用的結果
+    """
+
+    def __init__(self):
+        """初始化偵測狀態"""
+        self.prev_small: Optional[np.ndarray] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.config_version = -1
+        self.skipped_frames = 0
+
+    def is_static(self, frame: np.ndarray, config_version: int) -> bool:
+        """
+        判斷畫面與上一次推論的畫面相比是否幾乎沒有變化
+
+        以縮小的灰階圖計算平均絕對差，成本遠低於推論；
+        連續略過 MAX_SKIPPED_FRAMES 幀或偵測配置變更後強制推論一次
+
+        Args:
+            frame: 畫面
+            config_version: 目前的偵測配置版本
+
+        Returns:
+            bool: True 表示可沿用上一次偵測結果
+        """
+        small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), MOTION_PROBE_SIZE)
+
+        if (
+            self.prev_small is not None
+            and self.last_result is not None
+            and self.config_version == config_version
+            and self.skipped_frames < MAX_SKIPPED_FRAMES
+            and cv2.absdiff(small, self.prev_small).mean() < MOTION_THRESHOLD
+        ):
+            self.skipped_frames += 1
+            return True
+
+        self.prev_small = small
+        self.skipped_frames = 0
+        return False
+
+    def remember(self, result: Dict[str, Any], config_version: int):
+        """
+        記錄最新的偵測結果
+
+        Args:
+            result: 偵測結果
+            config_version: 推論時的偵測配置版本
+        """
+        self.last_result = result
+        self.config_version = config_version
+
 
 class StreamingService:
     """串流服務類別"""
@@ -28,6 +167,17 @@ class StreamingService:
         self.conf_threshold = 0.25
         self.iou_threshold = 0.45
         self.use_gray = False
+        # 擷取執行緒與其輸出佇列（保留最新畫面，滿時丟棄最舊的）
+        self._capture_thread: Optional[threading.Thread] = None
+        self._frames: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        # 等待推論的 (畫面, Future)；推論進行中送達的畫面會併入下一批
+        self._batch_buffer: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._batch_task: Optional[asyncio.Task] = None
+        # 偵測配置版本；畫面變化偵測狀態記錄取得結果時的版本，配置變更後不沿用舊結果
+        self._config_version = 0
+        # 串流開始時的 (epoch 毫秒, monotonic 秒)，每幀時間戳以兩者推算
+        self._t0_ms = 0
+        self._m0 = 0.0
 
     def load_model(self, model_path: str) -> bool:
         """
@@ -58,15 +208,33 @@ class StreamingService:
             bool: 是否成功啟動
         """
         try:
-            self.camera = cv2.VideoCapture(camera_id)
+            self.camera = cv2.VideoCapture(camera_id, CAMERA_BACKEND)
+            if not self.camera.isOpened() and CAMERA_BACKEND != cv2.CAP_ANY:
+                self.camera = cv2.VideoCapture(camera_id)
 
             if not self.camera.isOpened():
                 logger.error(f"無法開啟攝影機: {camera_id}")
                 return False
 
+            # MJPG 由攝影機端壓縮，避免 YUYV 頻寬限制與 CPU 轉換；
+            # 驅動緩衝只保留 1 幀，讀到的永遠是最新畫面（不支援的後端會忽略設定）
+            self.camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self.camera.set(cv2.CAP_PROP_FPS, CAMERA_FPS)
+
             self.camera_id = camera_id
             self.is_streaming = True
 
+            self._frames = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            self._t0_ms = time.time_ns() // 1_000_000
+            self._m0 = time.monotonic()
+            self._capture_thread = threading.Thread(
+                target=self._capture_loop,
+                name=f"camera-{camera_id}",
+                daemon=True
+            )
+            self._capture_thread.start()
+
             logger.info(f"✅ 攝影機已啟動: {camera_id}")
             return True
 
@@ -78,6 +246,11 @@ class StreamingService:
         """停止攝影機"""
         self.is_streaming = False
 
+        # 等待擷取執行緒結束後再釋放攝影機，避免 read() 途中被 release
+        if self._capture_thread is not None:
+            self._capture_thread.join(timeout=2)
+            self._capture_thread = None
+
         if self.camera:
             self.camera.release()
             self.camera = None
@@ -101,6 +274,54 @@ class StreamingService:
 
         return frame
 
+    def _capture_loop(self):
+        """
+        擷取執行緒：持續讀取攝影機畫面放入佇列
+
+        佇列已滿時丟棄最舊的畫面，推論落後時只處理最新畫面；
+        串流停止後放入 None 作為結束標記
+        """
+        while self.is_streaming:
+            frame = self.capture_frame()
+
+            if frame is None:
+                if self.is_streaming:
+                    time.sleep(0.1)
+                continue
+
+            self._put_latest(frame)
+
+        self._put_latest(None)
+
+    def _put_latest(self, item: Optional[np.ndarray]):
+        """
+        放入擷取佇列，已滿時丟棄最舊的一幀
+
+        Args:
+            item: 畫面或結束標記 None
+        """
+        while True:
+            try:
+                self._frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._frames.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        """
+        從擷取佇列取出一幀（最多等待 0.1 秒）
+
+        Returns:
+            Optional[np.ndarray]: 畫面；逾時或收到結束標記時為 None
+        """
+        try:
+            return self._frames.get(timeout=0.1)
+        except queue.Empty:
+            return None
+
     def detect_frame(self, frame: np.ndarray) -> Dict[str, Any]:
         """
         對畫面進行物件偵測
@@ -111,39 +332,78 @@ class StreamingService:
         Returns:
             Dict[str, Any]: 偵測結果
         """
+        return self.detect_frames([frame])[0]
+
+    def detect_frames(self, frames: List[np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        以單次 predict 對多個畫面進行物件偵測
+
+        Args:
+            frames: 畫面列表
+
+        Returns:
+            List[Dict[str, Any]]: 各畫面的偵測結果（順序與輸入相同）
+        """
         if self.model is None:
-            return {
-                'detections': [],
-                'detection_count': 0,
-                'error': '模型未載入'
-            }
+            return [
+                {'detections': [], 'detection_count': 0, 'error': '模型未載入'}
+                for _ in frames
+            ]
 
         try:
             # 執行推論
-            results = self.model.predict(
-                frame,
+            return self.model.predict(
+                frames,
                 conf_threshold=self.conf_threshold,
                 iou_threshold=self.iou_threshold,
                 use_gray=self.use_gray
             )
 
-            return results[0] if results else {
-                'detections': [],
-                'detection_count': 0
-            }
-
         except Exception as e:
             logger.error(f"偵測失敗: {e}", exc_info=True)
-            return {
-                'detections': [],
-                'detection_count': 0,
-                'error': str(e)
-            }
+            return [
+                {'detections': [], 'detection_count': 0, 'error': str(e)}
+                for _ in frames
+            ]
+
+    async def detect_frame_batched(self, frame: np.ndarray) -> Dict[str, Any]:
+        """
+        非同步偵測畫面，與其他客戶端的畫面合併批次推論
+
+        模型閒置時立即推論；推論進行中送達的畫面累積至下一批
+        （最多 MAX_INFERENCE_BATCH 張），不額外等待湊批
+
+        Args:
+            frame: 畫面
+
+        Returns:
+            Dict[str, Any]: 偵測結果
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._batch_buffer.append((frame, future))
+
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._run_batches())
+
+        return await future
+
+    async def _run_batches(self):
+        """依序推論累積的畫面，直到緩衝區清空"""
+        while self._batch_buffer:
+            batch = self._batch_buffer[:MAX_INFERENCE_BATCH]
+            del self._batch_buffer[:MAX_INFERENCE_BATCH]
+
+            results = await asyncio.to_thread(self.detect_frames, [frame for frame, _ in batch])
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
 
     def draw_detections(
         self,
         frame: np.ndarray,
-        detections: list
+        detections: list,
+        inplace: bool = True
     ) -> np.ndarray:
         """
         在畫面上繪製偵測結果
@@ -151,113 +411,131 @@ class StreamingService:
         Args:
             frame: 原始畫面
             detections: 偵測結果列表
+            inplace: 是否直接繪製於原畫面（需保留原始畫面時設為 False）
 
         Returns:
             np.ndarray: 繪製後的畫面
         """
-        annotated_frame = frame.copy()
+        annotated_frame = frame if inplace else frame.copy()
 
-        for detection in detections:
-            bbox = detection['bbox']
-            class_name = detection['class_name']
-            confidence = detection['confidence']
+        if not detections:
+            return annotated_frame
 
-            # 座標
-            x1 = int(bbox['x1'])
-            y1 = int(bbox['y1'])
-            x2 = int(bbox['x2'])
-            y2 = int(bbox['y2'])
+        # 整批轉為 (N, 4) 整數座標，再一次 tolist() 取得 Python int
+        boxes = np.array(
+            [_bbox_xyxy(detection['bbox']) for detection in detections]
+        ).astype(np.int32).tolist()
 
+        for detection, (x1, y1, x2, y2) in zip(detections, boxes):
             # 繪製邊界框
             cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
 
-            # 繪製標籤
-            label = f"{class_name} {confidence:.2f}"
-            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-
-            # 背景矩形
-            cv2.rectangle(
-                annotated_frame,
-                (x1, y1 - label_size[1] - 10),
-                (x1 + label_size[0], y1),
-                (0, 255, 0),
-                -1
-            )
-
-            # 文字
-            cv2.putText(
-                annotated_frame,
-                label,
-                (x1, y1 - 5),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 0, 0),
-                1
-            )
+            # 繪製標籤（快取的圖塊，底邊對齊 y1）
+            patch = _label_patch(f"{detection['class_name']} {detection['confidence']:.2f}")
+            _blit(annotated_frame, patch, y1 - patch.shape[0] + 1, x1)
 
         return annotated_frame
 
-    def frame_to_base64(self, frame: np.ndarray) -> str:
+    def frame_to_jpeg(self, frame: np.ndarray) -> bytes:
         """
-        將畫面轉為 Base64 字串
+        將畫面編碼為 JPEG
+
+        安裝 PyTurboJPEG 時使用 TurboJPEG 編碼，否則使用 OpenCV
 
         Args:
             frame: 畫面
 
         Returns:
-            str: Base64 編碼的 JPEG 圖片
+            bytes: JPEG 圖片（失敗時為空 bytes）
         """
         try:
-            # 編碼為 JPEG
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-
-            # 轉為 Base64
-            jpg_as_text = base64.b64encode(buffer).decode('utf-8')
+            if _turbo_jpeg is not None:
+                return _turbo_jpeg.encode(frame, quality=JPEG_QUALITY, pixel_format=TJPF_BGR)
 
-            return f"data:image/jpeg;base64,{jpg_as_text}"
+            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            return buffer.tobytes()
 
         except Exception as e:
             logger.error(f"畫面編碼失敗: {e}")
-            return ""
+            return b""
 
-    async def stream_generator(self):
+    def _annotate_and_encode(self, frame: np.ndarray, detections: list) -> bytes:
         """
-        串流生成器（異步）
+        繪製偵測結果並編碼為 JPEG
 
-        Yields:
-            Dict[str, Any]: 每一幀的偵測結果與畫面
+        擷取的畫面僅供本次輸出使用，直接於原畫面繪製
+
+        Args:
+            frame: 原始畫面
+            detections: 偵測結果列表
+
+        Returns:
+            bytes: JPEG 圖片
         """
-        while self.is_streaming:
-            # 捕捉畫面
-            frame = self.capture_frame()
+        return self.frame_to_jpeg(self.draw_detections(frame, detections))
 
+    async def _inference_stage(self, output: asyncio.Queue, gate: '_MotionGate'):
+        """
+        推論階段：從擷取佇列取畫面，經批次推論後放入輸出佇列
+
+        Args:
+            output: (畫面, 偵測結果) 佇列；串流停止時放入 None
+            gate: 本串流的畫面變化偵測狀態
+        """
+        while self.is_streaming:
+            frame = await asyncio.to_thread(self._next_frame)
             if frame is None:
-                await asyncio.sleep(0.1)
                 continue
 
-            # 偵測物件
-            detection_result = self.detect_frame(frame)
+            config_version = self._config_version
+            if await asyncio.to_thread(gate.is_static, frame, config_version):
+                detection_result = gate.last_result
+            else:
+                detection_result = await self.detect_frame_batched(frame)
+                gate.remember(detection_result, config_version)
 
-            # 繪製偵測結果
-            annotated_frame = self.draw_detections(
-                frame,
-                detection_result.get('detections', [])
-            )
+            await output.put((frame, detection_result))
+
+        await output.put(None)
+
+    async def stream_generator(self) -> AsyncIterator[Tuple[bytes, Dict[str, Any]]]:
+        """
+        串流生成器（異步）
 
-            # 轉為 Base64
-            frame_base64 = self.frame_to_base64(annotated_frame)
+        擷取（執行緒）→ 推論 → 繪製與編碼 三個階段以長度 2 的佇列串接並同時執行，
+        每幀耗時約為最慢階段而非三者總和；畫面以 JPEG bytes 回傳
+        （由 WebSocket 以二進位訊框或 MJPEG 送出）
 
-            # 產生結果
-            yield {
-                'timestamp': datetime.now().isoformat(),
-                'frame': frame_base64,
-                'detections': detection_result.get('detections', []),
-                'detection_count': detection_result.get('detection_count', 0),
-                'error': detection_result.get('error')
-            }
+        偵測結果的 ts_ms 為 epoch 毫秒整數（前端以 new Date(ts_ms) 還原）
 
-            # 控制 FPS（約 30 FPS）
-            await asyncio.sleep(0.033)
+        Yields:
+            Tuple[bytes, Dict[str, Any]]: (JPEG 畫面, 偵測結果)
+        """
+        detected: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        inference_task = asyncio.create_task(self._inference_stage(detected, _MotionGate()))
+
+        try:
+            while True:
+                item = await detected.get()
+                if item is None:
+                    break
+
+                frame, detection_result = item
+                detections = detection_result.get('detections', [])
+
+                # 繪製偵測結果並編碼為 JPEG
+                frame_jpeg = await asyncio.to_thread(self._annotate_and_encode, frame, detections)
+
+                # 產生結果
+                yield frame_jpeg, {
+                    'ts_ms': self._t0_ms + int((time.monotonic() - self._m0) * 1000),
+                    'detections': detections,
+                    'detection_count': detection_result.get('detection_count', 0),
+                    'error': detection_result.get('error')
+                }
+
+        finally:
+            inference_task.cancel()
 
     def get_status(self) -> Dict[str, Any]:
         """
@@ -296,6 +574,9 @@ class StreamingService:
         if use_gray is not None:
             self.use_gray = use_gray
 
+        # 配置變更後的第一幀重新推論
+        self._config_version += 1
+
         logger.info(f"偵測配置已更新: conf={self.conf_threshold}, iou={self.iou_threshold}, gray={self.use_gray}")
 
 
@@ -0,0 +1,135 @@
+"""
+訓練進度事件
+RQ worker 透過 Redis Pub/Sub 發布進度，WebSocket 端訂閱後直接轉送；
+最新一則訊息另存於 Redis hash，新連線可直接取得快照而不需查詢資料庫
+"""
+
+import logging
+from typing import Dict, Any, Optional
+
+import orjson
+from redis import Redis
+
+from models.training import TrainingTask, TrainingStatus
+from services.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 任務結束狀態
+FINISHED_STATUSES = (TrainingStatus.COMPLETED, TrainingStatus.FAILED, TrainingStatus.STOPPED)
+
+# 快照存活時間：執行中與 RQ job_timeout 相同，結束後保留 1 小時
+SNAPSHOT_TTL = 86400
+FINISHED_SNAPSHOT_TTL = 3600
+
+
+def progress_channel(task_id: str) -> str:
+    """取得任務的 Pub/Sub 頻道名稱"""
+    return f"training:progress:{task_id}"
+
+
+def snapshot_key(task_id: str) -> str:
+    """取得任務最新訊息快照的 hash 鍵（欄位：progress、finished）"""
+    return f"training:snapshot:{task_id}"
+
+
+def build_progress_message(task: TrainingTask) -> Dict[str, Any]:
+    """建立進度訊息"""
+    progress = 0
+    if task.total_epochs and task.total_epochs > 0:
+        progress = (task.current_epoch / task.total_epochs) * 100
+
+    return {
+        "type": "progress",
+        "data": {
+            "task_id": task.id,
+            "status": task.status.value,
+            "current_epoch": task.current_epoch,
+            "total_epochs": task.total_epochs,
+            "progress": round(progress, 2),
+            "current_loss": task.current_loss,
+            "current_map": task.current_map,
+            "error_message": task.error_message
+        }
+    }
+
+
+def build_finished_message(task: TrainingTask) -> Dict[str, Any]:
+    """建立任務結束訊息"""
+    return {
+        "type": "finished",
+        "data": {
+            "task_id": task.id,
+            "status": task.status.value,
+            "model_path": task.model_path,
+            "save_dir": task.save_dir,
+            "error_message": task.error_message
+        }
+    }
+
+
+def publish_task_update(task: TrainingTask, redis: Optional[Redis] = None):
+    """
+    發布任務進度（任務結束時另發布結束訊息）
+
+    訊息只序列化一次，同時寫入快照 hash 並發布，以 pipeline 一次送出；
+    發布失敗只記錄警告，不影響訓練流程
+
+    Args:
+        task: 訓練任務
+        redis: Redis 連線（預設使用共用連線池）
+    """
+    try:
+        redis = redis or get_redis()
+        channel = progress_channel(task.id)
+        key = snapshot_key(task.id)
+        pipe = redis.pipeline(transaction=False)
+
+        payload = orjson.dumps(build_progress_message(task))
+        pipe.hset(key, "progress", payload)
+        pipe.publish(channel, payload)
+
+        if task.status in FINISHED_STATUSES:
+            payload = orjson.dumps(build_finished_message(task))
+            pipe.hset(key, "finished", payload)
+            pipe.publish(channel, payload)
+            pipe.expire(key, FINISHED_SNAPSHOT_TTL)
+        else:
+            pipe.expire(key, SNAPSHOT_TTL)
+
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"發布訓練進度失敗: {e}")
+
+
+async def read_live_progress(redis, task_id: str) -> Optional[Dict[str, Any]]:
+    """
+    從快照讀取任務的即時進度
+
+    Worker 每個 epoch 都會更新快照，但只定期寫入資料庫；
+    查詢執行中的任務時以此覆蓋資料庫中的進度欄位
+
+    Args:
+        redis: 非同步 Redis 連線（decode_responses）
+        task_id: 任務 ID
+
+    Returns:
+        Optional[Dict[str, Any]]: API 回應格式的進度欄位，無快照時為 None
+    """
+    try:
+        payload = await redis.hget(snapshot_key(task_id), "progress")
+    except Exception as e:
+        logger.warning(f"讀取訓練進度快照失敗: {e}")
+        return None
+
+    if not payload:
+        return None
+
+    data = orjson.loads(payload)["data"]
+    return {
+        "current_epoch": data["current_epoch"],
+        "current_loss": data["current_loss"],
+        "current_map": data["current_map"],
+        "best_map": data["current_map"],
+        "progress": int(data["progress"]),
+    }
@@ -3,21 +3,31 @@
 負責訓練任務的 CRUD 操作與 RQ 任務調度
 """
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, case, select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+import asyncio
+import os
 import uuid
 import logging
 
 from redis import Redis
-from rq import Queue
+from rq import Callback, Queue
+from rq.command import send_stop_job_command
 from rq.job import Job
 
+from models.database import AsyncSessionLocal
 from models.training import TrainingTask, TrainingStatus
-from models.database import get_db
+from services.gpu_lock import release_gpu_lock_on_stop
+from services.training_events import publish_task_update
+from services.pagination import keyset_before
 
 logger = logging.getLogger(__name__)
 
+# RQ 任務函式（以路徑字串指定，由 worker 端載入；Web 行程不需匯入 worker 與訓練相依套件）
+RUN_TRAINING_FUNC = 'workers.training_worker.run_training'
+
 
 class TrainingService:
     """訓練服務類別"""
@@ -32,13 +42,16 @@ class TrainingService:
         self.queue = Queue('training', connection=redis_conn)
         self.redis = redis_conn
 
-    def create_training_task(
+    async def create_training_task(
         self,
-        db: Session,
+        db: AsyncSession,
         config: Dict[str, Any]
     ) -> TrainingTask:
         """
-        創建訓練任務並加入 RQ 隊列
+        創建訓練任務記錄（狀態為 pending）
+
+        只寫入資料庫即返回；檔案檢查與加入 RQ 隊列由 enqueue_training_task 在背景完成。
+        RQ Job ID 直接使用任務 ID，於 INSERT 時一併寫入，加入隊列後不需再更新資料庫
 
         Args:
             db: 資料庫 session
@@ -46,6 +59,9 @@ class TrainingService:
 
         Returns:
             TrainingTask: 創建的訓練任務
+
+        Raises:
+            ValueError: 缺少 dataset_id、資料集不存在或缺少 yaml_path
         """
         # 生成任務 ID
         task_id = str(uuid.uuid4())
@@ -56,7 +72,7 @@ class TrainingService:
             raise ValueError("訓練配置缺少 dataset_id")
 
         from models.training import Dataset
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+        dataset = await db.get(Dataset, dataset_id)
         if not dataset:
             raise ValueError(f"資料集不存在: {dataset_id}")
 
@@ -74,45 +90,206 @@ class TrainingService:
             model_name=config.get('model_name', 'training'),
             yolo_version=config.get('yolo_version', 'v11'),
             status=TrainingStatus.PENDING,
+            job_id=task_id,
             config=config_with_yaml,  # 使用包含 data_yaml 的配置
             total_epochs=config.get('epochs', 100)
         )
 
         db.add(task)
-        db.commit()
-        db.refresh(task)
+        await db.commit()
+        await db.refresh(task)
 
-        # 加入 RQ 隊列
-        try:
-            from workers.training_worker import run_training
-
-            job = self.queue.enqueue(
-                run_training,
-                task_id=task_id,
-                config=config_with_yaml,  # 傳遞包含 data_yaml 的配置
-                job_timeout='24h',  # 24 小時超時
-                result_ttl=86400,   # 結果保留 1 天
-                failure_ttl=86400   # 失敗訊息保留 1 天
-            )
+        logger.info(f"✅ 訓練任務已創建: {task_id}")
+
+        return task
+
+    async def create_training_tasks(
+        self,
+        db: AsyncSession,
+        configs: List[Dict[str, Any]]
+    ) -> List[TrainingTask]:
+        """
+        批次創建訓練任務記錄（如超參數掃描）
+
+        資料集以單一查詢取得，所有任務於同一次 commit 寫入
+
+        Args:
+            db: 資料庫 session
+            configs: 訓練配置字典列表
 
-            # 更新 job_id
-            task.job_id = job.id
-            db.commit()
+        Returns:
+            List[TrainingTask]: 創建的訓練任務（與 configs 順序相同）
 
-            logger.info(f"✅ 訓練任務已創建: {task_id}, RQ Job: {job.id}")
+        Raises:
+            ValueError: 任一配置缺少 dataset_id、資料集不存在或缺少 yaml_path
+        """
+        from models.training import Dataset
+
+        dataset_ids = {config.get('dataset_id') for config in configs}
+        if None in dataset_ids or '' in dataset_ids:
+            raise ValueError("訓練配置缺少 dataset_id")
+
+        result = await db.execute(
+            select(Dataset.id, Dataset.yaml_path).where(Dataset.id.in_(dataset_ids))
+        )
+        yaml_paths = dict(result.all())
+
+        tasks = []
+        for config in configs:
+            dataset_id = config['dataset_id']
+            if dataset_id not in yaml_paths:
+                raise ValueError(f"資料集不存在: {dataset_id}")
+            if not yaml_paths[dataset_id]:
+                raise ValueError(f"資料集 {dataset_id} 缺少 yaml_path")
+
+            task_id = str(uuid.uuid4())
+            tasks.append(TrainingTask(
+                id=task_id,
+                project_name=config.get('project_name', 'yolo_project'),
+                model_name=config.get('model_name', 'training'),
+                yolo_version=config.get('yolo_version', 'v11'),
+                status=TrainingStatus.PENDING,
+                job_id=task_id,
+                config={**config, 'data_yaml': yaml_paths[dataset_id]},
+                total_epochs=config.get('epochs', 100)
+            ))
+
+        db.add_all(tasks)
+        await db.commit()
+
+        # 以單一查詢載入 created_at 等伺服器端預設值（取代逐筆 refresh）
+        await db.execute(
+            select(TrainingTask)
+            .where(TrainingTask.id.in_([task.id for task in tasks]))
+            .execution_options(populate_existing=True)
+        )
+
+        logger.info(f"✅ 已批次創建 {len(tasks)} 個訓練任務")
+
+        return tasks
+
+    async def enqueue_training_task(self, task_id: str, config: Dict[str, Any]):
+        """
+        檢查 data.yaml 並將任務加入 RQ 隊列（由 BackgroundTasks 在回應後執行）
+
+        Job ID 與任務 ID 相同（已於建立任務時寫入）；同步的 RQ / Redis 呼叫在執行緒中進行，
+        不阻塞事件迴圈。失敗時以獨立的資料庫 session 將任務標記為 failed 並推送狀態
+
+        Args:
+            task_id: 任務 ID
+            config: 包含 data_yaml 的訓練配置
+        """
+        try:
+            job = await asyncio.to_thread(self._enqueue, task_id, config)
+            logger.info(f"✅ 訓練任務已加入隊列: {task_id}, RQ Job: {job.id}")
 
         except Exception as e:
             logger.error(f"加入 RQ 隊列失敗: {e}", exc_info=True)
-            task.status = TrainingStatus.FAILED
-            task.error_message = f"加入任務隊列失敗: {str(e)}"
-            db.commit()
-            raise
+            await self._mark_enqueue_failed({task_id: str(e)})
 
-        return task
+    def _enqueue(self, task_id: str, config: Dict[str, Any]) -> Job:
+        """
+        檢查 data.yaml 並加入 RQ 隊列（同步，於執行緒中呼叫）
+
+        Args:
+            task_id: 任務 ID
+            config: 包含 data_yaml 的訓練配置
+
+        Returns:
+            Job: RQ 任務
+
+        Raises:
+            FileNotFoundError: data.yaml 不存在
+        """
+        data_yaml = config.get('data_yaml')
+        if not data_yaml or not os.path.exists(data_yaml):
+            raise FileNotFoundError(f"data.yaml 不存在: {data_yaml}")
+
+        return self.queue.enqueue(
+            RUN_TRAINING_FUNC,
+            task_id=task_id,
+            config=config,
+            job_id=task_id,
+            job_timeout='24h',  # 24 小時超時
+            result_ttl=86400,   # 結果保留 1 天
+            failure_ttl=86400,  # 失敗訊息保留 1 天
+            on_stopped=Callback(release_gpu_lock_on_stop)
+        )
+
+    async def enqueue_training_tasks(self, tasks: List[Dict[str, Any]]):
+        """
+        批次將任務加入 RQ 隊列（由 BackgroundTasks 在回應後執行）
+
+        先建立所有 Job，再以單一 Redis pipeline 一次寫入，
+        N 個任務只需一次往返（在執行緒中進行）；data.yaml 不存在的任務個別標記為 failed
+
+        Args:
+            tasks: [{'id': 任務 ID, 'config': 包含 data_yaml 的訓練配置}, ...]
+        """
+        failed = await asyncio.to_thread(self._enqueue_batch, tasks)
+        if failed:
+            await self._mark_enqueue_failed(failed)
+
+    def _enqueue_batch(self, tasks: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        以單一 Redis pipeline 批次加入 RQ 隊列（同步，於執行緒中呼叫）
 
-    def get_training_task(
+        Args:
+            tasks: [{'id': 任務 ID, 'config': 包含 data_yaml 的訓練配置}, ...]
+
+        Returns:
+            Dict[str, str]: 加入失敗的任務 ID 與原因
+        """
+        failed: Dict[str, str] = {}
+        jobs = []
+        for task in tasks:
+            data_yaml = task['config'].get('data_yaml')
+            if not data_yaml or not os.path.exists(data_yaml):
+                failed[task['id']] = f"data.yaml 不存在: {data_yaml}"
+                continue
+
+            jobs.append(self.queue.create_job(
+                RUN_TRAINING_FUNC,
+                kwargs={'task_id': task['id'], 'config': task['config']},
+                job_id=task['id'],
+                timeout='24h',
+                result_ttl=86400,
+                failure_ttl=86400,
+                on_stopped=Callback(release_gpu_lock_on_stop)
+            ))
+
+        if jobs:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for job in jobs:
+                    self.queue.enqueue_job(job, pipeline=pipe)
+                pipe.execute()
+                logger.info(f"✅ 已批次加入隊列 {len(jobs)} 個訓練任務")
+            except Exception as e:
+                logger.error(f"批次加入 RQ 隊列失敗: {e}", exc_info=True)
+                failed.update({job.id: str(e) for job in jobs})
+
+        return failed
+
+    async def _mark_enqueue_failed(self, failed: Dict[str, str]):
+        """
+        以獨立的資料庫 session 將加入隊列失敗的任務標記為 failed
+
+        Args:
+            failed: 任務 ID 與失敗原因
+        """
+        async with AsyncSessionLocal() as db:
+            for task_id, reason in failed.items():
+                await self.update_task_status(
+                    db,
+                    task_id,
+                    TrainingStatus.FAILED,
+                    error_message=f"加入任務隊列失敗: {reason}"
+                )
+
+    async def get_training_task(
         self,
-        db: Session,
+        db: AsyncSession,
         task_id: str
     ) -> Optional[TrainingTask]:
         """
@@ -125,40 +302,62 @@ class TrainingService:
         Returns:
             Optional[TrainingTask]: 訓練任務或 None
         """
-        return db.query(TrainingTask).filter(TrainingTask.id == task_id).first()
+        return await db.get(TrainingTask, task_id)
 
-    def list_training_tasks(
+    async def list_training_tasks(
         self,
-        db: Session,
+        db: AsyncSession,
         status: Optional[TrainingStatus] = None,
         limit: int = 50,
-        offset: int = 0
-    ) -> List[TrainingTask]:
+        offset: int = 0,
+        sort_by: str = 'created_at',
+        cursor: Optional[str] = None
+    ) -> List[Row]:
         """
         列出訓練任務
 
+        以 Core 查詢取得欄位資料列（progress 於 SQL 端計算），不建立 ORM 物件；
+        資料列可直接交給 TrainingTask.serialize
+
         Args:
             db: 資料庫 session
             status: 過濾狀態（可選）
             limit: 最大返回數量
-            offset: 偏移量
+            offset: 偏移量（相容舊版；提供 cursor 時忽略）
+            sort_by: 排序欄位（created_at 或 progress，皆為遞減）
+            cursor: 上一頁回傳的分頁游標（僅支援 created_at 排序）
 
         Returns:
-            List[TrainingTask]: 訓練任務列表
+            List[Row]: 訓練任務資料列
+
+        Raises:
+            ValueError: 游標格式錯誤或與排序方式不相容
         """
-        query = db.query(TrainingTask)
+        stmt = select(*TrainingTask.__table__.columns, TrainingTask.progress.label('progress'))
 
         if status:
-            query = query.filter(TrainingTask.status == status)
-
-        query = query.order_by(TrainingTask.created_at.desc())
-        query = query.limit(limit).offset(offset)
-
-        return query.all()
-
-    def update_task_progress(
+            stmt = stmt.where(TrainingTask.status == status)
+
+        if cursor:
+            if sort_by != 'created_at':
+                raise ValueError("分頁游標僅支援 created_at 排序")
+            stmt = stmt.where(keyset_before(TrainingTask.created_at, TrainingTask.id, cursor))
+        elif offset:
+            stmt = stmt.offset(offset)
+
+        if sort_by == 'progress':
+            # 進度在 SQL 端計算，分頁時不需取出全部資料
+            stmt = stmt.order_by(TrainingTask.progress.desc(), TrainingTask.created_at.desc())
+        else:
+            stmt = stmt.order_by(TrainingTask.created_at.desc(), TrainingTask.id.desc())
+        stmt = stmt.limit(limit)
+
+        result = await db.execute(stmt)
+        return list(result.all())
+
+    async def update_task_progress(
         self,
-        db: Session,
+        db: AsyncSession,
         task_id: str,
         current_epoch: int,
         current_loss: Optional[float] = None,
@@ -167,6 +366,8 @@ class TrainingService:
         """
         更新訓練任務進度
 
+        以單一 UPDATE ... RETURNING 完成，不需先 SELECT 也不需 refresh
+
         Args:
             db: 資料庫 session
             task_id: 任務 ID
@@ -177,25 +378,24 @@ class TrainingService:
         Returns:
             Optional[TrainingTask]: 更新後的任務
         """
-        task = self.get_training_task(db, task_id)
+        values: Dict[str, Any] = {'current_epoch': current_epoch}
+        if current_loss is not None:
+            values['current_loss'] = current_loss
+        if current_map is not None:
+            values['current_map'] = current_map
+
+        task = await self._update_task(db, task_id, values)
         if not task:
             logger.warning(f"任務不存在: {task_id}")
             return None
 
-        task.current_epoch = current_epoch
-        if current_loss is not None:
-            task.current_loss = current_loss
-        if current_map is not None:
-            task.current_map = current_map
-
-        db.commit()
-        db.refresh(task)
+        publish_task_update(task, self.redis)
 
         return task
 
-    def update_task_status(
+    async def update_task_status(
         self,
-        db: Session,
+        db: AsyncSession,
         task_id: str,
         status: TrainingStatus,
         error_message: Optional[str] = None,
@@ -205,6 +405,9 @@ class TrainingService:
         """
         更新訓練任務狀態
 
+        以單一 UPDATE ... RETURNING 完成；PENDING → RUNNING 時的 started_at
+        以 CASE 在同一語句中判斷
+
         Args:
             db: 資料庫 session
             task_id: 任務 ID
@@ -216,43 +419,74 @@ class TrainingService:
         Returns:
             Optional[TrainingTask]: 更新後的任務
         """
-        task = self.get_training_task(db, task_id)
-        if not task:
-            logger.warning(f"任務不存在: {task_id}")
-            return None
-
-        old_status = task.status
-        task.status = status
+        values: Dict[str, Any] = {'status': status}
 
         # 更新時間戳
-        if status == TrainingStatus.RUNNING and old_status == TrainingStatus.PENDING:
-            task.started_at = datetime.now()
+        now = datetime.now()
+        if status == TrainingStatus.RUNNING:
+            values['started_at'] = case(
+                (TrainingTask.status == TrainingStatus.PENDING, now),
+                else_=TrainingTask.started_at
+            )
         elif status in [TrainingStatus.COMPLETED, TrainingStatus.FAILED, TrainingStatus.STOPPED]:
-            task.completed_at = datetime.now()
+            values['completed_at'] = now
 
         # 更新其他欄位
         if error_message:
-            task.error_message = error_message
+            values['error_message'] = error_message
         if model_path:
-            task.model_path = model_path
+            values['model_path'] = model_path
         if save_dir:
-            task.save_dir = save_dir
+            values['save_dir'] = save_dir
 
-        db.commit()
-        db.refresh(task)
+        task = await self._update_task(db, task_id, values)
+        if not task:
+            logger.warning(f"任務不存在: {task_id}")
+            return None
+
+        publish_task_update(task, self.redis)
 
-        logger.info(f"任務 {task_id} 狀態更新: {old_status.value} → {status.value}")
+        logger.info(f"任務 {task_id} 狀態更新: {status.value}")
 
         return task
 
-    def stop_training_task(
+    async def _update_task(
         self,
-        db: Session,
+        db: AsyncSession,
+        task_id: str,
+        values: Dict[str, Any]
+    ) -> Optional[TrainingTask]:
+        """
+        以 UPDATE ... RETURNING 更新任務並取回更新後的整列
+
+        Args:
+            db: 資料庫 session
+            task_id: 任務 ID
+            values: 要更新的欄位
+
+        Returns:
+            Optional[TrainingTask]: 更新後的任務，不存在時為 None
+        """
+        result = await db.execute(
+            update(TrainingTask)
+            .where(TrainingTask.id == task_id)
+            .values(**values)
+            .returning(TrainingTask)
+        )
+        task = result.scalar_one_or_none()
+        await db.commit()
+        return task
+
+    async def stop_training_task(
+        self,
+        db: AsyncSession,
         task_id: str
     ) -> bool:
         """
         停止訓練任務
 
+        狀態以資料庫記錄為準，已結束的任務不會存取 Redis
+
         Args:
             db: 資料庫 session
             task_id: 任務 ID
@@ -260,7 +494,7 @@ class TrainingService:
         Returns:
             bool: 是否成功停止
         """
-        task = self.get_training_task(db, task_id)
+        task = await self.get_training_task(db, task_id)
         if not task:
             logger.warning(f"任務不存在: {task_id}")
             return False
@@ -269,21 +503,24 @@ class TrainingService:
             logger.warning(f"任務 {task_id} 狀態為 {task.status.value}，無法停止")
             return False
 
-        # 取消 RQ job
+        # 停止 RQ job：執行中的送出 stop-job 指令，尚在隊列中的直接移出隊列
         if task.job_id:
             try:
-                job = Job.fetch(task.job_id, connection=self.redis)
-                job.cancel()
-                logger.info(f"RQ Job {task.job_id} 已取消")
+                if task.status == TrainingStatus.RUNNING:
+                    send_stop_job_command(self.redis, task.job_id)
+                    logger.info(f"RQ Job {task.job_id} 已送出停止指令")
+                else:
+                    self.queue.remove(task.job_id)
+                    logger.info(f"RQ Job {task.job_id} 已移出隊列")
             except Exception as e:
-                logger.error(f"取消 RQ Job 失敗: {e}")
+                logger.error(f"停止 RQ Job 失敗: {e}")
 
         # 更新狀態
-        self.update_task_status(db, task_id, TrainingStatus.STOPPED)
+        await self.update_task_status(db, task_id, TrainingStatus.STOPPED)
 
         return True
 
-    def get_task_statistics(self, db: Session) -> Dict[str, Any]:
+    async def get_task_statistics(self, db: AsyncSession) -> Dict[str, Any]:
         """
         取得訓練任務統計資訊
 
@@ -293,24 +530,15 @@ class TrainingService:
         Returns:
             Dict[str, Any]: 統計資訊
         """
-        total = db.query(TrainingTask).count()
-        pending = db.query(TrainingTask).filter(
-            TrainingTask.status == TrainingStatus.PENDING
-        ).count()
-        running = db.query(TrainingTask).filter(
-            TrainingTask.status == TrainingStatus.RUNNING
-        ).count()
-        completed = db.query(TrainingTask).filter(
-            TrainingTask.status == TrainingStatus.COMPLETED
-        ).count()
-        failed = db.query(TrainingTask).filter(
-            TrainingTask.status == TrainingStatus.FAILED
-        ).count()
+        result = await db.execute(
+            select(TrainingTask.status, func.count()).group_by(TrainingTask.status)
+        )
+        counts = dict(result.all())
 
         return {
-            'total': total,
-            'pending': pending,
-            'running': running,
-            'completed': completed,
-            'failed': failed
+            'total': sum(counts.values()),
+            'pending': counts.get(TrainingStatus.PENDING, 0),
+            'running': counts.get(TrainingStatus.RUNNING, 0),
+            'completed': counts.get(TrainingStatus.COMPLETED, 0),
+            'failed': counts.get(TrainingStatus.FAILED, 0)
         }
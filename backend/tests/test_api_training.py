@@ -0,0 +1,71 @@
+"""
+訓練任務 API 測試
+"""
+
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models.database import SessionLocal, init_database
+from models.training import TrainingTask, TrainingStatus
+from routers import training
+
+app = FastAPI()
+app.include_router(training.router, prefix="/api/v1/training")
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def database():
+    """建立資料表"""
+    init_database()
+
+
+def add_task(current_epoch: int, total_epochs: int, status: TrainingStatus = TrainingStatus.RUNNING) -> str:
+    """寫入一筆訓練任務並回傳 ID"""
+    task_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(TrainingTask(
+            id=task_id,
+            project_name="test_project",
+            model_name="test_model",
+            yolo_version="v11",
+            status=status,
+            job_id=task_id,
+            config={"dataset_id": "dataset-1"},
+            current_epoch=current_epoch,
+            total_epochs=total_epochs
+        ))
+        db.commit()
+    finally:
+        db.close()
+    return task_id
+
+
+@pytest.mark.parametrize("sort_by", ["created_at", "progress"])
+def test_list_training_tasks_progress_is_int(sort_by):
+    """列表 API 的 progress 為整數百分比（SQL 端計算）"""
+    task_id = add_task(current_epoch=1, total_epochs=3)
+
+    response = client.get("/api/v1/training/", params={"sort_by": sort_by})
+
+    assert response.status_code == 200
+    task = next(t for t in response.json() if t["id"] == task_id)
+    assert task["progress"] == 33
+    assert isinstance(task["progress"], int)
+
+
+def test_list_training_tasks_filters_by_status():
+    """依狀態過濾，無效狀態回應 422"""
+    task_id = add_task(current_epoch=0, total_epochs=10, status=TrainingStatus.PENDING)
+
+    response = client.get("/api/v1/training/", params={"status": "pending"})
+    assert response.status_code == 200
+    tasks = response.json()
+    assert task_id in {t["id"] for t in tasks}
+    assert all(t["status"] == "pending" for t in tasks)
+
+    assert client.get("/api/v1/training/", params={"status": "unknown"}).status_code == 422
@@ -0,0 +1,92 @@
+"""
+模型檢查點工具
+不載入權重，只從 .pt 檔（ZIP 格式）讀取 metadata
+"""
+
+import pickle
+import zipfile
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# 允許還原為真實物件的類別；其餘類別（torch、ultralytics 等）一律以佔位物件取代
+_SAFE_GLOBALS = {
+    ('collections', 'OrderedDict'),
+    ('copyreg', '_reconstructor'),
+    ('builtins', 'object'),
+    ('builtins', 'set'),
+    ('builtins', 'frozenset'),
+    ('builtins', 'slice'),
+    ('builtins', 'complex'),
+}
+
+
+class _Stub(dict):
+    """
+    檢查點中非 metadata 類別的佔位物件
+
+    以 dict 為基底以接受 SETITEMS；屬性狀態（如 nn.Module 的 yaml）保存在 __dict__
+    """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __setstate__(self, state):
+        # state 可能為 dict 或 (dict, slotstate)
+        if isinstance(state, tuple) and len(state) == 2:
+            state = state[0]
+        if isinstance(state, dict):
+            self.__dict__.update(state)
+
+    def append(self, item):
+        pass
+
+    def extend(self, items):
+        pass
+
+
+class _MetadataUnpickler(pickle.Unpickler):
+    """只還原基本型別的 Unpickler：張量儲存區不讀取，任意類別不會被執行"""
+
+    def find_class(self, module: str, name: str):
+        if (module, name) in _SAFE_GLOBALS:
+            return super().find_class(module, name)
+        return _Stub
+
+    def persistent_load(self, pid):
+        # 張量儲存區（archive/data/*）不讀取
+        return None
+
+
+def read_checkpoint_metadata(file_path: str) -> Dict[str, Any]:
+    """
+    讀取 PyTorch 檢查點的頂層 dict，不載入任何張量
+
+    .pt 為 ZIP 封存，只解壓縮其中的 data.pkl（通常數 KB），
+    模型物件與張量以佔位物件取代，指標等基本型別欄位保持原值
+
+    Args:
+        file_path: 檢查點路徑
+
+    Returns:
+        Dict[str, Any]: 檢查點頂層 dict
+
+    Raises:
+        ValueError: 非 ZIP 格式（舊版 torch.save）或頂層不是 dict
+    """
+    if not zipfile.is_zipfile(file_path):
+        raise ValueError(f"非 ZIP 格式的檢查點: {file_path}")
+
+    with zipfile.ZipFile(file_path) as zf:
+        pkl_name = next((n for n in zf.namelist() if n.endswith('data.pkl')), None)
+        if pkl_name is None:
+            raise ValueError(f"檢查點缺少 data.pkl: {file_path}")
+
+        with zf.open(pkl_name) as f:
+            checkpoint = _MetadataUnpickler(f).load()
+
+    if not isinstance(checkpoint, dict) or isinstance(checkpoint, _Stub):
+        raise ValueError(f"無法辨識的檢查點格式: {type(checkpoint).__name__}")
+
+    return checkpoint
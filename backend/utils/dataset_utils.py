@@ -1,20 +1,89 @@
 """
 資料集處理工具
 從 YOLO_No_Code_Training 遷移並改造
-根據會議共識加入 ProcessPoolExecutor 優化
+檔案複製以 ThreadPoolExecutor 並行（I/O 密集，不需多進程）；
+來源與目標在同一檔案系統時以 reflink / 硬連結取代複製
 """
 
 import yaml
+import numpy as np
 import os
 import shutil
-import random
+import uuid
 import logging
 from pathlib import Path
 from typing import Optional, Callable, List, Tuple
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+# 圖片的有效副檔名（tuple 供 str.endswith 一次比對）
+VALID_IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# YAML 輸出使用 libyaml 的 C 實作，未編譯 libyaml 時退回純 Python 的 SafeDumper
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+# Linux FICLONE ioctl：在 Btrfs / XFS 等檔案系統建立 copy-on-write 副本（reflink）
+FICLONE = 0x40049409
+
+
+def _reflink(src, dst):
+    """
+    以 reflink 建立檔案副本（共用資料區塊，寫入時才複製）
+
+    Args:
+        src: 來源檔案
+        dst: 目標檔案
+
+    Raises:
+        OSError: 檔案系統不支援 reflink
+    """
+    with open(src, 'rb') as fsrc:
+        fdst = open(dst, 'wb')
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+        fdst.close()
+
+
+def _select_transfer(sample: Path, target_dir: Path) -> Callable:
+    """
+    依來源與目標所在的檔案系統選擇檔案搬移方式
+
+    同一檔案系統時依序嘗試 reflink、硬連結（以樣本檔實測一次），
+    皆不支援或跨檔案系統時使用 shutil.copy2
+
+    Args:
+        sample: 來源中的樣本檔案
+        target_dir: 目標目錄
+
+    Returns:
+        Callable: transfer(src, dst)
+    """
+    if sample.stat().st_dev != target_dir.stat().st_dev:
+        return shutil.copy2
+
+    candidates = ([_reflink] if fcntl is not None else []) + [os.link]
+    probe = target_dir / f".probe-{uuid.uuid4().hex}"
+
+    for transfer in candidates:
+        try:
+            transfer(sample, probe)
+        except OSError:
+            continue
+        os.remove(probe)
+        return transfer
+
+    return shutil.copy2
+
 
 def create_data_yaml(
     train_path: str,
@@ -43,23 +112,31 @@ def create_data_yaml(
         val_path = train_path
         logger.warning("驗證路徑缺失，使用訓練路徑")
 
+    # 轉為絕對路徑（只取一次工作目錄）
+    cwd = os.getcwd()
+
+    def to_abs(path: str) -> str:
+        return os.path.normpath(path if os.path.isabs(path) else os.path.join(cwd, path))
+
+    output_abs = to_abs(output_path)
+
     # 建立配置
     data = {
-        'path': os.path.abspath(os.path.dirname(output_path)),
-        'train': os.path.abspath(train_path),
-        'val': os.path.abspath(val_path),
+        'path': os.path.dirname(output_abs),
+        'train': to_abs(train_path),
+        'val': to_abs(val_path),
         'names': names_dict,
         'nc': len(classes)
     }
 
     # 寫入 yaml
     with open(output_path, 'w', encoding='utf-8') as f:
-        yaml.dump(data, f, sort_keys=False, allow_unicode=True)
+        yaml.dump(data, f, Dumper=YAML_DUMPER, sort_keys=False, allow_unicode=True)
 
     logger.info(f"✅ 已生成 data.yaml: {output_path}")
     logger.info(f"   - {len(classes)} 個類別")
 
-    return os.path.abspath(output_path)
+    return output_abs
 
 
 def split_dataset(
@@ -67,21 +144,28 @@ def split_dataset(
     output_folder: str,
     split_ratio: float = 0.8,
     progress_callback: Optional[Callable[[str], None]] = None,
-    use_multiprocessing: bool = True,
-    max_workers: int = 4
+    parallel: bool = True,
+    max_workers: Optional[int] = None,
+    link_files: bool = True,
+    seed: Optional[int] = None
 ) -> Tuple[int, int]:
     """
     將原始資料集分割為 YOLO train/val 結構
 
-    根據會議共識：使用 ProcessPoolExecutor 加速檔案複製
+    檔案複製為 I/O 密集，以執行緒池並行：
+    不需 fork 子行程與 pickle 路徑，syscall 等待期間會釋放 GIL。
+    來源與目標在同一檔案系統時，以 reflink（不支援時為硬連結）取代複製，
+    不需實際搬移資料也幾乎不佔額外空間
 
     Args:
         source_folder: 包含圖片和標註的原始資料夾
         output_folder: 目標資料夾
         split_ratio: 訓練集比例 (0.0 到 1.0)
         progress_callback: 進度回調函數
-        use_multiprocessing: 是否使用多進程加速
-        max_workers: 最大 worker 數量
+        parallel: 是否以執行緒池並行複製
+        max_workers: 最大執行緒數（預設為 CPU 核心數 × 4，上限 32）
+        link_files: 同一檔案系統時是否以 reflink / 硬連結取代複製
+        seed: 隨機種子（指定時相同來源資料夾得到相同分割）
 
     Returns:
         Tuple[int, int]: (訓練集圖片數, 驗證集圖片數)
@@ -98,9 +182,14 @@ def split_dataset(
     (dest / 'labels' / 'train').mkdir(parents=True, exist_ok=True)
     (dest / 'labels' / 'val').mkdir(parents=True, exist_ok=True)
 
-    # 取得所有圖片
-    valid_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
-    images = [f for f in source.iterdir() if f.suffix.lower() in valid_exts]
+    # 取得所有圖片（scandir 的 DirEntry 帶有檔案類型，只保留路徑字串）
+    with os.scandir(source) as entries:
+        images = [
+            entry.path
+            for entry in entries
+            if entry.name.lower().endswith(VALID_IMAGE_EXTS)
+            and entry.is_file(follow_symlinks=False)
+        ]
 
     if not images:
         msg = "來源資料夾中未找到圖片"
@@ -109,64 +198,88 @@ def split_dataset(
             progress_callback(msg)
         return 0, 0
 
-    # 隨機打亂
-    random.shuffle(images)
+    # 隨機打亂（numpy 排列在 C 中完成）；指定種子時先排序，使結果不受目錄列舉順序影響
+    if seed is not None:
+        images.sort()
+    order = np.random.default_rng(seed).permutation(len(images)).tolist()
 
     # 分割
     split_idx = int(len(images) * split_ratio)
-    train_imgs = images[:split_idx]
-    val_imgs = images[split_idx:]
+    train_imgs = [images[i] for i in order[:split_idx]]
+    val_imgs = [images[i] for i in order[split_idx:]]
 
     msg = f"📊 找到 {len(images)} 張圖片。分割: {len(train_imgs)} 訓練, {len(val_imgs)} 驗證"
     logger.info(msg)
     if progress_callback:
         progress_callback(msg)
 
+    transfer = _select_transfer(Path(images[0]), dest / 'images' / 'train') if link_files else shutil.copy2
+    if transfer is not shutil.copy2:
+        logger.info(f"來源與目標位於同一檔案系統，使用 {'reflink' if transfer is _reflink else '硬連結'}")
+
+    def transfer_file(src: str, dst: str):
+        """搬移單一檔案：目標已存在時先移除再連結，其他連結失敗時改為複製"""
+        try:
+            transfer(src, dst)
+        except FileNotFoundError:
+            raise
+        except FileExistsError:
+            os.remove(dst)
+            transfer(src, dst)
+        except OSError:
+            if transfer is shutil.copy2:
+                raise
+            shutil.copy2(src, dst)
+
+    source_str = str(source)
+    dest_str = str(dest)
+
     # 複製檔案函數
-    def copy_file_pair(img_path: Path, dest_folder: Path, split_type: str):
+    def copy_file_pair(img_path: str, split_type: str) -> bool:
         """複製圖片和對應的標註檔"""
+        img_name = os.path.basename(img_path)
         try:
             # 複製圖片
-            shutil.copy2(img_path, dest_folder / 'images' / split_type / img_path.name)
+            transfer_file(img_path, os.path.join(dest_str, 'images', split_type, img_name))
 
             # 複製標註（若存在）
-            label_path = img_path.with_suffix('.txt')
-            if label_path.exists():
-                shutil.copy2(label_path, dest_folder / 'labels' / split_type / label_path.name)
+            label_name = os.path.splitext(img_name)[0] + '.txt'
+            try:
+                transfer_file(
+                    os.path.join(source_str, label_name),
+                    os.path.join(dest_str, 'labels', split_type, label_name)
+                )
+            except FileNotFoundError:
+                pass
 
             return True
         except Exception as e:
-            logger.error(f"複製失敗 {img_path.name}: {e}")
+            logger.error(f"複製失敗 {img_name}: {e}")
             return False
 
-    # 複製檔案（使用多進程優化）
-    if use_multiprocessing and len(images) > 100:
-        msg = f"⚡ 使用 {max_workers} 個 worker 加速複製..."
+    jobs = [(img, 'train') for img in train_imgs] + [(img, 'val') for img in val_imgs]
+
+    def copy_chunk(chunk: List[Tuple[str, str]]):
+        """依序複製一批檔案"""
+        for img, split_type in chunk:
+            copy_file_pair(img, split_type)
+
+    # 複製檔案（小型資料集直接在目前執行緒處理）
+    if parallel and len(images) > 100:
+        max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        msg = f"⚡ 使用 {max_workers} 個執行緒加速複製..."
         logger.info(msg)
         if progress_callback:
             progress_callback(msg)
 
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            # 訓練集
-            train_futures = [
-                executor.submit(copy_file_pair, img, dest, 'train')
-                for img in train_imgs
-            ]
-            # 驗證集
-            val_futures = [
-                executor.submit(copy_file_pair, img, dest, 'val')
-                for img in val_imgs
-            ]
+        # 每個執行緒分到約 4 批，兼顧負載平衡與排程開銷（不必每個檔案一個 future）
+        chunk_size = max(1, len(jobs) // (max_workers * 4))
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
 
-            # 等待完成
-            for future in as_completed(train_futures + val_futures):
-                future.result()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(copy_chunk, chunks))
     else:
-        # 單進程複製（小型資料集）
-        for img in train_imgs:
-            copy_file_pair(img, dest, 'train')
-        for img in val_imgs:
-            copy_file_pair(img, dest, 'val')
+        copy_chunk(jobs)
 
     # 處理 classes.txt
     classes_file = source / 'classes.txt'
@@ -185,77 +298,79 @@ def split_dataset(
     return len(train_imgs), len(val_imgs)
 
 
-def validate_dataset(dataset_folder: str) -> dict:
+def _list_split_files(directory: Path, suffix: Optional[str] = None) -> Optional[List[str]]:
     """
-    驗證資料集結構與完整性
+    列出 split 目錄下的檔案路徑（單次 scandir）
+
+    規則與 glob 相同：略過隱藏檔，suffix 為 None 時取名稱含副檔名者（'*.*'）
 
     Args:
-        dataset_folder: 資料集資料夾路徑
+        directory: 目錄路徑
+        suffix: 副檔名過濾（如 '.txt'）
 
     Returns:
-        dict: 驗證結果
+        Optional[List[str]]: 檔案路徑列表，目錄不存在時為 None
     """
-    folder = Path(dataset_folder)
-    result = {
-        'valid': True,
-        'errors': [],
-        'warnings': [],
-        'stats': {}
-    }
+    try:
+        with os.scandir(directory) as entries:
+            return [
+                entry.path
+                for entry in entries
+                if not entry.name.startswith('.')
+                and (entry.name.endswith(suffix) if suffix else '.' in entry.name)
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return None
 
-    # 檢查目錄結構
-    required_dirs = [
-        'images/train',
-        'images/val',
-        'labels/train',
-        'labels/val'
-    ]
-
-    for dir_path in required_dirs:
-        if not (folder / dir_path).exists():
-            result['valid'] = False
-            result['errors'].append(f"缺少目錄: {dir_path}")
-
-    if not result['valid']:
-        return result
-
-    # 統計圖片與標註
-    for split in ['train', 'val']:
-        img_dir = folder / 'images' / split
-        label_dir = folder / 'labels' / split
 
-        images = list(img_dir.glob('*.*'))
-        labels = list(label_dir.glob('*.txt'))
+def _read_class_ids(label_files: List[str]) -> List[int]:
+    """
+    讀取一批標註檔每行第一欄的類別 ID
 
-        img_count = len(images)
-        label_count = len(labels)
+    Args:
+        label_files: 標註檔路徑列表
 
-        result['stats'][split] = {
-            'images': img_count,
-            'labels': label_count
-        }
+    Returns:
+        List[int]: 類別 ID（讀取失敗的檔案略過）
+    """
+    class_ids: List[int] = []
+    for label_file in label_files:
+        try:
+            with open(label_file, 'r') as f:
+                class_ids.extend(
+                    int(line.split(None, 1)[0])
+                    for line in f.read().splitlines()
+                    if line.strip()
+                )
+        except Exception as e:
+            logger.warning(f"讀取標註失敗 {label_file}: {e}")
+    return class_ids
 
-        # 警告：標註數量不匹配
-        if img_count != label_count:
-            result['warnings'].append(
-                f"{split} 集圖片數 ({img_count}) 與標註數 ({label_count}) 不匹配"
-            )
 
-    logger.info(f"資料集驗證完成: {result}")
-    return result
+# 標註檔數超過此值時以執行緒池平行讀取
+PARALLEL_LABEL_THRESHOLD = 1000
 
 
-def get_dataset_statistics(dataset_folder: str) -> dict:
+def collect_dataset_info(dataset_folder: str) -> Tuple[dict, dict]:
     """
-    取得資料集統計資訊
+    一次走訪資料集，同時產生驗證結果與統計資訊
+
+    images/、labels/ 的 train、val 目錄各只列出一次，
+    結果與分別呼叫 validate_dataset、get_dataset_statistics 相同
 
     Args:
         dataset_folder: 資料集資料夾路徑
 
     Returns:
-        dict: 統計資訊
+        Tuple[dict, dict]: (驗證結果, 統計資訊)
     """
     folder = Path(dataset_folder)
+    validation = {
+        'valid': True,
+        'errors': [],
+        'warnings': [],
+        'stats': {}
+    }
     stats = {
         'total_images': 0,
         'total_labels': 0,
@@ -264,29 +379,95 @@ def get_dataset_statistics(dataset_folder: str) -> dict:
         'class_distribution': {}
     }
 
+    listings = {}
+    for split in ['train', 'val']:
+        listings[split] = (
+            _list_split_files(folder / 'images' / split),
+            _list_split_files(folder / 'labels' / split, '.txt')
+        )
+
+    # 檢查目錄結構
+    for kind, index in (('images', 0), ('labels', 1)):
+        for split in ['train', 'val']:
+            if listings[split][index] is None:
+                validation['valid'] = False
+                validation['errors'].append(f"缺少目錄: {kind}/{split}")
+
+    label_files: List[str] = []
     for split in ['train', 'val']:
-        img_dir = folder / 'images' / split
-        label_dir = folder / 'labels' / split
+        images, labels = listings[split]
 
-        if img_dir.exists():
-            images = list(img_dir.glob('*.*'))
+        if images is not None:
             stats[split]['images'] = len(images)
             stats['total_images'] += len(images)
 
-        if label_dir.exists():
-            labels = list(label_dir.glob('*.txt'))
+        if labels is not None:
             stats[split]['labels'] = len(labels)
             stats['total_labels'] += len(labels)
 
-            # 統計類別分布
-            for label_file in labels:
-                try:
-                    with open(label_file, 'r') as f:
-                        for line in f:
-                            cls_id = int(line.split()[0])
-                            stats['class_distribution'][cls_id] = \
-                                stats['class_distribution'].get(cls_id, 0) + 1
-                except Exception as e:
-                    logger.warning(f"讀取標註失敗 {label_file}: {e}")
-
-    return stats
+            label_files.extend(labels)
+
+        if validation['valid']:
+            img_count = len(images)
+            label_count = len(labels)
+
+            validation['stats'][split] = {
+                'images': img_count,
+                'labels': label_count
+            }
+
+            # 警告：標註數量不匹配
+            if img_count != label_count:
+                validation['warnings'].append(
+                    f"{split} 集圖片數 ({img_count}) 與標註數 ({label_count}) 不匹配"
+                )
+
+    # 收集所有標註的類別 ID：大量小檔案的 open/read 為 I/O 等待，以執行緒分批平行讀取
+    if len(label_files) > PARALLEL_LABEL_THRESHOLD:
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        chunk_size = -(-len(label_files) // (max_workers * 4))
+        chunks = [label_files[i:i + chunk_size] for i in range(0, len(label_files), chunk_size)]
+
+        class_ids: List[int] = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for chunk_ids in executor.map(_read_class_ids, chunks):
+                class_ids.extend(chunk_ids)
+    else:
+        class_ids = _read_class_ids(label_files)
+
+    # 統計類別分布（單次 bincount，忽略負數等無效 ID）
+    if class_ids:
+        ids = np.fromiter(class_ids, dtype=np.int64, count=len(class_ids))
+        counts = np.bincount(ids[ids >= 0])
+        stats['class_distribution'] = {
+            int(cls_id): int(counts[cls_id]) for cls_id in np.flatnonzero(counts)
+        }
+
+    logger.info(f"資料集驗證完成: {validation}")
+    return validation, stats
+
+
+def validate_dataset(dataset_folder: str) -> dict:
+    """
+    驗證資料集結構與完整性
+
+    Args:
+        dataset_folder: 資料集資料夾路徑
+
+    Returns:
+        dict: 驗證結果
+    """
+    return collect_dataset_info(dataset_folder)[0]
+
+
+def get_dataset_statistics(dataset_folder: str) -> dict:
+    """
+    取得資料集統計資訊
+
+    Args:
+        dataset_folder: 資料集資料夾路徑
+
+    Returns:
+        dict: 統計資訊
+    """
+    return collect_dataset_info(dataset_folder)[1]
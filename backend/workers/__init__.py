@@ -1,5 +1,5 @@
 """Background Workers Package"""
 
-from .training_worker import run_training, get_worker_status
+from .training_worker import run_training, run_export, get_worker_status
 
-__all__ = ['run_training', 'get_worker_status']
+__all__ = ['run_training', 'run_export', 'get_worker_status']
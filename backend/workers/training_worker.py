@@ -3,18 +3,29 @@ RQ 訓練 Worker
 在背景執行 YOLO 訓練任務
 """
 
+import functools
 import logging
-from typing import Dict, Any
+import os
+import time
+from typing import Dict, Any, List, Optional
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from rq import Queue, get_current_job
 
-from engines.yolo_trainer import YOLOTrainer
+from engines.yolo_trainer import YOLOTrainer, export_models
 from models.database import SessionLocal
 from models.training import TrainingStatus
+from services.gpu_lock import hold_gpu_lock, requeue_current_job
+from services.redis_pool import get_redis
+from services.training_events import publish_task_update
 
 logger = logging.getLogger(__name__)
 
+# 進度寫入資料庫的最短間隔（秒）；每個 epoch 仍即時發布到 Redis 快照與 Pub/Sub
+PROGRESS_FLUSH_INTERVAL = 10
 
-def run_training(task_id: str, config: Dict[str, Any]) -> str:
+
+def run_training(task_id: str, config: Dict[str, Any]) -> Optional[str]:
     """
     執行訓練任務（RQ worker 函數）
 
@@ -25,38 +36,80 @@ def run_training(task_id: str, config: Dict[str, Any]) -> str:
         config: 訓練配置字典
 
     Returns:
-        str: 訓練結果儲存路徑
+        Optional[str]: 訓練結果儲存路徑，任務已不是 PENDING（如已停止）時為 None
 
     Raises:
         Exception: 訓練失敗時拋出例外
     """
-    db: Session = SessionLocal()
+    # 等待 GPU 空閒（任務維持 PENDING）；逾時則延後重新排入隊列，worker 可先處理匯出等任務
+    logger.info(f"⏳ 等待 GPU: {task_id}")
+    with hold_gpu_lock(get_redis(), token=task_id) as acquired:
+        if not acquired:
+            requeue_current_job()
+            return None
+        return _train(task_id, config)
+
+
+def _train(task_id: str, config: Dict[str, Any]) -> Optional[str]:
+    """
+    執行訓練（呼叫前需持有 GPU 鎖）
+
+    Args:
+        task_id: 任務 ID
+        config: 訓練配置字典
+
+    Returns:
+        Optional[str]: 訓練結果儲存路徑，任務已不是 PENDING 時為 None
+    """
+    # commit 後不使物件過期：發布進度時不會再 SELECT 重新載入任務
+    db: Session = SessionLocal(expire_on_commit=False)
     trainer = YOLOTrainer()
+    job = get_current_job()
 
     try:
-        logger.info(f"🚀 開始訓練任務: {task_id}")
-
-        # 載入任務
+        # 僅在任務仍為 PENDING 時轉為 RUNNING：等待 GPU 鎖或排入隊列期間任務可能已被停止。
+        # 任務可能因 GPU 忙碌而重新排入隊列（Job ID 不同），一併記錄實際執行的 Job ID
         from models.training import TrainingTask
-        task = db.query(TrainingTask).filter(TrainingTask.id == task_id).first()
+        from datetime import datetime
+        values = {'status': TrainingStatus.RUNNING, 'started_at': datetime.now()}
+        if job is not None:
+            values['job_id'] = job.id
+        task = db.execute(
+            update(TrainingTask)
+            .where(TrainingTask.id == task_id, TrainingTask.status == TrainingStatus.PENDING)
+            .values(**values)
+            .returning(TrainingTask)
+        ).scalar_one_or_none()
+        db.commit()
 
         if not task:
-            raise ValueError(f"任務不存在: {task_id}")
+            current = db.get(TrainingTask, task_id)
+            if not current:
+                raise ValueError(f"任務不存在: {task_id}")
+            logger.info(f"⏹️ 任務 {task_id} 狀態為 {current.status.value}，略過訓練")
+            return None
 
-        # 更新狀態為 RUNNING
-        task.status = TrainingStatus.RUNNING
-        from datetime import datetime
-        task.started_at = datetime.now()
-        db.commit()
+        logger.info(f"🚀 開始訓練任務: {task_id}")
+        publish_task_update(task)
+
+        last_flush = time.monotonic()
 
         # 定義進度回調
         def progress_callback(epoch: int, metrics: Dict[str, float]):
-            """更新訓練進度到資料庫"""
+            """發布訓練進度，並定期寫入資料庫"""
+            nonlocal last_flush
             try:
                 task.current_epoch = epoch
                 task.current_loss = metrics.get('loss', task.current_loss)
                 task.current_map = metrics.get('mAP', task.current_map)
-                db.commit()
+
+                # 未寫入的進度會隨下一次 commit（含任務結束時的狀態更新）一併寫入
+                now = time.monotonic()
+                if now - last_flush >= PROGRESS_FLUSH_INTERVAL or epoch >= task.total_epochs:
+                    db.commit()
+                    last_flush = now
+
+                publish_task_update(task)
 
                 logger.info(
                     f"📊 任務 {task_id} - Epoch {epoch}/{task.total_epochs}, "
@@ -83,9 +136,25 @@ def run_training(task_id: str, config: Dict[str, Any]) -> str:
         task.model_path = f"{save_dir}/weights/best.pt"
         task.completed_at = datetime.now()
         db.commit()
+        publish_task_update(task)
 
         logger.info(f"✅ 訓練任務完成: {task_id}, 結果: {save_dir}")
 
+        # 模型匯出交由 export 隊列處理，訓練 worker 可立即接下一個任務
+        try:
+            export_queue = Queue('export', connection=get_redis())
+            export_queue.enqueue(
+                run_export,
+                save_dir=save_dir,
+                config=config,
+                job_timeout='1h',  # INT8 校正可能較久
+                result_ttl=86400,
+                failure_ttl=86400
+            )
+            logger.info(f"📦 已排入模型匯出任務: {task_id}")
+        except Exception as e:
+            logger.error(f"排入模型匯出任務失敗: {e}")
+
         return save_dir
 
     except Exception as e:
@@ -94,13 +163,14 @@ def run_training(task_id: str, config: Dict[str, Any]) -> str:
         # 更新狀態為 FAILED
         try:
             from models.training import TrainingTask
-            task = db.query(TrainingTask).filter(TrainingTask.id == task_id).first()
+            task = db.get(TrainingTask, task_id)
             if task:
                 task.status = TrainingStatus.FAILED
                 task.error_message = str(e)
                 from datetime import datetime
                 task.completed_at = datetime.now()
                 db.commit()
+                publish_task_update(task)
         except Exception as update_error:
             logger.error(f"更新失敗狀態時出錯: {update_error}")
 
@@ -110,21 +180,61 @@ def run_training(task_id: str, config: Dict[str, Any]) -> str:
         db.close()
 
 
+def run_export(save_dir: str, config: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    匯出訓練完成的模型（RQ worker 函數，export 隊列）
+
+    INT8 校正與 TensorRT 建置需使用 GPU，與訓練任務共用 GPU 鎖；
+    逾時未取得鎖時延後重新排入隊列
+
+    Args:
+        save_dir: 訓練結果儲存目錄
+        config: 訓練配置字典
+
+    Returns:
+        Optional[List[str]]: 成功匯出的檔案路徑，重新排入隊列時為 None
+    """
+    with hold_gpu_lock(get_redis(), token=f"export:{save_dir}") as acquired:
+        if not acquired:
+            requeue_current_job()
+            return None
+        return export_models(save_dir, config)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_process(pid: int):
+    """
+    取得並保留行程的 psutil.Process（以 pid 為鍵，fork 出的子行程會取得自己的實例）
+
+    cpu_percent(None) 以同一實例上次呼叫以來的 CPU 時間計算，不需 sleep 取樣
+
+    Args:
+        pid: 行程 ID
+
+    Returns:
+        psutil.Process: 行程實例
+    """
+    import psutil
+
+    process = psutil.Process(pid)
+    process.cpu_percent(None)  # 初始化計算基準
+    return process
+
+
 def get_worker_status() -> Dict[str, Any]:
     """
     取得 Worker 狀態資訊
 
+    cpu_percent 為距上次呼叫期間的 CPU 使用率（首次呼叫為 0.0），呼叫不會阻塞
+
     Returns:
         Dict[str, Any]: Worker 狀態
     """
-    import os
-    import psutil
-
-    process = psutil.Process(os.getpid())
+    process = _get_process(os.getpid())
 
     return {
         'pid': process.pid,
-        'cpu_percent': process.cpu_percent(interval=0.1),
+        'cpu_percent': process.cpu_percent(None),
         'memory_mb': process.memory_info().rss / 1024 / 1024,
         'status': process.status(),
         'create_time': process.create_time()
@@ -27,6 +27,14 @@ export default function StreamingPage() {
   const wsRef = useRef(null);
   const fpsCounterRef = useRef({ frames: 0, lastTime: Date.now() });
 
+  // 清除畫面並釋放 object URL
+  const clearFrame = () => {
+    setCurrentFrame((prev) => {
+      if (prev) URL.revokeObjectURL(prev);
+      return null;
+    });
+  };
+
   // 載入可用模型列表
   useEffect(() => {
     fetchModels();
@@ -128,7 +136,7 @@ export default function StreamingPage() {
       }
 
       setIsStreaming(false);
-      setCurrentFrame(null);
+      clearFrame();
       setDetections([]);
       setDetectionCount(0);
       setFps(0);
@@ -158,13 +166,15 @@ export default function StreamingPage() {
     };
 
     ws.onmessage = (event) => {
-      const message = JSON.parse(event.data);
-
-      if (message.type === 'frame') {
-        const frameData = message.data;
-        setCurrentFrame(frameData.frame);
-        setDetections(frameData.detections || []);
-        setDetectionCount(frameData.detection_count || 0);
+      // 二進位訊框：JPEG 畫面
+      if (event.data instanceof Blob) {
+        const frameUrl = URL.createObjectURL(
+          new Blob([event.data], { type: 'image/jpeg' })
+        );
+        setCurrentFrame((prev) => {
+          if (prev) URL.revokeObjectURL(prev);
+          return frameUrl;
+        });
 
         // 計算 FPS
         const counter = fpsCounterRef.current;
@@ -177,11 +187,20 @@ export default function StreamingPage() {
           counter.frames = 0;
           counter.lastTime = now;
         }
+        return;
+      }
+
+      const message = JSON.parse(event.data);
+
+      if (message.type === 'frame') {
+        const frameData = message.data;
+        setDetections(frameData.detections || []);
+        setDetectionCount(frameData.detection_count || 0);
       } else if (message.type === 'error') {
         setError(message.message);
       } else if (message.type === 'stopped') {
         setIsStreaming(false);
-        setCurrentFrame(null);
+        clearFrame();
       }
     };
 